@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# Benchmark: the days x 24 activity matrix and its chart as the recording
+# grows. AggregatedResults.activity_matrix (stacked per-day hourly figures, no
+# bouts re-read) is checked against a pandas pivot of all bouts, and the chart
+# render time of plot_bar_multiple (24 bars per day) is compared with
+# plot_activity_heatmap (one image artist).
+#
+#   python benchmarks/bench_activity.py [--days 7,30,90] [--bouts 200] [--bar-max-days 90]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import plot_gen
+from folderresults import AggregatedResults
+from synthetic import write_participant
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, result
+
+
+def check(result, activity):
+    # Reference: pivot of every bout by (day, hour it starts in)
+    bouts = result.all_bouts.copy()
+    bouts['day'] = bouts['start_times'].dt.strftime('%Y-%m-%d')
+    # Days in the synthetic data start at local midnight, so the session day is the bout's date
+    grouped = bouts.groupby(['day', 'bout_hour'])
+    expected = {
+        'minutes': grouped['duration_s'].sum() / 60,
+        'strides': grouped['n_strides'].sum(),
+        'speed': grouped['walking_speed_mps'].mean()
+    }
+    for name, series in expected.items():
+        dense = series.unstack(fill_value=0 if name != 'speed' else np.nan)
+        dense = dense.reindex(index=activity['days'], columns=range(24),
+                              fill_value=0 if name != 'speed' else np.nan)
+        assert np.allclose(activity[name], dense.to_numpy(), equal_nan=True), name
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', default='7,30,90')
+    parser.add_argument('--bouts', type=int, default=200)
+    parser.add_argument('--bar-max-days', type=int, default=90, help='Skip plot_bar_multiple beyond this')
+    args = parser.parse_args()
+
+    plot_gen.warm_up()
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for days in [int(d) for d in args.days.split(',')]:
+            path = os.path.join(tmp, f'{days}d')
+            write_participant(path, days=days, n_bouts=args.bouts)
+            result = AggregatedResults(keep_frames=False)
+            result.read_data(path)
+
+            t_matrix, activity = timed(result.activity_matrix)
+            assert activity['minutes'].shape == (days, 24)
+            check(result, activity)
+
+            t_heatmap, _ = timed(lambda: plot_gen.plot_activity_heatmap(
+                activity['minutes'], activity['days'], 'Minutes of activity', 'Activity',
+                os.path.join(tmp, f'heatmap{days}.svg')))
+            t_bars = None
+            if days <= args.bar_max_days:
+                t_bars, _ = timed(lambda: plot_gen.plot_bar_multiple(
+                    list(np.nan_to_num(activity['minutes'])), activity['days'], 'Minutes of activity', 'Activity',
+                    os.path.join(tmp, f'bars{days}.svg')))
+            rows.append((days, t_matrix, t_bars, t_heatmap))
+
+    print(f"bouts/day={args.bouts}")
+    print(f"{'days':>6} {'matrix':>10} {'bar charts':>12} {'heatmap':>10}")
+    for days, t_matrix, t_bars, t_heatmap in rows:
+        bars = f"{t_bars * 1000:9.0f}ms" if t_bars is not None else f"{'skipped':>11}"
+        print(f"{days:>6} {t_matrix * 1000:8.2f}ms {bars:>12} {t_heatmap * 1000:8.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
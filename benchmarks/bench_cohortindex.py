@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# Benchmark: peer percentiles for a report. The naive approach reads every
+# other participant in the cohort for each report; cohortindex.CohortIndex
+# reads them once, then answers each report with a binary search. Also
+# times an incremental update after one participant gets a new day (vs a
+# full rebuild), save/load of the index, and lookups on a large synthetic
+# cohort. Percentiles, quantiles and histograms are checked against numpy.
+#
+#   python benchmarks/bench_cohortindex.py [--participants 24] [--days 2] [--bouts 50] [--large 200000]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import cohortindex
+from cohortindex import PEER_METRICS
+from cohortindex import CohortIndex
+from synthetic import write_day_folder
+from synthetic import write_participant
+
+COHORTS = ('PD', 'HC')
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, result
+
+
+def naive_percentile(peers, value):
+    peers = np.asarray(peers)
+    peers = peers[np.isfinite(peers)]
+    return 100 * (np.sum(peers < value) + 0.5 * np.sum(peers == value)) / len(peers)
+
+
+def naive_report(data_root, participant, cohort_of):
+    # Every peer in the cohort read again for this one report
+    cohort, own = cohortindex.participant_values(os.path.join(data_root, participant))
+    peers = [cohortindex.participant_values(os.path.join(data_root, p))[1]
+             for p in cohort_of if cohort_of[p] == cohort and p != participant]
+    return {m: naive_percentile([v[j] for v in peers], own[j]) for j, m in enumerate(PEER_METRICS)}
+
+
+def check(index, data_root, participant, cohort_of, expected=None):
+    cohort, own = cohortindex.participant_values(os.path.join(data_root, participant))
+    expected = expected or naive_report(data_root, participant, cohort_of)
+    for j, metric in enumerate(PEER_METRICS):
+        got = index.percentile(cohort, metric, own[j], participant)
+        assert np.isclose(got, expected[metric]), (metric, got, expected[metric])
+
+
+def check_distribution(index, cohort, metric):
+    values = index.values(cohort, metric)
+    assert np.all(np.diff(values) >= 0)
+    assert np.allclose(index.quantiles(cohort, metric), np.percentile(values, (5, 25, 50, 75, 95)))
+    counts, edges = index.histogram(cohort, metric, bins=20)
+    expected, expected_edges = np.histogram(values, bins=20)
+    assert np.array_equal(counts, expected) and np.allclose(edges, expected_edges)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--participants', type=int, default=24)
+    parser.add_argument('--days', type=int, default=2)
+    parser.add_argument('--bouts', type=int, default=50)
+    parser.add_argument('--large', type=int, default=200000, help='Participants in the synthetic lookup test')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_root = os.path.join(tmp, 'data')
+        cohort_of = {}
+        for p in range(args.participants):
+            name = f'p{p:03d}'
+            cohort_of[name] = COHORTS[p % len(COHORTS)]
+            write_participant(os.path.join(data_root, name), days=args.days, n_bouts=args.bouts, seed=100 * p,
+                              participant_files=True, cohort=cohort_of[name])
+
+        participant = 'p000'
+        t_naive, expected = timed(lambda: naive_report(data_root, participant, cohort_of))
+        t_build, index = timed(lambda: CohortIndex.build(data_root))
+        check(index, data_root, participant, cohort_of, expected)
+        for cohort in COHORTS:
+            for metric in PEER_METRICS:
+                check_distribution(index, cohort, metric)
+
+        path = os.path.join(tmp, 'cohort_index.npz')
+        t_save, _ = timed(lambda: index.save(path))
+        t_load, loaded = timed(lambda: CohortIndex.load(path))
+        for key, values in index._sorted.items():
+            assert np.array_equal(loaded._sorted[key], values), key
+        assert loaded.participants == index.participants
+
+        # A new day for one participant: only they are read again
+        changed = 'p001'
+        write_day_folder(os.path.join(data_root, changed, '2030-01-01'), '2030-01-01', n_bouts=args.bouts * 4,
+                         seed=999)
+        t_update, counts = timed(lambda: loaded.update(data_root))
+        assert counts == {'added': 0, 'updated': 1, 'removed': 0, 'unchanged': args.participants - 1}, counts
+        t_rebuild, rebuilt = timed(lambda: CohortIndex.build(data_root))
+        for key, values in rebuilt._sorted.items():
+            assert np.allclose(loaded._sorted[key], values), key
+        check(loaded, data_root, changed, cohort_of)
+        assert loaded.update(data_root)['unchanged'] == args.participants
+
+    # Lookups on a large cohort
+    rng = np.random.default_rng(0)
+    large = CohortIndex()
+    values = rng.normal((1.1, 1.2, 95), (0.2, 0.2, 10), (args.large, len(PEER_METRICS)))
+    t_bulk, _ = timed(lambda: large.add_many((f'x{i}', 'PD', row, '') for i, row in enumerate(values)))
+    queries = rng.normal(1.1, 0.2, 10000)
+    t_lookup, ranks = timed(lambda: [large.percentile('PD', 'mws', q) for q in queries])
+    for q, rank in list(zip(queries, ranks))[:50]:
+        assert np.isclose(rank, naive_percentile(values[:, 0], q))
+    t_scan, _ = timed(lambda: [naive_percentile(values[:, 0], q) for q in queries[:100]])
+    t_add, _ = timed(lambda: large.add('new', 'PD', (1.0, 1.0, 90.0)))
+    check_distribution(large, 'PD', 'mws')
+
+    n = args.participants
+    print(f"participants={n} days={args.days} bouts/day={args.bouts}")
+    print(f"naive, one report          {t_naive * 1000:9.1f} ms  (reads {n // len(COHORTS) - 1} peers)")
+    print(f"build index                {t_build * 1000:9.1f} ms  (once)")
+    print(f"save / load                {t_save * 1000:9.2f} / {t_load * 1000:.2f} ms")
+    print(f"update, one changed        {t_update * 1000:9.1f} ms  (full rebuild {t_rebuild * 1000:.1f} ms)")
+    print(f"large cohort n={args.large}: bulk add {t_bulk * 1000:.0f} ms, add one {t_add * 1e6:.0f} us")
+    print(f"  percentile lookup        {t_lookup / len(queries) * 1e6:9.1f} us  "
+          f"(linear scan {t_scan / 100 * 1e6:.0f} us)")
+
+
+if __name__ == '__main__':
+    main()
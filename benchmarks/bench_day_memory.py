@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# Benchmark: memory retained per day by AggregatedResults with the day frames
+# kept (keep_frames=True) vs dropped after aggregation (keep_frames=False), and
+# the hourly figures as a 24x5 array vs the old dict of dicts. Each mode runs
+# in a fresh child process and measures what is still allocated (tracemalloc)
+# after loading. Also checks that dropped frames reload identically.
+#
+#   python benchmarks/bench_day_memory.py [--days 300] [--bouts 200]
+
+import argparse
+import gc
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+
+def deep_size(obj):
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k) + deep_size(v) for k, v in obj.items())
+    return size
+
+
+def child(mode, path, days):
+    from folderresults import AggregatedResults
+
+    # Warm the imports and caches outside the measurement
+    AggregatedResults().add_folder(os.path.join(path, sorted(os.listdir(path))[0]))
+    gc.collect()
+
+    tracemalloc.start()
+    result = AggregatedResults(keep_frames=(mode == 'keep'))
+    result.read_data(path)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"{mode:<6} retained {retained / 1e6:8.2f} MB   {retained / days / 1024:8.1f} KB/day")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=300)
+    parser.add_argument('--bouts', type=int, default=200)
+    parser.add_argument('--child', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], args.child[1], int(args.child[2]))
+        return
+
+    import pandas as pd
+    from folderresults import AggregatedResults
+    from synthetic import write_participant
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_participant(tmp, days=args.days, n_bouts=args.bouts)
+
+        # Dropped frames come back identical on access
+        a = AggregatedResults(keep_frames=False)
+        a.read_data(tmp)
+        kept = AggregatedResults()
+        kept.read_data(tmp)
+        r, k = a.results[0], kept.results[0]
+        assert r.loaded_frame('wb') is None
+        pd.testing.assert_frame_equal(r.wb, k.wb)
+        pd.testing.assert_frame_equal(r.strides, k.strides)
+        pd.testing.assert_frame_equal(a.all_bouts, kept.all_bouts)
+        assert a.results[1].loaded_frame('wb') is None
+
+        hourly_array = k.hourly.nbytes + sys.getsizeof(k.hourly)
+        hourly_dict = deep_size(k.hourly_speed)
+        print(f"days={args.days} bouts/day={args.bouts}")
+        print(f"hourly figures: dict of dicts {hourly_dict} bytes, 24x5 array {hourly_array} bytes")
+
+        for mode in ('keep', 'drop'):
+            subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode, tmp, str(args.days)],
+                           check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# Benchmark: loading a long history from CSV day folders vs a daystore.DayStore.
+# Times the one-off conversion, appending a new day in place,
+# AggregatedResults.read_data (CSV) vs read_store, and a date-range query
+# (store.frame) against parsing the same days' wb.csv. Checks that both load
+# paths give identical summaries.
+#
+#   python benchmarks/bench_daystore.py [--days 365] [--bouts 200]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import daystore
+from folderresults import AggregatedResults
+from schema import WB_SCHEMA
+from schema import read_table
+from synthetic import write_day_folder
+from synthetic import write_participant
+
+SUMMARY = ('mean_cadence', 'mean_walking_speed', 'mean_stride_length',
+           'mean_walking_bout_duration', 'maximum_walking_bout_duration',
+           'mean_daily_walking_time', 'number_sessions', 'number_of_bouts')
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--bouts', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history = os.path.join(tmp, 'history')
+        folders = write_participant(history, days=args.days, n_bouts=args.bouts)
+        store_path = os.path.join(tmp, 'store')
+
+        t_convert, (store, added) = timed(lambda: daystore.convert(history, store_path))
+        assert len(added) == args.days
+
+        new_day = os.path.join(history, '2030-01-01')
+        write_day_folder(new_day, '2030-01-01', n_bouts=args.bouts, seed=999)
+        t_append, _ = timed(lambda: store.append_folder(new_day))
+
+        def load_csv():
+            a = AggregatedResults()
+            a.read_data(history)
+            return a
+        t_csv, from_csv = timed(load_csv)
+
+        # A fresh store object, as a new report process would have
+        def load_store():
+            a = AggregatedResults()
+            a.read_store(daystore.DayStore(store_path))
+            return a
+        t_store, from_store = timed(load_store)
+
+        for name in SUMMARY:
+            assert getattr(from_csv, name) == getattr(from_store, name), name
+
+        # A month of bouts: parse the CSVs vs slice the memory-mapped columns
+        month = [f for f in folders if os.path.basename(f)[:7] == os.path.basename(folders[0])[:7]]
+        t_parse, parsed = timed(lambda: pd.concat([read_table(f + '/wb.csv', WB_SCHEMA) for f in month]))
+        t_slice, sliced = timed(lambda: daystore.DayStore(store_path).frame(
+            'wb', os.path.basename(month[0]), os.path.basename(month[-1])))
+        assert np.array_equal(parsed['duration_s'].to_numpy(), sliced['duration_s'].to_numpy())
+
+    print(f"days={args.days} bouts/day={args.bouts}")
+    print(f"convert (one-off)         {t_convert * 1000:9.1f} ms")
+    print(f"append one day            {t_append * 1000:9.1f} ms")
+    print(f"read_data (CSV)           {t_csv * 1000:9.1f} ms")
+    print(f"read_store                {t_store * 1000:9.1f} ms  ({t_csv / t_store:.1f}x faster)")
+    print(f"{len(month)} days of wb: parse    {t_parse * 1000:9.1f} ms")
+    print(f"{len(month)} days of wb: frame()  {t_slice * 1000:9.1f} ms  ({t_parse / t_slice:.0f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# Benchmark: finding the day folders of an archive with fast_scandir vs
+# discovery.discover_days, cold and with a manifest from a previous run. The
+# tree mixes day folders with unrelated and nested directories. Also checks
+# that only day folders are returned, that the date filter works and that a
+# day added after the manifest was written is picked up.
+#
+#   python benchmarks/bench_discovery.py [--participants 200] [--days 30] [--repeat 3]
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+from datetime import timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from discovery import discover_days
+from folderresults import fast_scandir
+
+
+def write_tree(base, participants, days):
+    # Only metadata.json matters for discovery; the CSVs are left out
+    first = date(2024, 1, 1)
+    expected = []
+    for p in range(participants):
+        for d in range(days):
+            day = (first + timedelta(days=d)).isoformat()
+            folder = os.path.join(base, f'p{p}', day)
+            os.makedirs(os.path.join(folder, 'plots'))
+            with open(os.path.join(folder, 'metadata.json'), 'w') as f:
+                json.dump({'session_day': day, 'session_timestamp': 0}, f)
+            expected.append(folder)
+        os.makedirs(os.path.join(base, f'p{p}', 'raw', 'device'))
+    return expected
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--participants', type=int, default=200)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = os.path.join(tmp, 'archive')
+        expected = write_tree(base, args.participants, args.days)
+        manifest = os.path.join(tmp, 'manifest.json')
+
+        t_scandir, dirs = best_of(lambda: fast_scandir(base), args.repeat)
+        t_cold, days = best_of(lambda: discover_days(base, refresh=True), args.repeat)
+        discover_days(base, manifest=manifest)
+        t_warm, warm = best_of(lambda: discover_days(base, manifest=manifest), args.repeat)
+
+        assert sorted(d.path for d in days) == sorted(expected)
+        assert [d.path for d in warm] == [d.path for d in days]
+        assert all(d.day >= '2024-01-10' for d in discover_days(base, start='2024-01-10', manifest=manifest))
+
+        # A new day arrives; the manifest must not hide it
+        new = os.path.join(base, 'p0', '2030-01-01')
+        os.makedirs(new)
+        with open(os.path.join(new, 'metadata.json'), 'w') as f:
+            json.dump({'session_day': '2030-01-01', 'session_timestamp': 0}, f)
+        assert discover_days(base, start='2030-01-01', manifest=manifest)[0].path == new
+
+    print(f"{args.participants} participants x {args.days} days: {len(dirs)} directories, {len(days)} day folders")
+    print(f"fast_scandir              {t_scandir * 1000:9.1f} ms  ({len(dirs)} folders)")
+    print(f"discover_days (cold)      {t_cold * 1000:9.1f} ms")
+    print(f"discover_days (manifest)  {t_warm * 1000:9.1f} ms  ({t_cold / t_warm:.1f}x faster than cold)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# Benchmark: change-over-time figures for a cohort of participant DMO
+# histories. The per-participant pandas approach (DataFrame of the JSON, then
+# diff/rolling/polyfit per metric) is compared with dmo.DmoHistory and with
+# dmo.cohort_summary over all histories at once; appending a new timepoint to
+# each history is compared with reloading it. Results are checked against the
+# pandas reference.
+#
+#   python benchmarks/bench_dmo.py [--participants 2000] [--timepoints 8]
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import dmo
+from dmo import DMO_METRICS
+
+
+def write_histories(base, participants, timepoints, seed=0):
+    rng = np.random.default_rng(seed)
+    paths = {}
+    for p in range(participants):
+        start = date(2023, 1, 1) + timedelta(days=int(rng.integers(0, 60)))
+        history = []
+        for i in range(timepoints):
+            entry = {
+                'StageName': f'Timepoint {i + 1}',
+                'StageID': 90 + i,
+                'StartDay': (start + timedelta(days=90 * i)).isoformat(),
+                'Days': 7,
+                'PropertyUUID': f'{p:08d}-{i:04d}'
+            }
+            for j, metric in enumerate(DMO_METRICS):
+                # A few missing values, as summary-only assessments leave
+                entry[metric] = None if rng.random() < 0.05 else float(rng.normal(1 + j, 0.1))
+            history.append(entry)
+        paths[str(p)] = os.path.join(base, f'{p}.json')
+        with open(paths[str(p)], 'w') as f:
+            json.dump(history, f)
+    return paths
+
+
+def pandas_summary(path, window):
+    # The straightforward per-participant version
+    with open(path) as f:
+        frame = pd.DataFrame(json.load(f))
+    frame['StartDay'] = pd.to_datetime(frame['StartDay'])
+    frame = frame.sort_values('StartDay', kind='stable').reset_index(drop=True)
+    row = {}
+    for metric in DMO_METRICS:
+        values = frame[metric].astype(float)
+        delta = values.diff()
+        valid = values.dropna()
+        row[metric] = values.iloc[-1]
+        row[f'{metric}__delta'] = delta.iloc[-1]
+        row[f'{metric}__rolling_mean'] = values.rolling(window, min_periods=1).mean().iloc[-1]
+        row[f'{metric}__trend'] = np.polyfit(valid.index, valid.to_numpy(), 1)[0] if len(valid) >= 2 else np.nan
+    return row
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--participants', type=int, default=2000)
+    parser.add_argument('--timepoints', type=int, default=8)
+    args = parser.parse_args()
+    window = dmo.ROLLING_WINDOW
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_histories(tmp, args.participants, args.timepoints)
+
+        t_pandas, reference = timed(lambda: pd.DataFrame.from_dict(
+            {p: pandas_summary(path, window) for p, path in paths.items()}, orient='index'))
+        t_load, histories = timed(lambda: {p: dmo.load_history(path) for p, path in paths.items()})
+        t_each, trends = timed(lambda: {p: h.trend for p, h in histories.items()})
+        t_cohort, summary = timed(lambda: dmo.cohort_summary(histories))
+
+        for metric in DMO_METRICS:
+            for suffix in ('', '__delta', '__trend'):
+                column = metric + suffix
+                assert np.allclose(summary[column].to_numpy(), reference[column].to_numpy(), equal_nan=True), column
+            assert np.allclose([trends[p][metric] for p in paths], reference[metric + '__trend'], equal_nan=True)
+            rolling = [histories[p].rolling_mean[-1, DMO_METRICS.index(metric)] for p in paths]
+            assert np.allclose(rolling, reference[metric + '__rolling_mean'], equal_nan=True)
+
+        # One more timepoint per participant: append vs reload with it
+        rng = np.random.default_rng(1)
+        new = {p: rng.normal(1, 0.1, len(DMO_METRICS)) for p in paths}
+
+        def append():
+            for p, h in histories.items():
+                h.append(new[p], '2030-01-01')
+        t_append, _ = timed(append)
+
+        def reload():
+            reloaded = {}
+            for p, path in paths.items():
+                with open(path) as f:
+                    records = json.load(f)
+                records.append({'StartDay': '2030-01-01', **dict(zip(DMO_METRICS, new[p]))})
+                reloaded[p] = dmo.DmoHistory.from_records(records)
+            return reloaded
+        t_reload, reloaded = timed(reload)
+
+        for p in list(paths)[:100]:
+            a, b = histories[p], reloaded[p]
+            assert np.allclose(a.rolling_mean, b.rolling_mean, equal_nan=True)
+            assert np.allclose(a.pct_change, b.pct_change, equal_nan=True)
+            assert np.allclose(list(a.trend.values()), list(b.trend.values()), equal_nan=True)
+
+    n = args.participants
+    print(f"participants={n} timepoints={args.timepoints}")
+    print(f"pandas per participant     {t_pandas * 1000:9.1f} ms")
+    print(f"DmoHistory load            {t_load * 1000:9.1f} ms  ({t_pandas / t_load:.1f}x faster, trends included)")
+    print(f"  trend dicts              {t_each * 1000:9.1f} ms")
+    print(f"cohort_summary             {t_cohort * 1000:9.1f} ms  (all participants at once)")
+    print(f"append a timepoint         {t_append * 1000:9.1f} ms  ({t_append / n * 1e6:.1f} us/participant)")
+    print(f"reload with the timepoint  {t_reload * 1000:9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
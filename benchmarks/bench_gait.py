@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# Benchmark: per-bout gait variability (CV, left/right asymmetry and
+# percentiles of every stride metric) on a synthetic stride table. The
+# per-bout groupby.apply version is compared with a pandas version using
+# built-in groupby reductions and with gait.bout_gait (segment reductions
+# over the wb_id-sorted strides). Results are checked against both, and the
+# day-level GaitStats merged across days against the concatenated strides.
+#
+#   python benchmarks/bench_gait.py [--strides 1000000,4000000] [--strides-per-bout 40] [--apply-max 1000000]
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import gait
+from gait import GAIT_METRICS
+from gait import PERCENTILES
+from gait import GaitStats
+
+
+def make_strides(n, per_bout, seed=0):
+    rng = np.random.default_rng(seed)
+    wb_id = np.sort(rng.integers(0, max(n // per_bout, 1), n)).astype('int32')
+    frame = pd.DataFrame({
+        'wb_id': wb_id,
+        'lr_label': pd.Categorical.from_codes(rng.integers(0, 2, n), ['left', 'right']),
+        'stride_duration_s': rng.normal(1.1, 0.15, n).astype('float32'),
+        'cadence_spm': rng.normal(100, 8, n).astype('float32'),
+        'stride_length_m': rng.normal(1.3, 0.2, n).astype('float32'),
+        'walking_speed_mps': rng.normal(1.2, 0.25, n).astype('float32')
+    })
+    # A few strides without a cadence
+    frame.loc[rng.random(n) < 0.01, 'cadence_spm'] = np.nan
+    return frame
+
+
+def per_bout(group):
+    # The straightforward per-bout function
+    row = {'n_strides': len(group)}
+    for metric in GAIT_METRICS:
+        values = group[metric].astype(float)
+        row[f'{metric}__cv'] = values.std() / values.mean()
+        left = values[group['lr_label'] == 'left'].mean()
+        right = values[group['lr_label'] == 'right'].mean()
+        row[f'{metric}__asymmetry'] = 100 * abs(left - right) / ((left + right) / 2)
+        for q in PERCENTILES:
+            row[f'{metric}__p{q}'] = values.quantile(q / 100)
+    return pd.Series(row)
+
+
+def grouped(strides):
+    # Built-in groupby reductions, one per figure
+    values = strides[GAIT_METRICS].astype(float).assign(wb_id=strides['wb_id'], lr_label=strides['lr_label'])
+    by_bout = values.groupby('wb_id')
+    columns = {'n_strides': by_bout.size()}
+    sides = values.groupby(['wb_id', 'lr_label'], observed=False)[GAIT_METRICS].mean()
+    for metric in GAIT_METRICS:
+        columns[f'{metric}__cv'] = by_bout[metric].std() / by_bout[metric].mean()
+        left = sides[metric].xs('left', level='lr_label')
+        right = sides[metric].xs('right', level='lr_label')
+        columns[f'{metric}__asymmetry'] = 100 * (left - right).abs() / ((left + right) / 2)
+        for q in PERCENTILES:
+            columns[f'{metric}__p{q}'] = by_bout[metric].quantile(q / 100)
+    return pd.DataFrame(columns)
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, result
+
+
+def check(result, reference):
+    result = result.set_index('wb_id')
+    for column in reference.columns:
+        assert np.allclose(result[column].to_numpy(dtype=float), reference[column].to_numpy(dtype=float),
+                           rtol=1e-9, atol=1e-9, equal_nan=True), column
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--strides', default='1000000,4000000')
+    parser.add_argument('--strides-per-bout', type=int, default=40)
+    parser.add_argument('--apply-max', type=int, default=1000000, help='Skip groupby.apply beyond this many strides')
+    args = parser.parse_args()
+
+    rows = []
+    for n in [int(s) for s in args.strides.split(',')]:
+        strides = make_strides(n, args.strides_per_bout)
+        t_kernel, (result, stats) = timed(lambda: gait.bout_gait(strides))
+        t_grouped, reference = timed(lambda: grouped(strides))
+        check(result, reference)
+
+        t_apply = None
+        if n <= args.apply_max:
+            # groupby.apply at this size takes minutes; time the first 1000 bouts and scale
+            first = strides[strides['wb_id'] < 1000]
+            t_apply, applied = timed(lambda: first.groupby('wb_id')[strides.columns].apply(per_bout))
+            t_apply *= result['wb_id'].nunique() / applied.index.nunique()
+            check(result[result['wb_id'] < 1000], applied)
+
+        # Day-level stats: merged per-day GaitStats vs all strides at once
+        merged = GaitStats()
+        for day in np.array_split(np.arange(n), 7):
+            merged.merge(gait.bout_gait(strides.iloc[day])[1])
+        for metric in GAIT_METRICS:
+            values = strides[metric].astype(float)
+            assert np.isclose(merged.cv(metric), values.std() / values.mean()), metric
+            assert np.isclose(stats.cv(metric), merged.cv(metric)), metric
+            assert np.isclose(stats.asymmetry(metric), merged.asymmetry(metric)), metric
+
+        rows.append((n, len(result), t_apply, t_grouped, t_kernel))
+
+    print(f"{'strides':>9} {'bouts':>7} {'groupby.apply':>14} {'groupby':>9} {'bout_gait':>10}")
+    for n, bouts, t_apply, t_grouped, t_kernel in rows:
+        apply = f"{t_apply:13.1f}s" if t_apply is not None else f"{'skipped':>14}"
+        print(f"{n:>9} {bouts:>7} {apply} {t_grouped:8.2f}s {t_kernel:9.2f}s  "
+              f"({t_grouped / t_kernel:.1f}x vs groupby)")
+
+
+if __name__ == '__main__':
+    main()
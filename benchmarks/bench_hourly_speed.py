@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# Benchmark: vectorized FolderResults timestamp/hour/hourly-speed engine
+# against the original row-by-row implementation on synthetic 10k-bout days.
+#
+#   python benchmarks/bench_hourly_speed.py [--bouts 10000] [--repeat 3]
+
+import argparse
+import math
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from folderresults import FolderResults
+
+
+# Synthetic walking bouts spread across one day at 100 Hz
+def make_bouts(n_bouts, seed=0):
+    rng = np.random.default_rng(seed)
+    day_samples = 24 * 3600 * 100
+    starts = np.sort(rng.integers(0, day_samples - 10000, n_bouts))
+    durations = rng.integers(300, 6000, n_bouts)
+    speed = rng.normal(1.2, 0.3, n_bouts)
+    speed[rng.random(n_bouts) < 0.05] = np.nan
+
+    return pd.DataFrame({
+        'wb_id': np.arange(n_bouts),
+        'start': starts,
+        'end': starts + durations,
+        'n_strides': rng.integers(4, 60, n_bouts),
+        'rule_name': 'max_break',
+        'duration_s': durations / 100.0,
+        'walking_speed_mps': speed,
+    })
+
+
+# The original per-row implementation, kept here as the reference
+def legacy(r):
+    def do_timestamp(x):
+        return datetime.fromtimestamp(((r.start_timestamp) / 1000.0) + (x / 100))
+
+    r.wb['start_times'] = r.wb['start'].copy().apply(do_timestamp)
+    r.wb['end_times'] = r.wb['end'].copy().apply(do_timestamp)
+    r.wb['bout_hour'] = r.wb['start_times'].copy().apply(lambda x: x.hour)
+
+    hourly_speed = {}
+    for i in range(0, 24):
+        hourly_speed[i] = {'strides': 0, 'sum': 0, 'count': 0}
+
+    def do_mean(row):
+        speed = hourly_speed[row['bout_hour']]
+        bs = row['walking_speed_mps']
+        if math.isnan(bs) == False:
+            speed['sum'] = speed['sum'] + bs
+            speed['count'] = speed['count'] + 1
+        strides = row['n_strides']
+        if math.isnan(strides) == False:
+            speed['strides'] = speed['strides'] + strides
+        return row
+
+    r.wb.apply(do_mean, axis=1)
+    for i in range(0, 24):
+        hr = hourly_speed[i]
+        hr['mean'] = hr['sum'] / hr['count'] if hr['count'] != 0 else 0
+    r.hourly_speed = hourly_speed
+
+
+def vectorized(r):
+    r.wb['start_times'] = r.create_timestamps(r.wb['start'])
+    r.wb['end_times'] = r.create_timestamps(r.wb['end'])
+    r.wb['bout_hour'] = r.create_hours_of_day(r.wb['start_times'])
+    r.calculate_hourly_speed()
+
+
+def run(fn, bouts, repeat):
+    best = float('inf')
+    r = None
+    for _ in range(repeat):
+        r = FolderResults()
+        r.start_timestamp = 1733924492427
+        r.wb = bouts.copy()
+        t0 = time.perf_counter()
+        fn(r)
+        best = min(best, time.perf_counter() - t0)
+    return best, r
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bouts', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    bouts = make_bouts(args.bouts)
+    t_legacy, r_legacy = run(legacy, bouts, args.repeat)
+    t_vec, r_vec = run(vectorized, bouts, args.repeat)
+
+    # Same answer from both engines
+    assert (r_legacy.wb['bout_hour'].to_numpy() == r_vec.wb['bout_hour'].to_numpy()).all()
+    for h in range(24):
+        for key in ('strides', 'sum', 'count', 'mean'):
+            assert math.isclose(r_legacy.hourly_speed[h][key], r_vec.hourly_speed[h][key], rel_tol=1e-12)
+
+    print(f"bouts={args.bouts}")
+    print(f"legacy      {t_legacy * 1000:10.2f} ms")
+    print(f"vectorized  {t_vec * 1000:10.2f} ms")
+    print(f"speedup     {t_legacy / t_vec:10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
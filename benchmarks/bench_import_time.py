@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# Import-time budget for the report pipeline modules.
+#
+# Each module is imported in a fresh interpreter under `python -X importtime`
+# and its cumulative import time compared with a budget. It also checks that
+# none of the heavy dependencies (pandas, numpy, matplotlib, jinja2, pdfkit)
+# are imported until they are actually used. Exits non-zero on a breach, so it
+# can gate CI.
+#
+#   python benchmarks/bench_import_time.py [--repeat 5] [--scale 1.0]
+
+import argparse
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Cumulative import time budget per module, in milliseconds
+BUDGETS_MS = {
+    'mobility': 80,
+    'plot_gen': 100,
+    'folderresults': 100,
+    'daycache': 60,
+    'chartcache': 60,
+    'osmutils': 30,
+}
+
+# Must not be imported just by importing a pipeline module
+HEAVY = ['pandas', 'numpy', 'matplotlib', 'matplotlib.pyplot', 'jinja2', 'pdfkit', 'osmclient']
+
+
+def import_time_ms(module):
+    code = (f"import sys, json; import {module}; "
+            f"print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))")
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+
+    cumulative = None
+    for line in proc.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].rstrip() == ' ' + module:
+            cumulative = int(parts[1]) / 1000.0
+    return cumulative, proc.stdout.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply every budget (slow machines)')
+    args = parser.parse_args()
+
+    failed = False
+    for module, budget in BUDGETS_MS.items():
+        best = min(import_time_ms(module)[0] for _ in range(args.repeat))
+        heavy = import_time_ms(module)[1]
+        limit = budget * args.scale
+
+        status = 'ok'
+        if best > limit:
+            status = 'OVER BUDGET'
+            failed = True
+        if heavy != '[]':
+            status = f'EAGER IMPORT {heavy}'
+            failed = True
+        print(f"{module:<14} {best:8.1f} ms  (budget {limit:6.0f} ms)  {status}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# Benchmark: adding one new day to an AggregatedResults incrementally vs
+# rebuilding it from every day folder. Also checks that add_folder/remove_day
+# give the same summary values as a full rebuild.
+#
+#   python benchmarks/bench_incremental.py [--days 60] [--bouts 300]
+
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from folderresults import AggregatedResults
+from synthetic import write_day_folder
+from synthetic import write_participant
+
+
+SUMMARY = ('mean_cadence', 'mean_walking_speed', 'mean_stride_length',
+           'mean_walking_bout_duration', 'maximum_walking_bout_duration',
+           'mean_daily_walking_time', 'number_sessions', 'number_of_bouts')
+
+
+def check_same(a, b):
+    for name in SUMMARY:
+        assert math.isclose(getattr(a, name), getattr(b, name), rel_tol=1e-9), name
+    assert a.earliest_day().day == b.earliest_day().day
+    assert a.last_day().day == b.last_day().day
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--bouts', type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history = os.path.join(tmp, 'history')
+        write_participant(history, days=args.days, n_bouts=args.bouts)
+
+        incremental = AggregatedResults()
+        incremental.read_data(history)
+
+        # A new day arrives
+        new_day = os.path.join(history, '2030-01-01')
+        write_day_folder(new_day, '2030-01-01', n_bouts=args.bouts, seed=999)
+
+        t0 = time.perf_counter()
+        incremental.add_folder(new_day)
+        t_add = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        rebuilt = AggregatedResults()
+        rebuilt.read_data(history)
+        t_rebuild = time.perf_counter() - t0
+        check_same(incremental, rebuilt)
+
+        # ...and is withdrawn again
+        t0 = time.perf_counter()
+        incremental.remove_day('2030-01-01')
+        t_remove = time.perf_counter() - t0
+
+        os.rename(new_day, os.path.join(tmp, 'withdrawn'))
+        rebuilt = AggregatedResults()
+        rebuilt.read_data(history)
+        check_same(incremental, rebuilt)
+
+    print(f"days={args.days} bouts/day={args.bouts}")
+    print(f"full rebuild  {t_rebuild * 1000:10.2f} ms")
+    print(f"add_folder    {t_add * 1000:10.2f} ms")
+    print(f"remove_day    {t_remove * 1000:10.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
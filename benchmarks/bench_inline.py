@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# Benchmark: self-contained report.html for a batch of reports. The naive
+# approach (every local stylesheet, image and script base64-encoded per
+# report, as single-file savers do) is compared with one inliner.Inliner
+# shared by the batch (assets encoded once, unused CSS pruned, charts inlined
+# as minified SVG; charts are processed again for every report, since each
+# report has its own). Both outputs are checked to have no local references
+# left, and the Inliner's to have unique element ids.
+#
+#   python benchmarks/bench_inline.py [--reports 10] [--days 7] [--bouts 200]
+
+import argparse
+import base64
+import mimetypes
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import Counter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, '..')
+sys.path.insert(0, ROOT)
+import mobility
+from inliner import Inliner
+from synthetic import write_participant
+
+COHORT_MAP = {'PD': {'mws': 1.1, 'msl': 1.2, 'mc': 95}}
+REF_RE = re.compile(r'<(?:link|img|script)\b[^>]*\b(?:href|src)\s*=\s*"([^"]*)"', re.I)
+
+
+def naive_inline(html, base_dir):
+    # Every local reference read and base64-encoded again, nothing pruned
+    def encode(match):
+        url = match.group(2)
+        path = os.path.join(base_dir, url)
+        if url.startswith(('http:', 'https:', 'data:', '#')) or not os.path.isfile(path):
+            return match.group(0)
+        with open(path, 'rb') as f:
+            data = base64.b64encode(f.read()).decode('ascii')
+        mime_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        return f'{match.group(1)}"data:{mime_type};base64,{data}"'
+    return re.sub(r'(\b(?:href|src)\s*=\s*)"([^"]*)"', encode, html)
+
+
+def local_refs(html):
+    return [url for url in REF_RE.findall(html) if not url.startswith(('http:', 'https:', 'data:', '#'))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reports', type=int, default=10)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--bouts', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        participant = os.path.join(tmp, 'participant')
+        write_participant(participant, days=args.days, n_bouts=args.bouts, participant_files=True)
+        out = os.path.join(tmp, 'report')
+        os.makedirs(out)
+        mobility.generate_report(participant, out, COHORT_MAP, mobility.load_template(ROOT))
+        with open(os.path.join(out, 'report.html')) as f:
+            html = f.read()
+
+        t0 = time.perf_counter()
+        for _ in range(args.reports):
+            naive = naive_inline(html, out)
+        t_naive = time.perf_counter() - t0
+
+        inliner = Inliner()
+        t0 = time.perf_counter()
+        inlined = inliner.inline(html, out)
+        t_first = time.perf_counter() - t0
+        for _ in range(args.reports - 1):
+            inlined = inliner.inline(html, out)
+        t_shared = time.perf_counter() - t0
+
+    assert not local_refs(naive), local_refs(naive)[:3]
+    assert not local_refs(inlined), local_refs(inlined)[:3]
+    duplicated = [i for i, n in Counter(re.findall(r'\bid="([^"]+)"', inlined)).items() if n > 1]
+    assert not duplicated, duplicated[:3]
+
+    n = args.reports
+    print(f"{n} reports, days={args.days} bouts/day={args.bouts}; report.html {len(html) / 1024:.1f} KB")
+    print(f"naive base64         {t_naive / n * 1000:8.1f} ms/report  {len(naive) / 1024:9.1f} KB")
+    print(f"Inliner, first       {t_first * 1000:8.1f} ms         {len(inlined) / 1024:9.1f} KB")
+    if n > 1:
+        print(f"Inliner, shared      {(t_shared - t_first) / (n - 1) * 1000:8.1f} ms/report"
+              f"  ({t_naive / ((t_shared - t_first) / (n - 1) * n):.1f}x the naive rate once warm)")
+    print(f"batch total: naive {t_naive * 1000:.0f} ms, Inliner {t_shared * 1000:.0f} ms")
+    print(f"memo: {inliner.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# Benchmark: fetching a property history for a cohort with one fresh client
+# set and a single giant page per participant (the old get_properties) vs
+# osmutils.PropertyFetcher (pooled clients, cached lookups, paging, threads).
+# Runs against a local fake OSM client with a fixed per-call latency, and
+# checks both paths return the same values.
+#
+#   python benchmarks/bench_osm_fetch.py [--participants 50] [--values 5000] [--latency 0.02]
+
+import argparse
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import osmutils
+
+
+class FakeOSM:
+    # Shared state behind the fake clients: call counts and per-call latency
+    def __init__(self, values, latency, connect_latency):
+        self.values = values
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.calls = 0
+        self.clients = 0
+        self.lock = threading.Lock()
+
+    def call(self):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.latency)
+
+    def connect(self):
+        with self.lock:
+            self.clients += 1
+        time.sleep(self.connect_latency)
+
+
+class FakeProjectClient:
+    def __init__(self, osm):
+        osm.connect()
+        self.osm = osm
+
+    def getProjectByCode(self, code):
+        self.osm.call()
+        return SimpleNamespace(id=hash(code) & 0xffff, code=code)
+
+    def getParticipantByCode(self, code):
+        self.osm.call()
+        return SimpleNamespace(id=int(code.lstrip('p')), code=code)
+
+    def listParticipantPropertiesInProject(self, project_id, participant_id, property_id, start, count):
+        self.osm.call()
+        stop = min(start + count, self.osm.values)
+        return [(participant_id, i) for i in range(start, stop)]
+
+
+class FakeIoTClient:
+    def __init__(self, osm):
+        osm.connect()
+        self.osm = osm
+
+    def getPropertyDefinitionByName(self, name):
+        self.osm.call()
+        return SimpleNamespace(id=1, name=name)
+
+
+def legacy_fetch(osm, project_code, participant_codes, property_name):
+    # What looping over the old get_properties did
+    out = {}
+    for code in participant_codes:
+        pc = FakeProjectClient(osm)
+        dc = FakeIoTClient(osm)
+        definition = dc.getPropertyDefinitionByName(property_name)
+        project = pc.getProjectByCode(project_code)
+        participant = pc.getParticipantByCode(code)
+        out[code] = pc.listParticipantPropertiesInProject(project.id, participant.id, definition.id, 0, 10000000)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--participants', type=int, default=50)
+    parser.add_argument('--values', type=int, default=5000)
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--connect-latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    codes = [f"p{i}" for i in range(1, args.participants + 1)]
+
+    osm = FakeOSM(args.values, args.latency, args.connect_latency)
+    t0 = time.perf_counter()
+    expected = legacy_fetch(osm, 'MOB', codes, 'dmo')
+    t_legacy = time.perf_counter() - t0
+    legacy_calls, legacy_clients = osm.calls, osm.clients
+
+    osm = FakeOSM(args.values, args.latency, args.connect_latency)
+    pool = osmutils.ClientPool(size=args.workers,
+                               project_client_factory=lambda: FakeProjectClient(osm),
+                               iot_client_factory=lambda: FakeIoTClient(osm))
+    fetcher = osmutils.PropertyFetcher(pool, page_size=args.page_size)
+    t0 = time.perf_counter()
+    values = fetcher.fetch_many('MOB', codes, 'dmo', workers=args.workers)
+    t_batched = time.perf_counter() - t0
+
+    assert list(values) == codes
+    assert values == expected
+
+    print(f"participants={args.participants} values={args.values} page={args.page_size} "
+          f"latency={args.latency * 1000:.0f} ms")
+    print(f"get_properties loop  {t_legacy:8.2f} s  {legacy_calls:5d} calls {legacy_clients:4d} clients")
+    print(f"PropertyFetcher      {t_batched:8.2f} s  {osm.calls:5d} calls {osm.clients:4d} clients"
+          f"  ({t_legacy / t_batched:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# Benchmark: report.pdf from the sample report with pdfkit (one wkhtmltopdf
+# process per report) vs pdfrender's in-process weasyprint backend, both with
+# a new renderer per report and with one renderer reused for a batch (the
+# stylesheet, fonts and static assets set up once). Backends that aren't
+# installed here are reported and skipped; every PDF written is checked.
+#
+#   python benchmarks/bench_pdf.py [--reports 10] [--days 7] [--bouts 200]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, '..')
+sys.path.insert(0, ROOT)
+import mobility
+import pdfrender
+from synthetic import write_participant
+
+COHORT_MAP = {'PD': {'mws': 1.1, 'msl': 1.2, 'mc': 95}}
+
+
+def check_pdf(path):
+    with open(path, 'rb') as f:
+        assert f.read(5) == b'%PDF-', path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reports', type=int, default=10)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--bouts', type=int, default=200)
+    args = parser.parse_args()
+
+    available = pdfrender.available_backends()
+    print(f"available backends: {', '.join(available) or 'none'}")
+    if not available:
+        try:
+            pdfrender.PdfRenderer()
+        except RuntimeError as e:
+            print(f"PdfRenderer(): {e}")
+        else:
+            raise AssertionError('PdfRenderer() without a backend should fail')
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        participant = os.path.join(tmp, 'participant')
+        write_participant(participant, days=args.days, n_bouts=args.bouts, participant_files=True)
+        out = os.path.join(tmp, 'report')
+        os.makedirs(out)
+        mobility.generate_report(participant, out, COHORT_MAP, mobility.load_template(ROOT))
+        html = os.path.join(out, 'report.html')
+        pdfs = [os.path.join(out, f'report{i}.pdf') for i in range(args.reports)]
+
+        results = []
+        if 'pdfkit' in available:
+            renderer = pdfrender.PdfRenderer('pdfkit')
+            t0 = time.perf_counter()
+            for pdf in pdfs:
+                renderer.write_pdf(html, pdf)
+            results.append(('pdfkit (wkhtmltopdf)', time.perf_counter() - t0))
+            for pdf in pdfs:
+                check_pdf(pdf)
+
+        if 'weasyprint' in available:
+            t0 = time.perf_counter()
+            for pdf in pdfs:
+                pdfrender.PdfRenderer('weasyprint').write_pdf(html, pdf)
+            results.append(('weasyprint, new renderer', time.perf_counter() - t0))
+
+            renderer = pdfrender.PdfRenderer('weasyprint')
+            t0 = time.perf_counter()
+            for pdf in pdfs:
+                renderer.write_pdf(html, pdf)
+            results.append(('weasyprint, batch', time.perf_counter() - t0))
+            for pdf in pdfs:
+                check_pdf(pdf)
+
+    print(f"{args.reports} reports, days={args.days} bouts/day={args.bouts}")
+    for name, elapsed in results:
+        print(f"{name:<26} {elapsed:8.2f} s  ({elapsed / args.reports * 1000:8.1f} ms/report)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# Benchmark: cost of the profiling instrumentation. Times a bare span() /
+# profiled() call with profiling off and on, and a full read_data with
+# profiling off, on (spans only) and on with memory tracing. Fails if a
+# disabled span costs more than --budget-ns.
+#
+#   python benchmarks/bench_profiling.py [--days 14] [--bouts 300] [--budget-ns 1000]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import profiling
+from folderresults import AggregatedResults
+from synthetic import write_participant
+
+
+def per_call_ns(stmt, number=200000):
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e9
+
+
+def span_costs():
+    def with_span():
+        with profiling.span('x'):
+            pass
+
+    @profiling.profiled('y')
+    def decorated():
+        pass
+
+    def bare():
+        pass
+
+    base = per_call_ns(bare)
+    return per_call_ns(with_span) - base, per_call_ns(decorated) - base
+
+
+def load(path):
+    t0 = time.perf_counter()
+    AggregatedResults().read_data(path)
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--bouts', type=int, default=300)
+    parser.add_argument('--budget-ns', type=float, default=1000)
+    args = parser.parse_args()
+
+    profiling.disable()
+    off_span, off_decorated = span_costs()
+    profiling.configure()
+    on_span, on_decorated = span_costs()
+    profiling.disable()
+
+    print(f"{'':<12} {'span()':>10} {'@profiled':>10}   (ns per call)")
+    print(f"{'disabled':<12} {off_span:10.0f} {off_decorated:10.0f}")
+    print(f"{'enabled':<12} {on_span:10.0f} {on_decorated:10.0f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_participant(tmp, days=args.days, n_bouts=args.bouts)
+        load(tmp)
+
+        t_off = min(load(tmp) for _ in range(3))
+        profiling.configure()
+        t_on = min(load(tmp) for _ in range(3))
+        profiling.configure(memory=True)
+        t_mem = load(tmp)
+        profiling.disable()
+
+    print(f"read_data days={args.days} bouts/day={args.bouts}")
+    print(f"  profiling off     {t_off * 1000:9.1f} ms")
+    print(f"  spans             {t_on * 1000:9.1f} ms  (+{(t_on / t_off - 1) * 100:.1f}%)")
+    print(f"  spans + memory    {t_mem * 1000:9.1f} ms  (+{(t_mem / t_off - 1) * 100:.1f}%)")
+
+    if max(off_span, off_decorated) > args.budget_ns:
+        print(f"disabled instrumentation over budget ({args.budget_ns:.0f} ns)")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
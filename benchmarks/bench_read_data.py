@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# Benchmark: serial vs parallel AggregatedResults.read_data as the number of
+# day folders grows.
+#
+#   python benchmarks/bench_read_data.py [--days 8 32 128] [--bouts 500] [--workers 4]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from folderresults import AggregatedResults
+from synthetic import write_participant
+
+
+def timed_read(path, **kwargs):
+    result = AggregatedResults()
+    t0 = time.perf_counter()
+    result.read_data(path, **kwargs)
+    return time.perf_counter() - t0, result
+
+
+def check_same(a, b):
+    assert [r.day for r in a.results] == [r.day for r in b.results]
+    pd.testing.assert_frame_equal(a.all_bouts, b.all_bouts)
+    pd.testing.assert_frame_equal(a.all_strides, b.all_strides)
+    for name in ('mean_cadence', 'mean_walking_speed', 'mean_stride_length',
+                 'mean_walking_bout_duration', 'maximum_walking_bout_duration',
+                 'mean_daily_walking_time', 'number_sessions', 'number_of_bouts'):
+        assert getattr(a, name) == getattr(b, name), name
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, nargs='+', default=[8, 32, 128])
+    parser.add_argument('--bouts', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    print(f"{'days':>6} {'serial':>10} {'thread':>10} {'process':>10}")
+    for days in args.days:
+        with tempfile.TemporaryDirectory() as tmp:
+            write_participant(tmp, days=days, n_bouts=args.bouts)
+
+            t_serial, serial = timed_read(tmp)
+            t_thread, threaded = timed_read(tmp, workers=args.workers, executor='thread')
+            t_process, processed = timed_read(tmp, workers=args.workers, executor='process')
+            check_same(serial, threaded)
+            check_same(serial, processed)
+
+        print(f"{days:>6} {t_serial:>9.2f}s {t_thread:>9.2f}s {t_process:>9.2f}s")
+
+
+if __name__ == '__main__':
+    main()
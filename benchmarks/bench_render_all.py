@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# Benchmark: rendering a batch of report charts serially vs with
+# plot_gen.render_all on warmed-up worker processes.
+#
+#   python benchmarks/bench_render_all.py [--reports 4] [--workers 4]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import plot_gen
+
+
+# The six charts of one report
+def report_specs(out_dir, seed):
+    rng = np.random.default_rng(seed)
+    line = pd.DataFrame({'Capture Day': [1, 2, 3, 4, 5], 'Walking Speed (m/sec)': rng.uniform(0.4, 0.6, 5)}).set_index('Capture Day')
+    specs = [
+        dict(kind='save_plot', data=line, plot_type='line', xlabel='Assessment Number',
+             ylabel='Walking Speed (m/sec)', title='Change in Walking Speed', filename=os.path.join(out_dir, 'dmo.svg')),
+        dict(kind='save_plot', data=line * 60, plot_type='line', xlabel='Assessment Number',
+             ylabel='Longest Bout (s)', title='Change in Longest Walking Bouts', filename=os.path.join(out_dir, 'wbd.svg')),
+    ]
+    for name in ('peer_ws', 'peer_msl', 'peer_mcad'):
+        bar = pd.DataFrame(rng.uniform(0.8, 1.4, 2), columns=['Value'], index=['800', 'PD'])
+        specs.append(dict(kind='save_plot', data=bar, plot_type='bar', xlabel='', ylabel='Mean Value',
+                          title='Peer Comparison', filename=os.path.join(out_dir, name + '.svg')))
+    specs.append(dict(kind='plot_bar_multiple', data_list=rng.uniform(0, 40, (7, 24)).tolist(),
+                      labels=[f'Day {i}' for i in range(7)], ylabel='Minutes of activity',
+                      title='Activity Levels by Session', filename=os.path.join(out_dir, 'hourly_steps.svg')))
+    return specs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reports', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        specs = []
+        for i in range(args.reports):
+            specs.extend(report_specs(tmp, i))
+
+        t0 = time.perf_counter()
+        plot_gen.render_all(specs)
+        t_serial = time.perf_counter() - t0
+
+        # Pool start-up is paid once per batch, so time it separately
+        t0 = time.perf_counter()
+        with plot_gen.make_executor(args.workers) as pool:
+            plot_gen.render_all(specs[:args.workers], executor=pool)
+            t_startup = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            plot_gen.render_all(specs, executor=pool)
+            t_pool = time.perf_counter() - t0
+
+    print(f"charts={len(specs)} workers={args.workers}")
+    print(f"serial        {t_serial:8.2f}s")
+    print(f"pool startup  {t_startup:8.2f}s")
+    print(f"pool          {t_pool:8.2f}s  ({t_serial / t_pool:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
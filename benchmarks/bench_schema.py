@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# Benchmark: parse time and in-memory size of wb.csv/stride.csv with bare
+# pd.read_csv (type inference, float64/object) vs schema.read_table.
+#
+#   python benchmarks/bench_schema.py [--bouts 5000] [--strides 40] [--repeat 3]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import schema
+from synthetic import write_day_folder
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    frame = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        frame = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, frame.memory_usage(deep=True).sum() / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bouts', type=int, default=5000)
+    parser.add_argument('--strides', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    engines = ['c'] + (['pyarrow'] if schema.DEFAULT_ENGINE == 'pyarrow' else [])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_day_folder(tmp, '2024-12-01', n_bouts=args.bouts, strides_per_bout=args.strides)
+
+        for name, table in (('wb.csv', schema.WB_SCHEMA), ('stride.csv', schema.STRIDE_SCHEMA)):
+            path = os.path.join(tmp, name)
+            rows = sum(1 for _ in open(path)) - 1
+            print(f"{name} ({rows} rows)")
+
+            t_bare, mb_bare = best_of(lambda: pd.read_csv(path), args.repeat)
+            print(f"  {'read_csv':<20} {t_bare * 1000:9.1f} ms {mb_bare:9.2f} MB")
+            for engine in engines:
+                t, mb = best_of(lambda: schema.read_table(path, table, engine=engine), args.repeat)
+                print(f"  {'schema/' + engine:<20} {t * 1000:9.1f} ms {mb:9.2f} MB"
+                      f"  ({t_bare / t:.1f}x faster, {mb_bare / mb:.1f}x smaller)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# Benchmark: reports for many participants generated one after the other with
+# mobility.generate_report vs queued on service.ReportService (warm template
+# and cohorts, loading on threads, charts on a process pool). Every report is
+# requested twice, so half the submissions must be deduplicated. Also checks
+# the HTTP endpoint (POST /reports with wait, GET /metrics) and that the
+# directory watcher queues a participant when a new day arrives.
+#
+#   python benchmarks/bench_service.py [--participants 8] [--days 7] [--bouts 200]
+#                                      [--concurrency 2] [--render-workers 2]
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, '..')
+sys.path.insert(0, ROOT)
+import mobility
+from service import DirectoryWatcher
+from service import HttpFrontend
+from service import ReportService
+from synthetic import write_day_folder
+from synthetic import write_participant
+
+COHORT_MAP = {'PD': {'mws': 1.1, 'msl': 1.2, 'mc': 95}}
+
+
+async def http_request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+
+async def run_service(args, data_root, out, cohorts_path, participants):
+    service = ReportService(data_root, out, cohorts_path=cohorts_path, searchpath=ROOT, concurrency=args.concurrency,
+                            render_workers=args.render_workers)
+    t0 = time.perf_counter()
+    await service.start()
+    t_start = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    jobs = [service.submit(p) for p in participants] + [service.submit(p) for p in participants]
+    await asyncio.gather(*[job.future for job in jobs])
+    t_jobs = time.perf_counter() - t0
+
+    metrics = service.metrics()
+    assert metrics['jobs']['completed'] == len(participants), metrics['jobs']
+    assert metrics['jobs']['deduplicated'] == len(participants), metrics['jobs']
+    for p in participants:
+        assert os.path.exists(os.path.join(out, p, 'report.html'))
+
+    # HTTP front end
+    frontend = HttpFrontend(service, port=0)
+    await frontend.start()
+    status, job = await http_request(frontend.port, 'POST', '/reports',
+                                     {'participant': participants[0], 'start': '2024-12-02', 'wait': True})
+    assert status == 200 and job['status'] == 'done', job
+    assert os.path.exists(os.path.join(job['output_dir'], 'report.html'))
+    status, _ = await http_request(frontend.port, 'POST', '/reports', {'participant': '../etc'})
+    assert status == 400
+    status, http_metrics = await http_request(frontend.port, 'GET', '/metrics')
+    assert status == 200 and http_metrics['jobs']['completed'] == len(participants) + 1
+
+    # Directory watch: a new day for one participant gets it reported
+    watcher = DirectoryWatcher(service, interval=0.2)
+    watch = asyncio.create_task(watcher.run())
+    await asyncio.sleep(0.3)
+    new_day = os.path.join(data_root, participants[-1], '2030-01-01')
+    write_day_folder(new_day, '2030-01-01', n_bouts=args.bouts, seed=99)
+    deadline = time.monotonic() + 30
+    while not any(j.source == 'watch' and j.finished for j in service.jobs.values()):
+        assert time.monotonic() < deadline, 'watcher did not queue the new day'
+        await asyncio.sleep(0.1)
+    watched = [j for j in service.jobs.values() if j.source == 'watch']
+    assert [j.participant for j in watched] == [participants[-1]] and watched[0].error is None
+    watch.cancel()
+
+    await frontend.stop()
+    await service.stop()
+    return t_start, t_jobs, service.metrics()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--participants', type=int, default=8)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--bouts', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=2)
+    parser.add_argument('--render-workers', type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_root = os.path.join(tmp, 'data')
+        participants = [f'p{i + 1}' for i in range(args.participants)]
+        for i, p in enumerate(participants):
+            write_participant(os.path.join(data_root, p), days=args.days, n_bouts=args.bouts, seed=1000 * i,
+                              participant_files=True, participant_id=str(800 + i))
+        cohorts_path = os.path.join(tmp, 'cohorts.json')
+        with open(cohorts_path, 'w') as f:
+            json.dump(COHORT_MAP, f)
+
+        # One after the other, as repeated `python mobility.py` runs would
+        t0 = time.perf_counter()
+        template = mobility.load_template(ROOT)
+        for p in participants:
+            out = os.path.join(tmp, 'serial', p)
+            os.makedirs(out)
+            mobility.generate_report(os.path.join(data_root, p), out, COHORT_MAP, template)
+        t_serial = time.perf_counter() - t0
+
+        t_start, t_jobs, metrics = asyncio.run(
+            run_service(args, data_root, os.path.join(tmp, 'service'), cohorts_path, participants))
+
+    n = args.participants
+    print(f"participants={n} days={args.days} bouts/day={args.bouts} "
+          f"concurrency={args.concurrency} render workers={args.render_workers}")
+    print(f"serial generate_report    {t_serial:8.2f} s  ({n / t_serial:.2f} reports/s)")
+    print(f"service start (warm-up)   {t_start:8.2f} s")
+    print(f"service, {2 * n} requests      {t_jobs:8.2f} s  ({n / t_jobs:.2f} reports/s, "
+          f"{metrics['jobs']['deduplicated']} deduplicated)")
+    for name, stats in metrics['latency'].items():
+        print(f"  {name:<6} p50 {stats['p50']:7.3f}s  p95 {stats['p95']:7.3f}s  max {stats['max']:7.3f}s")
+
+
+if __name__ == '__main__':
+    main()
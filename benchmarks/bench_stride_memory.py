@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# Benchmark: peak RSS of AggregatedResults.read_data with stride tables held in
+# memory (and concatenated into all_strides) vs stream_strides=True.
+#
+# Each mode runs in a fresh child process so peak RSS is not shared.
+#
+#   python benchmarks/bench_stride_memory.py [--days 30] [--bouts 1000] [--strides 40]
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+
+def child(mode, path):
+    from folderresults import AggregatedResults
+
+    t0 = time.perf_counter()
+    result = AggregatedResults()
+    if mode == 'in-memory':
+        result.read_data(path)
+        strides = len(result.all_strides)
+    else:
+        result.read_data(path, stream_strides=True)
+        strides = result.stride_summary.strides
+    elapsed = time.perf_counter() - t0
+
+    # ru_maxrss is in kilobytes on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:<10} strides={strides:<10} peak RSS {peak_mb:8.1f} MB  time {elapsed:6.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--bouts', type=int, default=1000)
+    parser.add_argument('--strides', type=int, default=40, help='Mean strides per bout')
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    from synthetic import write_participant
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_participant(tmp, days=args.days, n_bouts=args.bouts, strides_per_bout=args.strides)
+        for mode in ('in-memory', 'streaming'):
+            subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode, tmp], check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# Benchmark: AggregatedResults.read_data from the bouts and strides vs
+# summary_only=True, which combines the days' aggregated.csv. Checks that the
+# summary figures (and the merged duration/cadence std) agree with the full
+# path, and that asking for a metric aggregated.csv lacks falls back to wb.csv.
+#
+#   python benchmarks/bench_summary_load.py [--days 60] [--bouts 300]
+
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from folderresults import AGGREGATED_METRICS
+from folderresults import AggregatedResults
+from synthetic import write_participant
+
+
+def timed(**options):
+    def run(path):
+        t0 = time.perf_counter()
+        a = AggregatedResults()
+        a.read_data(path, **options)
+        return a, time.perf_counter() - t0
+    return run
+
+
+def check_close(full, summary, metrics):
+    for name in metrics:
+        # wb.csv is parsed as float32, aggregated.csv as float64
+        assert math.isclose(getattr(full, name), getattr(summary, name), rel_tol=1e-6), \
+            (name, getattr(full, name), getattr(summary, name))
+    for col in ('duration_s', 'cadence_spm'):
+        assert math.isclose(full.bout_stats.std(col), summary.bout_stats.std(col), rel_tol=1e-6), col
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--bouts', type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_participant(tmp, days=args.days, n_bouts=args.bouts)
+
+        full, t_full = timed()(tmp)
+        summary, t_summary = timed(summary_only=True, metrics=AGGREGATED_METRICS)(tmp)
+        check_close(full, summary, AGGREGATED_METRICS)
+        assert all(r.wb is None and r.strides is None for r in summary.results)
+        assert math.isnan(summary.mean_walking_speed)
+
+        fallback, t_fallback = timed(summary_only=True)(tmp)
+        check_close(full, fallback, ['mean_walking_speed', 'mean_stride_length',
+                                     'maximum_walking_bout_duration'] + AGGREGATED_METRICS)
+        assert all(r.strides is None for r in fallback.results)
+
+    print(f"days={args.days} bouts/day={args.bouts}")
+    print(f"full (wb + strides)         {t_full * 1000:9.1f} ms")
+    print(f"summary_only (wb fallback)  {t_fallback * 1000:9.1f} ms  ({t_full / t_fallback:.1f}x faster)")
+    print(f"summary_only (aggregated)   {t_summary * 1000:9.1f} ms  ({t_full / t_summary:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# Benchmark suite for the report pipeline on synthetic data.
+#
+# Times FolderResults.read_folder, AggregatedResults.read_data, the plot_gen
+# chart functions and a full report (mobility.generate_report, i.e. what
+# mobility.main runs) at a configurable scale. Results can be saved as a JSON
+# baseline and later runs compared against it: the suite exits non-zero if
+# any case got slower than the baseline by more than --threshold.
+#
+#   python benchmarks/suite.py [--days 14] [--bouts 300] [--strides 8] [--repeat 5] [--filter read_]
+#                              [--save baseline.json] [--compare baseline.json] [--threshold 0.25]
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import pandas as pd
+
+import mobility
+import plot_gen
+from folderresults import AggregatedResults
+from folderresults import FolderResults
+from synthetic import write_participant
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+COHORT_MAP = {'PD': {'mws': 1.1, 'msl': 1.2, 'mc': 95}}
+
+# name -> function(ctx) returning the callable to time
+CASES = {}
+
+
+def case(name):
+    def register(func):
+        CASES[name] = func
+        return func
+    return register
+
+
+@case('read_folder')
+def bench_read_folder(ctx):
+    folder = os.path.join(ctx['participant'], sorted(d for d in os.listdir(ctx['participant']) if d[:1].isdigit())[0])
+    return lambda: FolderResults().read_folder(folder)
+
+
+@case('read_data')
+def bench_read_data(ctx):
+    return lambda: AggregatedResults().read_data(ctx['participant'])
+
+
+@case('save_plot.bar')
+def bench_save_plot_bar(ctx):
+    data = pd.DataFrame([1.02, 1.1], columns=['Walking Speed'], index=['800', 'PD'])
+    filename = os.path.join(ctx['out'], 'bar.svg')
+    return lambda: plot_gen.save_plot(data, 'bar', '', 'Mean Walking Speed (m/s)', 'Peer Comparison', filename)
+
+
+@case('save_plot.line')
+def bench_save_plot_line(ctx):
+    data = pd.DataFrame({'Walking Speed (m/sec)': [0.52, 0.50, 0.47, 0.49, 0.48]}, index=[1, 2, 3, 4, 5])
+    filename = os.path.join(ctx['out'], 'line.svg')
+    return lambda: plot_gen.save_plot(data, 'line', 'Assessment Number', 'Walking Speed (m/sec)', 'Change', filename)
+
+
+@case('plot_bar_multiple')
+def bench_plot_bar_multiple(ctx):
+    days = min(ctx['args'].days, 7)
+    data = [[float((h * 7 + d) % 40) for h in range(24)] for d in range(days)]
+    labels = [f'Session {d + 1}' for d in range(days)]
+    filename = os.path.join(ctx['out'], 'multi.svg')
+    return lambda: plot_gen.plot_bar_multiple(data, labels, 'Minutes of activity', 'Activity', filename)
+
+
+@case('report')
+def bench_report(ctx):
+    template = mobility.load_template(ROOT)
+    out = os.path.join(ctx['out'], 'report')
+    os.makedirs(out, exist_ok=True)
+    return lambda: mobility.generate_report(ctx['participant'], out, COHORT_MAP, template)
+
+
+def run_case(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {'min': min(times), 'median': statistics.median(times), 'repeat': repeat}
+
+
+def compare(results, baseline, threshold):
+    # Compares the best-of-repeat times; returns the names that regressed
+    regressed = []
+    print(f"\n{'case':<20} {'baseline':>10} {'now':>10} {'change':>8}")
+    for name, r in results.items():
+        if name not in baseline['results']:
+            print(f"{name:<20} {'-':>10} {r['min'] * 1000:8.1f}ms {'new':>8}")
+            continue
+        before = baseline['results'][name]['min']
+        change = r['min'] / before - 1
+        flag = ''
+        if change > threshold:
+            regressed.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<20} {before * 1000:8.1f}ms {r['min'] * 1000:8.1f}ms {change * 100:+7.1f}%{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--bouts', type=int, default=300)
+    parser.add_argument('--strides', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--filter', default='', help='Only run cases whose name contains this')
+    parser.add_argument('--save', default=None, help='Write the results to this JSON file')
+    parser.add_argument('--compare', default=None, help='Baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed slowdown (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    scale = {'days': args.days, 'bouts': args.bouts, 'strides': args.strides}
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline['meta']['scale'] != scale:
+            print(f"Baseline was recorded at scale {baseline['meta']['scale']}, not {scale}")
+            sys.exit(2)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        participant = os.path.join(tmp, 'participant')
+        write_participant(participant, days=args.days, n_bouts=args.bouts, strides_per_bout=args.strides,
+                          participant_files=True)
+        ctx = {'args': args, 'participant': participant, 'out': os.path.join(tmp, 'out')}
+        os.makedirs(ctx['out'])
+
+        print(f"days={args.days} bouts/day={args.bouts} strides/bout={args.strides} repeat={args.repeat}")
+        for name, setup in CASES.items():
+            if args.filter not in name:
+                continue
+            results[name] = run_case(setup(ctx), args.repeat)
+            print(f"{name:<20} min {results[name]['min'] * 1000:9.1f} ms   median {results[name]['median'] * 1000:9.1f} ms")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'meta': {
+                    'scale': scale,
+                    'python': platform.python_version(),
+                    'machine': platform.machine(),
+                    'date': datetime.now().isoformat(timespec='seconds')
+                },
+                'results': results
+            }, f, indent=1)
+        print(f"Saved to {args.save}")
+
+    if baseline is not None:
+        regressed = compare(results, baseline, args.threshold)
+        if regressed:
+            print(f"{len(regressed)} case(s) slower than baseline by more than {args.threshold * 100:.0f}%")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+# Synthetic participant data for the benchmarks. Writes day folders laid out
+# like the real sample in ./test/ (wb.csv, stride.csv, mask.csv,
+# aggregated.csv, metadata.json) plus the participant-level form.json,
+# cohort.json and dmo_history.json that mobility.generate_report reads.
+#
+#   python benchmarks/synthetic.py OUT_DIR [--participants 1] [--days 7] [--bouts 200] [--strides 8]
+
+import argparse
+import json
+import os
+from datetime import date
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+import numpy as np
+import pandas as pd
+
+
+SAMPLE_RATE = 100
+
+
+def write_day_folder(folder, day, n_bouts=200, strides_per_bout=8, seed=0):
+    rng = np.random.default_rng(seed)
+    os.makedirs(folder, exist_ok=True)
+
+    # Bouts spread through the waking day, strides laid end to end inside them
+    n_strides = rng.poisson(strides_per_bout, n_bouts).clip(4, None)
+    stride_samples = rng.integers(90, 170, n_strides.sum())
+    bout_of_stride = np.repeat(np.arange(n_bouts), n_strides)
+
+    bout_lengths = np.bincount(bout_of_stride, weights=stride_samples, minlength=n_bouts).astype('int64')
+    gaps = rng.integers(200, 30000, n_bouts)
+    starts = 7 * 3600 * SAMPLE_RATE + np.cumsum(gaps) + np.concatenate([[0], np.cumsum(bout_lengths)[:-1]])
+    ends = starts + bout_lengths
+
+    first_stride = np.concatenate([[0], np.cumsum(n_strides)[:-1]])
+    offset_in_bout = np.cumsum(stride_samples) - np.repeat(np.cumsum(stride_samples)[first_stride], n_strides)
+    stride_starts = starts[bout_of_stride] + offset_in_bout
+    stride_duration = stride_samples / SAMPLE_RATE
+    stride_length = rng.normal(1.3, 0.25, len(stride_samples)).clip(0.3, None)
+
+    strides = pd.DataFrame({
+        'wb_id': bout_of_stride,
+        's_id': [f'{b}_{i}' for b, i in zip(bout_of_stride, range(len(bout_of_stride)))],
+        'original_gs_id': bout_of_stride + 1,
+        'start': stride_starts,
+        'end': stride_starts + stride_samples,
+        'lr_label': np.where(np.arange(len(stride_samples)) % 2 == 0, 'left', 'right'),
+        'stride_duration_s': stride_duration,
+        'cadence_spm': 120.0 / stride_duration,
+        'stride_length_m': stride_length,
+        'walking_speed_mps': stride_length / stride_duration,
+    })
+    strides.to_csv(os.path.join(folder, 'stride.csv'), index=False)
+
+    per_bout = strides.groupby('wb_id')[['stride_duration_s', 'cadence_spm', 'stride_length_m', 'walking_speed_mps']].mean()
+    wb = pd.DataFrame({
+        'wb_id': np.arange(n_bouts),
+        'start': starts,
+        'end': ends,
+        'n_strides': n_strides,
+        'rule_name': 'max_break',
+        'duration_s': bout_lengths / SAMPLE_RATE,
+    })
+    wb = wb.join(per_bout, on='wb_id')
+    wb.to_csv(os.path.join(folder, 'wb.csv'), index=False)
+    write_mask(folder, wb)
+    write_aggregated(folder, wb)
+
+    midnight = datetime.fromisoformat(day).replace(tzinfo=timezone.utc)
+    metadata = {
+        'cohort': 'PD',
+        'session_timezone': 'GMT',
+        'session_timestamp': int(midnight.timestamp() * 1000),
+        'session_day': day,
+    }
+    with open(os.path.join(folder, 'metadata.json'), 'w') as f:
+        json.dump(metadata, f, indent=1)
+
+
+# mask.csv: which per-bout values passed the pipeline's plausibility checks.
+# Like the real files, only the stride metric columns are filled in.
+def write_mask(folder, wb):
+    mask = pd.DataFrame({'wb_id': wb['wb_id']})
+    for col in ('start', 'end', 'n_strides', 'rule_name', 'rule_obj', 'duration_s'):
+        mask[col] = None
+    mask['stride_duration_s'] = wb['stride_duration_s'].between(0.2, 3.0)
+    mask['cadence_spm'] = wb['cadence_spm'].between(30, 200)
+    mask['stride_length_m'] = wb['stride_length_m'].between(0.15, 2.5)
+    mask['walking_speed_mps'] = wb['walking_speed_mps'].between(0.1, 2.0)
+    mask.to_csv(os.path.join(folder, 'mask.csv'), index=False)
+
+
+# aggregated.csv as the pipeline writes it: '__avg' is the mean except for bout
+# duration (median), '__max' of bout duration is the 90th percentile, and
+# '__var' is the coefficient of variation (std / mean).
+def write_aggregated(folder, wb):
+    def cv(values):
+        return values.std() / values.mean() if len(values) > 1 else np.nan
+
+    duration = wb['duration_s']
+    row = {
+        'wb_all__count': len(wb),
+        'total_walking_duration_h': duration.sum() / 3600,
+        'wb_all__duration_s__avg': duration.median(),
+        'wb_all__duration_s__max': duration.quantile(0.9),
+        'wb_all__duration_s__var': cv(duration),
+        'wb_all__cadence_spm__avg': wb['cadence_spm'].mean(),
+        'wb_all__stride_duration_s__avg': wb['stride_duration_s'].mean(),
+        'wb_all__cadence_spm__var': cv(wb['cadence_spm']),
+        'wb_all__stride_duration_s__var': cv(wb['stride_duration_s']),
+    }
+
+    mid = wb[(duration >= 10) & (duration < 30)]
+    row['wb_10_30__count'] = len(mid)
+    row['wb_10_30__walking_speed_mps__avg'] = mid['walking_speed_mps'].mean()
+    row['wb_10_30__stride_length_m__avg'] = mid['stride_length_m'].mean()
+    row['wb_10__count'] = int((duration >= 10).sum())
+    row['wb_10__walking_speed_mps__max'] = wb.loc[duration >= 10, 'walking_speed_mps'].max()
+    row['wb_30__count'] = int((duration >= 30).sum())
+    row['wb_60__count'] = int((duration >= 60).sum())
+
+    pd.DataFrame([row], index=['all_wbs']).to_csv(os.path.join(folder, 'aggregated.csv'))
+
+
+# participant_files: also write form.json, cohort.json and dmo_history.json
+# (needed by mobility.generate_report, not by AggregatedResults)
+def write_participant(base_path, days=7, n_bouts=200, strides_per_bout=8, first_day='2024-12-01', seed=0,
+                      participant_files=False, participant_id='800', cohort='PD'):
+    start = date.fromisoformat(first_day)
+    folders = []
+    for i in range(days):
+        day = (start + timedelta(days=i)).isoformat()
+        folder = os.path.join(base_path, day)
+        write_day_folder(folder, day, n_bouts=n_bouts, strides_per_bout=strides_per_bout, seed=seed + i)
+        folders.append(folder)
+
+    if participant_files:
+        write_participant_files(base_path, first_day, participant_id, cohort, seed)
+    return folders
+
+
+def write_participant_files(base_path, first_day='2024-12-01', participant_id='800', cohort='PD', seed=0,
+                            assessments=5):
+    rng = np.random.default_rng(seed)
+    with open(os.path.join(base_path, 'form.json'), 'w') as f:
+        json.dump({'participantId': participant_id, 'formName': 'Axivity'}, f, indent=4)
+    with open(os.path.join(base_path, 'cohort.json'), 'w') as f:
+        json.dump({'cohort': cohort}, f)
+
+    # One entry per earlier assessment, 90 days apart
+    start = date.fromisoformat(first_day)
+    history = []
+    for i in range(assessments):
+        history.append({
+            'StageName': f'Timepoint {i + 1}',
+            'StartDay': (start - timedelta(days=90 * (assessments - i))).isoformat(),
+            'Days': 7,
+            'MeanWalkingSpeed': float(rng.normal(1.2, 0.1)),
+            'MeanStrideLength': float(rng.normal(1.3, 0.1)),
+            'MeanCadence': float(rng.normal(100, 5)),
+            'MeanWalkingBoutDuration': float(rng.normal(20, 3)),
+            'MaximumWalkingBoutDuration': float(rng.normal(120, 20)),
+        })
+    with open(os.path.join(base_path, 'dmo_history.json'), 'w') as f:
+        json.dump(history, f, indent=4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write synthetic participant data.')
+    parser.add_argument('out')
+    parser.add_argument('--participants', type=int, default=1)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--bouts', type=int, default=200)
+    parser.add_argument('--strides', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for i in range(args.participants):
+        path = os.path.join(args.out, f'p{i + 1}') if args.participants > 1 else args.out
+        write_participant(path, days=args.days, n_bouts=args.bouts, strides_per_bout=args.strides,
+                          seed=args.seed + 1000 * i, participant_files=True, participant_id=str(800 + i))
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
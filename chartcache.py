@@ -0,0 +1,151 @@
+# Content-addressed cache of rendered charts.
+#
+# A chart is keyed on a hash of everything that affects how it looks: the plot
+# function, the data values (including index and column labels) and every
+# styling argument. On a hit the previously rendered file is linked or copied
+# to the requested filename and matplotlib is never invoked. Peer bars and DMO
+# history charts only change when cohorts.json / dmo_history.json do, so most
+# of them are hits from one report run to the next.
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+from lazyimport import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+matplotlib = lazy_import('matplotlib')
+
+
+# Bump when plot_gen styling changes so stale renders are not reused
+CACHE_VERSION = 1
+
+
+class ChartCache:
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024, max_entries=10000, link=False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.link = link
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, kind, params):
+        h = hashlib.sha1()
+        _hash_value(h, (CACHE_VERSION, matplotlib.__version__, kind))
+        _hash_value(h, params)
+        return h.hexdigest()
+
+    def entry_path(self, key, filename):
+        return os.path.join(self.cache_dir, key + os.path.splitext(filename)[1])
+
+    # Write the cached chart to 'filename'. Returns False on a miss. The cache
+    # is shared between threads and processes, so an entry can be evicted by
+    # someone else at any point; that is a miss too.
+    def get(self, key, filename):
+        path = self.entry_path(key, filename)
+        try:
+            _place(path, filename, self.link)
+            # Touch the entry so eviction is least-recently-used
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def put(self, key, filename):
+        path = self.entry_path(key, filename)
+        # A temp file of our own, so concurrent puts of one key don't collide
+        fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+        os.close(fd)
+        try:
+            shutil.copyfile(filename, tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            _remove(tmp)
+            raise
+        self.evict()
+
+    # Remove least recently used entries until within max_bytes / max_entries.
+    # Entries removed meanwhile by another thread or process are skipped.
+    def evict(self):
+        entries = []
+        total = 0
+        for f in os.scandir(self.cache_dir):
+            if not f.name.endswith('.tmp'):
+                try:
+                    st = f.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, f.path))
+                total += st.st_size
+
+        entries.sort()
+        count = len(entries)
+        for mtime, size, path in entries:
+            if total <= self.max_bytes and count <= self.max_entries:
+                break
+            _remove(path)
+            total -= size
+            count -= 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# Raises FileNotFoundError if the entry at 'path' has gone
+def _place(path, filename, link):
+    _remove(filename)
+    if link:
+        try:
+            os.link(path, filename)
+            return
+        except FileNotFoundError:
+            raise
+        except OSError:
+            # Different filesystem or links unsupported
+            pass
+    shutil.copyfile(path, filename)
+
+
+# Feed a value into the hash in a type-tagged, order-stable way
+def _hash_value(h, value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        h.update(b'pandas')
+        _hash_value(h, [str(d) for d in np.atleast_1d(value.dtypes)])
+        if isinstance(value, pd.DataFrame):
+            _hash_value(h, [str(c) for c in value.columns])
+        else:
+            _hash_value(h, str(value.name))
+        _hash_value(h, [str(i) for i in value.index])
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        h.update(f'ndarray{value.dtype}{value.shape}'.encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        h.update(b'dict')
+        for k in sorted(value):
+            _hash_value(h, k)
+            _hash_value(h, value[k])
+    elif isinstance(value, (list, tuple)):
+        h.update(f'seq{len(value)}'.encode())
+        for v in value:
+            _hash_value(h, v)
+    else:
+        h.update(f'{type(value).__name__}:{value!r};'.encode())
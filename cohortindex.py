@@ -0,0 +1,344 @@
+# Precomputed peer distributions for the report's peer comparison.
+#
+# cohorts.json only holds one mean per cohort. CohortIndex instead keeps, for
+# every cohort and PEER_METRICS figure, the sorted values of all participants
+# in that cohort, so a report can place its participant among their peers
+# with a binary search (np.searchsorted, O(log n)) rather than reading every
+# other participant's results. Quantiles and histograms for the peer charts
+# come from the same sorted arrays.
+#
+# The index is built by scanning a data root (one sub-directory per
+# participant, with a cohort.json) once: each participant's day folders are
+# read with AggregatedResults (per-day stats only, no frames kept) and only
+# their means are stored. Every participant also gets a signature -- the size
+# and mtime of their day files and cohort.json, from discovery.discover_days
+# -- so update() re-reads only participants that are new or have changed,
+# and drops those that are gone. A few changes are spliced into the sorted
+# arrays in place; larger batches re-sort the affected cohorts once.
+#
+# save()/load() persist the participant table and the sorted arrays as a
+# single .npz (no pickles).
+#
+#   python cohortindex.py DATA_ROOT [--index cohort_index.npz] [--workers N] [--cache DIR]
+
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import time
+
+from lazyimport import lazy_import
+from discovery import discover_days
+from folderresults import AggregatedResults
+
+np = lazy_import('numpy')
+
+FORMAT_VERSION = 1
+
+# cohorts.json key -> AggregatedResults figure
+PEER_METRICS = {
+    'mws': 'mean_walking_speed',
+    'msl': 'mean_stride_length',
+    'mc': 'mean_cadence'
+}
+
+# Changed participants above this fraction of the index re-sort their cohorts
+# instead of being inserted one at a time
+RESORT_FRACTION = 0.1
+
+
+def participant_signature(load_dir):
+    # Changes whenever a day folder or cohort.json is added, removed or edited
+    h = hashlib.sha1()
+    cohort_path = os.path.join(load_dir, 'cohort.json')
+    st = os.stat(cohort_path)
+    h.update(f'cohort.json:{st.st_size}:{st.st_mtime_ns};'.encode())
+    for day in discover_days(load_dir, refresh=True):
+        h.update(f'{os.path.relpath(day.path, load_dir)}:{sorted(day.files.items())};'.encode())
+    return h.hexdigest()
+
+
+def participant_values(load_dir, **options):
+    """
+    Read one participant's cohort and PEER_METRICS means.
+
+    options are passed to AggregatedResults.read_data (e.g. cache=DayCache).
+    """
+    with open(os.path.join(load_dir, 'cohort.json')) as f:
+        cohort = json.load(f)['cohort']
+    result = AggregatedResults(keep_frames=False)
+    result.read_data(load_dir, **options)
+    return cohort, [float(getattr(result, attr)) for attr in PEER_METRICS.values()]
+
+
+class CohortIndex:
+    def __init__(self):
+        # participant -> (cohort, signature, values in PEER_METRICS order)
+        self.participants = {}
+        # (cohort, metric) -> sorted finite values
+        self._sorted = {}
+
+    def __len__(self):
+        return len(self.participants)
+
+    @property
+    def cohorts(self):
+        return sorted({cohort for cohort, _, _ in self.participants.values()})
+
+    def values(self, cohort, metric):
+        # The cohort's sorted values of 'metric' (a PEER_METRICS key)
+        return self._sorted.get((cohort, metric), np.empty(0))
+
+    def size(self, cohort, metric='mws'):
+        return len(self.values(cohort, metric))
+
+    def add(self, participant, cohort, values, signature=''):
+        # Add or replace a participant, splicing their values into the sorted arrays
+        self.remove(participant)
+        values = [float(v) for v in values]
+        self.participants[participant] = (cohort, signature, values)
+        for metric, value in zip(PEER_METRICS, values):
+            if np.isfinite(value):
+                array = self.values(cohort, metric)
+                self._sorted[(cohort, metric)] = np.insert(array, np.searchsorted(array, value), value)
+
+    def add_many(self, entries):
+        """
+        Add or replace many participants: (participant, cohort, values,
+        signature) tuples. Beyond RESORT_FRACTION of the index, the affected
+        cohorts are re-sorted once instead of spliced into per participant.
+        """
+        entries = list(entries)
+        if len(entries) <= RESORT_FRACTION * len(self.participants):
+            for entry in entries:
+                self.add(*entry)
+            return
+
+        affected = set()
+        for participant, cohort, values, signature in entries:
+            if participant in self.participants:
+                affected.add(self.participants[participant][0])
+            self.participants[participant] = (cohort, signature, [float(v) for v in values])
+            affected.add(cohort)
+        self._resort(affected)
+
+    def remove(self, participant):
+        entry = self.participants.pop(participant, None)
+        if entry is None:
+            return False
+        cohort, _, values = entry
+        for metric, value in zip(PEER_METRICS, values):
+            if np.isfinite(value):
+                array = self.values(cohort, metric)
+                self._sorted[(cohort, metric)] = np.delete(array, np.searchsorted(array, value))
+        return True
+
+    def _resort(self, cohorts):
+        # Rebuild the sorted arrays of 'cohorts' from the participant table
+        # (one pass over the table, one sort per cohort and metric)
+        rows = {cohort: [] for cohort in cohorts}
+        for cohort, _, values in self.participants.values():
+            if cohort in rows:
+                rows[cohort].append(values)
+        for cohort, values in rows.items():
+            table = np.array(values, dtype=float).reshape(-1, len(PEER_METRICS))
+            for j, metric in enumerate(PEER_METRICS):
+                column = table[:, j]
+                self._sorted[(cohort, metric)] = np.sort(column[np.isfinite(column)])
+
+    def update(self, data_root, workers=None, **options):
+        """
+        Bring the index up to date with the participants under data_root:
+        new or changed participants are read, removed ones dropped.
+
+        Parameters
+        ----------
+        data_root : str
+            Directory with one sub-directory (with a cohort.json) per
+            participant.
+        workers : int
+            Participants read in parallel (threads).
+        options
+            Passed to AggregatedResults.read_data.
+
+        Returns
+        -------
+        dict
+            Counts of 'added', 'updated', 'removed' and 'unchanged'
+            participants.
+        """
+        found = {}
+        with os.scandir(data_root) as it:
+            for entry in it:
+                if entry.is_dir() and os.path.isfile(os.path.join(entry.path, 'cohort.json')):
+                    found[entry.name] = entry.path
+
+        signatures = {name: participant_signature(path) for name, path in found.items()}
+        changed = [name for name in sorted(found)
+                   if name not in self.participants or self.participants[name][1] != signatures[name]]
+        removed = [name for name in self.participants if name not in found]
+        counts = {
+            'added': sum(name not in self.participants for name in changed),
+            'updated': sum(name in self.participants for name in changed),
+            'removed': len(removed),
+            'unchanged': len(found) - len(changed)
+        }
+
+        if workers and workers > 1 and len(changed) > 1:
+            with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+                read = list(pool.map(lambda name: participant_values(found[name], **options), changed))
+        else:
+            read = [participant_values(found[name], **options) for name in changed]
+
+        for name in removed:
+            self.remove(name)
+        self.add_many((name, cohort, values, signatures[name]) for name, (cohort, values) in zip(changed, read))
+        return counts
+
+    @classmethod
+    def build(cls, data_root, workers=None, **options):
+        index = cls()
+        index.update(data_root, workers=workers, **options)
+        return index
+
+    def percentile(self, cohort, metric, value, participant=None):
+        """
+        Percentile rank of 'value' among the cohort: the percentage of
+        peers below it, counting ties as half.
+
+        Parameters
+        ----------
+        cohort : str
+        metric : str
+            A PEER_METRICS key ('mws', 'msl' or 'mc').
+        value : float
+        participant : str
+            Leave this participant's own indexed value out of the peers.
+
+        Returns
+        -------
+        float
+            0..100, or NaN without peers or for a NaN value.
+        """
+        array = self.values(cohort, metric)
+        below = np.searchsorted(array, value, 'left')
+        at_or_below = np.searchsorted(array, value, 'right')
+        n = len(array)
+
+        own = self.participants.get(participant)
+        if own is not None and own[0] == cohort:
+            own_value = own[2][list(PEER_METRICS).index(metric)]
+            if np.isfinite(own_value):
+                n -= 1
+                if own_value < value:
+                    below -= 1
+                    at_or_below -= 1
+                elif own_value == value:
+                    at_or_below -= 1
+
+        if n <= 0 or not np.isfinite(value):
+            return np.nan
+        return float(100 * (below + at_or_below) / (2 * n))
+
+    def quantiles(self, cohort, metric, q=(5, 25, 50, 75, 95)):
+        # Linear-interpolated quantiles (as np.percentile), indexed straight
+        # from the sorted array
+        array = self.values(cohort, metric)
+        if len(array) == 0:
+            return np.full(len(q), np.nan)
+        position = np.asarray(q, dtype=float) / 100 * (len(array) - 1)
+        lower = np.floor(position).astype(int)
+        upper = np.minimum(lower + 1, len(array) - 1)
+        return array[lower] + (array[upper] - array[lower]) * (position - lower)
+
+    def histogram(self, cohort, metric, bins=20, range=None):
+        """
+        Counts of the cohort's values in 'bins' equal-width bins over 'range'
+        (default: the cohort's min..max), by binary search of the bin edges.
+
+        Returns
+        -------
+        (counts, edges)
+            As np.histogram.
+        """
+        array = self.values(cohort, metric)
+        if range is None:
+            range = (array[0], array[-1]) if len(array) else (0.0, 1.0)
+        low, high = range
+        if high <= low:
+            low, high = low - 0.5, high + 0.5
+        edges = np.linspace(low, high, bins + 1)
+        positions = np.searchsorted(array, edges, 'left')
+        # The last bin includes its right edge, as in np.histogram
+        positions[-1] = np.searchsorted(array, edges[-1], 'right')
+        return np.diff(positions), edges
+
+    def save(self, path):
+        names = list(self.participants)
+        arrays = {
+            'participants': np.array(names, dtype=str),
+            'cohorts': np.array([self.participants[p][0] for p in names], dtype=str),
+            'signatures': np.array([self.participants[p][1] for p in names], dtype=str),
+            'values': np.array([self.participants[p][2] for p in names], dtype=float).reshape(-1, len(PEER_METRICS))
+        }
+        keys = sorted(self._sorted)
+        for i, key in enumerate(keys):
+            arrays[f'sorted_{i}'] = self._sorted[key]
+        header = {'version': FORMAT_VERSION, 'metrics': list(PEER_METRICS), 'sorted': keys}
+        arrays['__header__'] = np.array(json.dumps(header))
+
+        # Written next to the target and renamed, so readers never see half an index
+        tmp = f'{path}.tmp{os.getpid()}.npz'
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with np.load(path, allow_pickle=False) as npz:
+            header = json.loads(str(npz['__header__']))
+            if header['version'] != FORMAT_VERSION or header['metrics'] != list(PEER_METRICS):
+                raise ValueError(f"{path}: unsupported cohort index format")
+            for name, cohort, signature, values in zip(npz['participants'], npz['cohorts'], npz['signatures'],
+                                                       npz['values']):
+                index.participants[str(name)] = (str(cohort), str(signature), values.tolist())
+            for i, (cohort, metric) in enumerate(header['sorted']):
+                index._sorted[(cohort, metric)] = npz[f'sorted_{i}']
+        return index
+
+
+def load_or_build(path, data_root=None, workers=None, **options):
+    """
+    Load the index at 'path' (an empty index if there is none yet) and, with
+    a data_root, update it and save it back if anything changed.
+    """
+    index = CohortIndex.load(path) if os.path.exists(path) else CohortIndex()
+    if data_root is not None:
+        counts = index.update(data_root, workers=workers, **options)
+        if counts['added'] or counts['updated'] or counts['removed'] or not os.path.exists(path):
+            index.save(path)
+    return index
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build or update the cohort percentile index.')
+    parser.add_argument('data_root', help='Directory with one sub-directory per participant')
+    parser.add_argument('--index', default='cohort_index.npz', help='Index file to update')
+    parser.add_argument('--workers', type=int, default=None, help='Participants read in parallel')
+    parser.add_argument('--cache', default=None, help='daycache directory for the day folders')
+    args = parser.parse_args()
+
+    options = {}
+    if args.cache:
+        from daycache import DayCache
+        options['cache'] = DayCache(args.cache)
+
+    t0 = time.perf_counter()
+    index = CohortIndex.load(args.index) if os.path.exists(args.index) else CohortIndex()
+    counts = index.update(args.data_root, workers=args.workers, **options)
+    index.save(args.index)
+    print(', '.join(f'{n} {k}' for k, n in counts.items()) + f' in {time.perf_counter() - t0:.2f} s')
+    for cohort in index.cohorts:
+        medians = ', '.join(f'{m} {index.quantiles(cohort, m, (50,))[0]:.2f}' for m in PEER_METRICS)
+        print(f'{cohort}: {index.size(cohort)} participants; medians {medians}')
@@ -0,0 +1,211 @@
+# On-disk cache of parsed day folders.
+#
+# Each day folder is stored as a single .npz file holding the bout, stride and
+# aggregated frames column by column, plus a small JSON header with the per-day
+# scalars (total_walking_time, mean/max bout duration, hourly_speed, metadata)
+# and the arrays of the day's stride summary, bout stats and per-bout gait
+# figures (gait.py).
+# Entries are keyed on the path, size and modification time of the source files,
+# so a folder is only re-parsed when something in it changes. Past days never
+# change, so regenerating a report after a new day arrives only parses that day.
+
+import hashlib
+import json
+import os
+import zipfile
+
+from lazyimport import lazy_import
+from gait import GaitStats
+from stats import ColumnStats
+from strides import StrideSummary
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+SOURCE_FILES = ['wb.csv', 'stride.csv', 'aggregated.csv', 'metadata.json']
+FRAMES = ['wb', 'strides', 'aggregated']
+FORMAT_VERSION = 8
+
+
+class DayCache:
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # Key built from the stat of each source file in the folder
+    def key(self, folder):
+        h = hashlib.sha1()
+        h.update(os.path.realpath(folder).encode())
+        for name in SOURCE_FILES:
+            path = os.path.join(folder, name)
+            if os.path.exists(path):
+                st = os.stat(path)
+                h.update(f'{name}:{st.st_size}:{st.st_mtime_ns};'.encode())
+        return h.hexdigest()
+
+    def entry_path(self, folder):
+        return os.path.join(self.cache_dir, self.key(folder) + '.npz')
+
+    # Populate 'result' (a FolderResults) from the cache. Returns False on a miss.
+    # need_strides: an entry written in streaming mode (no stride frame) is a miss
+    def load(self, folder, result, need_strides=True):
+        path = self.entry_path(folder)
+        if not os.path.exists(path):
+            return False
+
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                header = json.loads(str(npz['__header__']))
+                if header['version'] != FORMAT_VERSION:
+                    return False
+                if need_strides and header['has_stride_file'] and 'strides' not in header['frames']:
+                    return False
+                for name in FRAMES:
+                    if name in header['frames']:
+                        setattr(result, name, _arrays_to_frame(npz, name, header['frames'][name]))
+                if 'stride_summary' in header:
+                    arrays = {k[len('stride_summary/'):]: npz[k] for k in npz.files if k.startswith('stride_summary/')}
+                    result.stride_summary = StrideSummary.from_arrays(arrays, header['stride_summary'])
+                if 'bout_stats' in header:
+                    arrays = {k[len('bout_stats/'):]: npz[k] for k in npz.files if k.startswith('bout_stats/')}
+                    result.bout_stats = ColumnStats.from_arrays(arrays, header['bout_stats'])
+                if 'gait' in header:
+                    result.gait = _arrays_to_frame(npz, 'gait', header['gait'])
+                    arrays = {k[len('gait_stats/'):]: npz[k] for k in npz.files if k.startswith('gait_stats/')}
+                    result.gait_stats = GaitStats.from_arrays(arrays, header['gait_stats'])
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            # Treat a truncated or corrupt entry as a miss, and drop it so
+            # the folder is parsed and stored again
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return False
+
+        result.metadata = header['metadata']
+        result.day = header['day']
+        result.start_timestamp = header['start_timestamp']
+        result.total_walking_time = header['total_walking_time']
+        result.mean_wb_duration = header['mean_wb_duration']
+        result.maximum_wb_duration = header['maximum_wb_duration']
+        result.hourly_speed = {int(k): v for k, v in header['hourly_speed'].items()}
+
+        # Touch the entry so eviction is least-recently-used
+        os.utime(path)
+        return True
+
+    def store(self, folder, result):
+        arrays = {}
+        frames = {}
+        for name in FRAMES:
+            # Only what is in memory; don't make a lazy frame load itself
+            frame = result.loaded_frame(name)
+            if frame is not None:
+                frames[name] = _frame_to_arrays(frame, name, arrays)
+
+        header = {
+            'version': FORMAT_VERSION,
+            'frames': frames,
+            'metadata': result.metadata,
+            'day': result.day,
+            'start_timestamp': result.start_timestamp,
+            'total_walking_time': float(result.total_walking_time),
+            'mean_wb_duration': float(result.mean_wb_duration),
+            'maximum_wb_duration': float(result.maximum_wb_duration),
+            'hourly_speed': result.hourly_speed,
+            'has_stride_file': os.path.exists(os.path.join(folder, 'stride.csv')),
+        }
+        if result.stride_summary is not None:
+            summary_arrays, header['stride_summary'] = result.stride_summary.to_arrays()
+            for k, v in summary_arrays.items():
+                arrays['stride_summary/' + k] = v
+        if result.bout_stats is not None:
+            stats_arrays, header['bout_stats'] = result.bout_stats.to_arrays()
+            for k, v in stats_arrays.items():
+                arrays['bout_stats/' + k] = v
+        if result.gait is not None:
+            header['gait'] = _frame_to_arrays(result.gait, 'gait', arrays)
+            gait_arrays, header['gait_stats'] = result.gait_stats.to_arrays()
+            for k, v in gait_arrays.items():
+                arrays['gait_stats/' + k] = v
+        arrays['__header__'] = np.array(json.dumps(header))
+
+        # Write to a temporary file and rename so readers never see half an entry
+        path = self.entry_path(folder)
+        tmp = path + f'.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+        self.evict()
+
+    # Remove least recently used entries until the cache fits in max_bytes
+    def evict(self):
+        entries = []
+        total = 0
+        for f in os.scandir(self.cache_dir):
+            if f.name.endswith('.npz'):
+                st = f.stat()
+                entries.append((st.st_mtime, st.st_size, f.path))
+                total += st.st_size
+
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for f in os.scandir(self.cache_dir):
+            if f.name.endswith('.npz'):
+                os.remove(f.path)
+
+
+# Split a frame into plain numpy arrays. Text columns are stored as fixed-width
+# unicode with a separate null mask so no pickling is needed; categoricals as
+# their codes plus the category labels.
+def _frame_to_arrays(frame, name, arrays):
+    columns = []
+    for i, col in enumerate(frame.columns):
+        values = frame[col]
+        key = f'{name}/{i}'
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            arrays[key] = values.cat.codes.to_numpy()
+            arrays[key + '/categories'] = values.cat.categories.to_numpy(dtype=str)
+            columns.append([col, 'category'])
+        elif isinstance(values.dtype, pd.BooleanDtype):
+            arrays[key] = values.fillna(False).to_numpy(dtype=bool)
+            arrays[key + '/null'] = values.isna().to_numpy()
+            columns.append([col, 'boolean'])
+        elif values.dtype.kind in 'biufcmM':
+            arrays[key] = values.to_numpy()
+            columns.append([col, 'array'])
+        else:
+            nulls = values.isna().to_numpy()
+            arrays[key] = values.astype(str).to_numpy(dtype=str)
+            arrays[key + '/null'] = nulls
+            columns.append([col, 'text'])
+    return columns
+
+
+def _arrays_to_frame(npz, name, columns):
+    data = {}
+    for i, (col, kind) in enumerate(columns):
+        key = f'{name}/{i}'
+        if kind == 'array':
+            data[col] = npz[key]
+        elif kind == 'category':
+            data[col] = pd.Categorical.from_codes(npz[key], categories=npz[key + '/categories'])
+        elif kind == 'boolean':
+            data[col] = pd.arrays.BooleanArray(npz[key], npz[key + '/null'])
+        else:
+            values = npz[key].astype(object)
+            values[npz[key + '/null']] = None
+            data[col] = values
+    return pd.DataFrame(data, columns=[col for col, kind in columns])
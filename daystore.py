@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# Columnar store of a participant's day history.
+#
+# Long-running participants have hundreds of day folders, and parsing every
+# wb.csv/stride.csv for each report dominates the load time. A DayStore keeps
+# the bout and stride tables of all days in one directory, one raw binary file
+# per column (the dtypes of schema.WB_SCHEMA/STRIDE_SCHEMA; categoricals as
+# int32 codes), read back with numpy.memmap. index.json records, per day, its
+# metadata and the row range it occupies in each table, so a day or a date
+# range is a slice of the memory-mapped columns rather than a parse.
+#
+# New days are appended to the end of the column files in place; index.json is
+# rewritten (atomically) only after the data is written, so a crash mid-append
+# leaves the store as it was. Days are normally appended in date order, in
+# which case a date range is one contiguous, zero-copy slice.
+#
+#   python daystore.py PARTICIPANT_DIR STORE_DIR     (add any new days)
+
+import json
+import os
+import sys
+
+from discovery import discover_days
+from lazyimport import lazy_import
+from schema import STRIDE_SCHEMA
+from schema import WB_SCHEMA
+from schema import read_table
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+FORMAT_VERSION = 1
+TABLES = {'wb': ('wb.csv', WB_SCHEMA), 'strides': ('stride.csv', STRIDE_SCHEMA)}
+
+
+class DayStore:
+    def __init__(self, path):
+        self.path = path
+        self._columns = {}
+        os.makedirs(path, exist_ok=True)
+        for table in TABLES:
+            os.makedirs(os.path.join(path, table), exist_ok=True)
+        self.index = self._read_index()
+
+    def _read_index(self):
+        path = os.path.join(self.path, 'index.json')
+        if not os.path.exists(path):
+            tables = {}
+            for table, (filename, schema) in TABLES.items():
+                columns = {c: ('category' if d == 'category' else d) for c, d in schema.dtypes.items()}
+                tables[table] = {'rows': 0, 'columns': columns, 'categories': {}}
+            return {'version': FORMAT_VERSION, 'tables': tables, 'days': []}
+
+        with open(path) as f:
+            index = json.load(f)
+        if index['version'] != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported day store version {index['version']}")
+        return index
+
+    def _write_index(self):
+        path = os.path.join(self.path, 'index.json')
+        tmp = path + f'.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp, path)
+
+    def days(self):
+        return [entry['day'] for entry in self.index['days']]
+
+    def day_entries(self, start=None, end=None):
+        # Index entries with start <= day <= end, in date order
+        start = str(start) if start is not None else None
+        end = str(end) if end is not None else None
+        entries = [e for e in self.index['days']
+                   if (start is None or e['day'] >= start) and (end is None or e['day'] <= end)]
+        return sorted(entries, key=lambda e: e['day'])
+
+    # Add a day folder; returns False if that day is already in the store
+    def append_folder(self, folder):
+        with open(os.path.join(folder, 'metadata.json')) as f:
+            metadata = json.load(f)
+        if metadata['session_day'] in self.days():
+            return False
+
+        frames = {}
+        for table, (filename, schema) in TABLES.items():
+            path = os.path.join(folder, filename)
+            frames[table] = read_table(path, schema) if os.path.exists(path) else None
+        self.append(metadata, frames, folder)
+        return True
+
+    def append(self, metadata, frames, folder=''):
+        entry = {
+            'day': metadata['session_day'],
+            'timestamp': metadata['session_timestamp'],
+            'metadata': metadata,
+            'folder': folder
+        }
+
+        for table, info in self.index['tables'].items():
+            frame = frames.get(table)
+            start = info['rows']
+            rows = len(frame) if frame is not None else 0
+
+            for column, dtype in info['columns'].items():
+                path = os.path.join(self.path, table, column + '.bin')
+                values = self._encode(info, column, dtype, frame, rows)
+                with open(path, 'ab') as f:
+                    # Drop anything past the indexed rows left by an interrupted append
+                    f.truncate(start * values.itemsize)
+                    f.write(values.tobytes())
+
+            info['rows'] = start + rows
+            # None: the day folder had no such file
+            entry[table] = [start, rows] if frame is not None else None
+
+        self.index['days'].append(entry)
+        self._columns = {}
+        self._write_index()
+
+    def _encode(self, info, column, dtype, frame, rows):
+        if dtype != 'category':
+            if frame is None or column not in frame:
+                return np.zeros(rows, dtype=dtype)
+            return frame[column].to_numpy(dtype=dtype)
+
+        # Categorical codes against the store's (growing) category list
+        categories = info['categories'].setdefault(column, [])
+        if frame is None or column not in frame:
+            return np.full(rows, -1, dtype='int32')
+        values = frame[column].astype('category')
+        lookup = {label: i for i, label in enumerate(categories)}
+        mapping = []
+        for label in values.cat.categories:
+            if label not in lookup:
+                lookup[label] = len(categories)
+                categories.append(label)
+            mapping.append(lookup[label])
+        codes = values.cat.codes.to_numpy()
+        mapping = np.array(mapping + [-1], dtype='int32')
+        return mapping[codes]
+
+    # The whole memory-mapped column (read only)
+    def column(self, table, column):
+        key = (table, column)
+        if key not in self._columns:
+            info = self.index['tables'][table]
+            dtype = info['columns'][column]
+            dtype = 'int32' if dtype == 'category' else dtype
+            rows = info['rows']
+            if rows == 0:
+                self._columns[key] = np.zeros(0, dtype=dtype)
+            else:
+                path = os.path.join(self.path, table, column + '.bin')
+                # Plain ndarray view of the mapping, so pandas sees ordinary arrays
+                self._columns[key] = np.memmap(path, dtype=dtype, mode='r', shape=(rows,)).view(np.ndarray)
+        return self._columns[key]
+
+    def frame(self, table, start=None, end=None):
+        """
+        Rows of 'wb' or 'strides' for the days start <= day <= end.
+
+        Numeric columns are views of the memory-mapped files when the days
+        occupy one contiguous row range (they do when appended in date order);
+        otherwise the day slices are concatenated.
+        """
+        ranges = [e[table] for e in self.day_entries(start, end) if e[table] is not None]
+        ranges = [(s, s + n) for s, n in ranges if n]
+
+        contiguous = all(ranges[i][1] == ranges[i + 1][0] for i in range(len(ranges) - 1))
+        if contiguous:
+            slices = [slice(ranges[0][0], ranges[-1][1])] if ranges else [slice(0, 0)]
+        else:
+            slices = [slice(s, e) for s, e in ranges]
+
+        return self._frame(table, slices)
+
+    def _frame(self, table, slices):
+        info = self.index['tables'][table]
+        data = {}
+        for column, dtype in info['columns'].items():
+            values = self.column(table, column)
+            values = values[slices[0]] if len(slices) == 1 else np.concatenate([values[s] for s in slices])
+            if dtype == 'category':
+                categories = info['categories'].get(column, [])
+                values = pd.Categorical.from_codes(values, categories=categories)
+            data[column] = values
+        return pd.DataFrame(data, copy=False)
+
+    # One day's rows as a DataFrame of memmap views (None if it had no such file)
+    def day_frame(self, table, entry):
+        if entry[table] is None:
+            return None
+        start, rows = entry[table]
+        return self._frame(table, [slice(start, start + rows)])
+
+
+# Add every day folder under base_path that isn't in the store yet
+def convert(base_path, store_path, manifest=None):
+    store = DayStore(store_path)
+    added = []
+    for day in discover_days(base_path, manifest=manifest):
+        if store.append_folder(day.path):
+            added.append(day.day)
+    return store, added
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print('usage: python daystore.py PARTICIPANT_DIR STORE_DIR')
+        sys.exit(2)
+    store, added = convert(sys.argv[1], sys.argv[2])
+    print(f"Added {len(added)} day(s); {len(store.days())} in {sys.argv[2]}")
@@ -0,0 +1,142 @@
+# Day-folder discovery.
+#
+# A participant directory is walked once with os.scandir (iteratively, no
+# recursion). A directory holding a metadata.json is a day folder: its
+# session_day and session_timestamp are read and the walk doesn't descend any
+# further. Other directories are only walked through, so nested or unrelated
+# folders never turn into empty FolderResults.
+#
+# With a manifest path, what was found is saved as JSON: per directory its
+# mtime, sub-directories and (for day folders) day, timestamp and the size and
+# mtime of each file. On the next run a directory whose mtime hasn't changed
+# costs a single stat -- it isn't listed again and its metadata.json isn't
+# re-read. Adding, removing or renaming anything in a directory changes its
+# mtime, so new days are picked up; pass refresh=True after editing files in
+# place.
+
+import json
+import os
+import warnings
+
+MANIFEST_VERSION = 1
+
+
+class DayFolder:
+    def __init__(self, path, day, timestamp, files):
+        self.path = path
+        self.day = day
+        self.timestamp = timestamp
+        # file name -> (size, mtime_ns)
+        self.files = files
+
+    def __repr__(self):
+        return f"DayFolder({self.path!r}, {self.day!r})"
+
+
+def discover_days(base_path, start=None, end=None, manifest=None, refresh=False):
+    """
+    Find the day folders under a participant directory.
+
+    Parameters
+    ----------
+    base_path : str
+        Directory to search.
+    start, end : str or datetime.date
+        Only return days with start <= session_day <= end (either may be None).
+    manifest : str
+        JSON file to reuse the previous walk from, and to update.
+    refresh : bool
+        Ignore the saved manifest and list every directory again.
+
+    Returns
+    -------
+    list of DayFolder
+        Sorted by day, then path.
+    """
+    old = {} if refresh or manifest is None else _load_manifest(manifest, base_path)
+    dirs = {}
+
+    stack = ['']
+    while stack:
+        rel = stack.pop()
+        path = os.path.join(base_path, rel) if rel else base_path
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+
+        entry = old.get(rel)
+        if entry is None or entry['mtime_ns'] != mtime_ns:
+            entry = _scan_dir(path, mtime_ns)
+        dirs[rel] = entry
+
+        if entry['day'] is None:
+            stack.extend(os.path.join(rel, name) for name in reversed(entry['subdirs']))
+
+    if manifest is not None and dirs != old:
+        _save_manifest(manifest, base_path, dirs)
+
+    start = str(start) if start is not None else None
+    end = str(end) if end is not None else None
+    days = []
+    for rel, entry in dirs.items():
+        day = entry['day']
+        if day is None:
+            continue
+        if (start is not None and day < start) or (end is not None and day > end):
+            continue
+        files = {name: tuple(stat) for name, stat in entry['files'].items()}
+        days.append(DayFolder(os.path.join(base_path, rel), day, entry['timestamp'], files))
+
+    days.sort(key=lambda d: (d.day, d.path))
+    return days
+
+
+def _scan_dir(path, mtime_ns):
+    entry = {'mtime_ns': mtime_ns, 'subdirs': [], 'day': None, 'timestamp': None, 'files': {}}
+    try:
+        with os.scandir(path) as it:
+            children = list(it)
+    except OSError:
+        return entry
+
+    files = {}
+    for child in children:
+        if child.is_dir():
+            entry['subdirs'].append(child.name)
+        elif child.is_file():
+            st = child.stat()
+            files[child.name] = [st.st_size, st.st_mtime_ns]
+    entry['subdirs'].sort()
+
+    if 'metadata.json' in files:
+        try:
+            with open(os.path.join(path, 'metadata.json')) as f:
+                metadata = json.load(f)
+            entry['day'] = metadata['session_day']
+            entry['timestamp'] = metadata['session_timestamp']
+            entry['files'] = files
+        except (OSError, ValueError, KeyError) as e:
+            warnings.warn(f"{path}: unreadable metadata.json, not treated as a day folder ({e!r})")
+            entry['day'] = None
+
+    return entry
+
+
+def _load_manifest(path, base_path):
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION or manifest.get('base') != os.path.realpath(base_path):
+        return {}
+    return manifest['dirs']
+
+
+def _save_manifest(path, base_path, dirs):
+    # Write to a temporary file and rename so readers never see half a manifest
+    tmp = path + f'.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'version': MANIFEST_VERSION, 'base': os.path.realpath(base_path), 'dirs': dirs}, f)
+    os.replace(tmp, path)
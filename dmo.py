@@ -0,0 +1,302 @@
+# Longitudinal DMO (digital mobility outcome) history of a participant.
+#
+# dmo_history.json holds one entry per earlier assessment (StartDay, StageID,
+# StageName, Days, PropertyUUID and the five DMO_METRICS). DmoHistory keeps it
+# columnar: one typed array per field and an assessments x metrics float
+# matrix, in assessment order (by StartDay; entries of the same day keep their
+# file order).
+#
+# Deltas, percentage changes, rolling means and the linear trend of every
+# metric are computed for the whole matrix in one vectorized pass when the
+# history is loaded. They are kept as running state -- per-metric prefix sums
+# for the rolling means and least-squares sums for the trend -- so appending
+# the current AggregatedResults as a new timepoint updates them in O(1)
+# instead of recomputing the history. Missing (NaN) metric values are skipped
+# by the rolling means and trends.
+#
+# cohort_summary() does the same for many participants at once, on their
+# histories concatenated into one matrix.
+
+import json
+
+from lazyimport import lazy_import
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+DMO_METRICS = ('MeanWalkingSpeed', 'MeanStrideLength', 'MeanCadence', 'MeanWalkingBoutDuration',
+               'MaximumWalkingBoutDuration')
+
+# The AggregatedResults figure for each metric
+RESULT_ATTRS = {
+    'MeanWalkingSpeed': 'mean_walking_speed',
+    'MeanStrideLength': 'mean_stride_length',
+    'MeanCadence': 'mean_cadence',
+    'MeanWalkingBoutDuration': 'mean_walking_bout_duration',
+    'MaximumWalkingBoutDuration': 'maximum_walking_bout_duration'
+}
+
+# Assessments in the rolling mean
+ROLLING_WINDOW = 3
+
+
+def _slopes(n, sx, sxx, sy, sxy):
+    # Least-squares slope per assessment from running sums; NaN below 2 points
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(n >= 2, (n * sxy - sx * sy) / (n * sxx - sx * sx), np.nan)
+
+
+class DmoHistory:
+    def __init__(self, window=ROLLING_WINDOW):
+        self.window = window
+        self.n = 0
+        width = len(DMO_METRICS)
+        self._start_day = np.empty(0, dtype='datetime64[D]')
+        self._stage_id = np.empty(0, dtype='int64')
+        self._days = np.empty(0, dtype='int64')
+        self._values = np.empty((0, width))
+        self._delta = np.empty((0, width))
+        # Prefix sums/counts of the valid values, one row longer than the history
+        self._csum = np.zeros((1, width))
+        self._ccount = np.zeros((1, width))
+        # Least-squares sums over (assessment number, value) per metric
+        self._sums = np.zeros((5, width))
+        self.stage_names = []
+        self.property_uuids = []
+
+    @classmethod
+    def from_records(cls, records, window=ROLLING_WINDOW):
+        history = cls(window)
+        if not records:
+            return history
+
+        def column(name, default):
+            return [default if entry.get(name) is None else entry[name] for entry in records]
+
+        start_day = np.array(column('StartDay', 'NaT'), dtype='datetime64[D]')
+        # Stable, so same-day entries keep their order
+        order = np.argsort(start_day, kind='stable')
+        values = np.array([column(m, np.nan) for m in DMO_METRICS], dtype=float).T
+
+        history._set(start_day[order],
+                     np.array(column('StageID', -1), dtype='int64')[order],
+                     np.array(column('Days', 0), dtype='int64')[order],
+                     values[order],
+                     [column('StageName', '')[i] for i in order],
+                     [column('PropertyUUID', '')[i] for i in order])
+        return history
+
+    @classmethod
+    def load(cls, path, window=ROLLING_WINDOW):
+        with open(path) as f:
+            return cls.from_records(json.load(f), window)
+
+    def _set(self, start_day, stage_id, days, values, stage_names, property_uuids):
+        # The whole history in one pass
+        n = len(values)
+        self.n = n
+        self._start_day = start_day
+        self._stage_id = stage_id
+        self._days = days
+        self._values = values
+        self.stage_names = list(stage_names)
+        self.property_uuids = list(property_uuids)
+
+        self._delta = np.full_like(values, np.nan)
+        self._delta[1:] = values[1:] - values[:-1]
+
+        valid = ~np.isnan(values)
+        self._csum = np.zeros((n + 1, values.shape[1]))
+        self._ccount = np.zeros((n + 1, values.shape[1]))
+        np.cumsum(np.where(valid, values, 0.0), axis=0, out=self._csum[1:])
+        np.cumsum(valid, axis=0, out=self._ccount[1:])
+
+        x = np.where(valid, np.arange(n, dtype=float)[:, None], 0.0)
+        y = np.where(valid, values, 0.0)
+        self._sums = np.stack([valid.sum(axis=0), x.sum(axis=0), (x * x).sum(axis=0), y.sum(axis=0),
+                               (x * y).sum(axis=0)]).astype(float)
+
+    def _reserve(self, rows):
+        # Grow the arrays geometrically so appends are amortised O(1)
+        old = len(self._values)
+        if rows <= old:
+            return
+        capacity = max(rows, 2 * old, 8)
+
+        def grow(array, fill):
+            # The prefix sums keep their extra leading row
+            grown = np.full((capacity + len(array) - old,) + array.shape[1:], fill, dtype=array.dtype)
+            grown[:len(array)] = array
+            return grown
+
+        self._csum = grow(self._csum, 0.0)
+        self._ccount = grow(self._ccount, 0.0)
+        self._start_day = grow(self._start_day, np.datetime64('NaT'))
+        self._stage_id = grow(self._stage_id, -1)
+        self._days = grow(self._days, 0)
+        self._delta = grow(self._delta, np.nan)
+        self._values = grow(self._values, np.nan)
+
+    # Add a timepoint from a metric -> value dict or values in DMO_METRICS order,
+    # updating the derived figures incrementally. A timepoint before the last one
+    # is inserted in StartDay order instead, and the derived figures recomputed.
+    def append(self, values, start_day, stage_id=-1, stage_name='', days=0, property_uuid=''):
+        if isinstance(values, dict):
+            values = [values.get(m, np.nan) for m in DMO_METRICS]
+        values = np.asarray(values, dtype=float)
+        day = np.datetime64(str(start_day), 'D')
+
+        if self.n and day < self.start_days[-1]:
+            # After any assessments of the same day, as from_records orders them
+            i = int(np.searchsorted(self.start_days, day, 'right'))
+            self._set(np.insert(self.start_days, i, day),
+                      np.insert(self._stage_id[:self.n], i, stage_id),
+                      np.insert(self._days[:self.n], i, days),
+                      np.insert(self.values, i, values, axis=0),
+                      self.stage_names[:i] + [stage_name] + self.stage_names[i:],
+                      self.property_uuids[:i] + [property_uuid] + self.property_uuids[i:])
+            return
+
+        i = self.n
+        self._reserve(i + 1)
+        self._values[i] = values
+        self._start_day[i] = day
+        self._stage_id[i] = stage_id
+        self._days[i] = days
+        self.stage_names.append(stage_name)
+        self.property_uuids.append(property_uuid)
+        self._delta[i] = values - self._values[i - 1] if i else np.nan
+
+        valid = ~np.isnan(values)
+        self._csum[i + 1] = self._csum[i] + np.where(valid, values, 0.0)
+        self._ccount[i + 1] = self._ccount[i] + valid
+        x = np.where(valid, float(i), 0.0)
+        y = np.where(valid, values, 0.0)
+        self._sums += np.stack([valid.astype(float), x, x * x, y, x * y])
+        self.n = i + 1
+
+    def append_result(self, result, stage_name='', stage_id=-1):
+        # The current recording (an AggregatedResults) as the latest timepoint
+        values = [getattr(result, RESULT_ATTRS[m]) for m in DMO_METRICS]
+        self.append(values, result.earliest_day().day, stage_id, stage_name, result.number_sessions)
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def start_days(self):
+        return self._start_day[:self.n]
+
+    @property
+    def values(self):
+        # Assessments x DMO_METRICS
+        return self._values[:self.n]
+
+    @property
+    def delta(self):
+        # Change from the previous assessment (NaN for the first)
+        return self._delta[:self.n]
+
+    @property
+    def pct_change(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return 100 * self.delta / np.abs(self._values[:self.n] - self.delta)
+
+    @property
+    def rolling_mean(self):
+        # Mean of the valid values over the last 'window' assessments
+        end = np.arange(1, self.n + 1)
+        start = np.maximum(end - self.window, 0)
+        counts = self._ccount[end] - self._ccount[start]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(counts > 0, (self._csum[end] - self._csum[start]) / counts, np.nan)
+
+    @property
+    def trend(self):
+        # Least-squares slope of each metric per assessment
+        return {m: float(s) for m, s in zip(DMO_METRICS, _slopes(*self._sums))}
+
+    def series(self, metric):
+        # One metric by assessment number (1..n)
+        return pd.Series(self.values[:, DMO_METRICS.index(metric)], index=pd.RangeIndex(1, self.n + 1), name=metric)
+
+    # The metric's most recent value and its change from the previous
+    # assessment: (value, delta, percentage change), NaN where unknown
+    def latest(self, metric):
+        if self.n == 0:
+            return np.nan, np.nan, np.nan
+        j = DMO_METRICS.index(metric)
+        return float(self.values[-1, j]), float(self.delta[-1, j]), float(self.pct_change[-1, j])
+
+    def previous(self, metric, before):
+        # The metric's value at the latest assessment that started before the
+        # day 'before', skipping missing values; NaN if there is none
+        j = DMO_METRICS.index(metric)
+        earlier = self.values[self.start_days < np.datetime64(str(before), 'D'), j]
+        earlier = earlier[~np.isnan(earlier)]
+        return float(earlier[-1]) if len(earlier) else np.nan
+
+    # The history as a typed frame indexed by (StartDay, StageID), with
+    # <metric>__delta, __pct_change and __rolling_mean columns
+    def to_frame(self):
+        index = pd.MultiIndex.from_arrays([self.start_days, self._stage_id[:self.n]], names=['StartDay', 'StageID'])
+        columns = {
+            'StageName': pd.array(self.stage_names, dtype='string'),
+            'Days': self._days[:self.n],
+            'PropertyUUID': pd.array(self.property_uuids, dtype='string')
+        }
+        derived = {'delta': self.delta, 'pct_change': self.pct_change, 'rolling_mean': self.rolling_mean}
+        for j, metric in enumerate(DMO_METRICS):
+            columns[metric] = self.values[:, j]
+            for suffix, array in derived.items():
+                columns[f'{metric}__{suffix}'] = array[:, j]
+        return pd.DataFrame(columns, index=index)
+
+
+def load_history(path, window=ROLLING_WINDOW):
+    return DmoHistory.load(path, window)
+
+
+# Latest value, change from the previous assessment and trend of every metric
+# for many participants (id -> DmoHistory), in one pass over their
+# concatenated histories: one row per participant with <metric>,
+# <metric>__delta, <metric>__pct_change and <metric>__trend columns.
+def cohort_summary(histories):
+    ids = list(histories)
+    lengths = np.array([len(histories[p]) for p in ids], dtype=np.intp)
+    width = len(DMO_METRICS)
+    if not ids or lengths.sum() == 0:
+        return pd.DataFrame(index=pd.Index(ids, name='participant'))
+
+    values = np.concatenate([histories[p].values for p in ids if len(histories[p])])
+    owner = np.repeat(np.arange(len(ids)), lengths)
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    # Assessment number within each participant's history
+    x = np.arange(len(values)) - np.repeat(offsets, lengths)
+
+    valid = ~np.isnan(values)
+    xv = np.where(valid, x[:, None].astype(float), 0.0)
+    yv = np.where(valid, values, 0.0)
+    sums = [np.zeros((len(ids), width)) for _ in range(5)]
+    for total, term in zip(sums, (valid.astype(float), xv, xv * xv, yv, xv * yv)):
+        np.add.at(total, owner, term)
+    slopes = _slopes(*sums)
+
+    has = lengths > 0
+    last = np.full((len(ids), width), np.nan)
+    previous = np.full((len(ids), width), np.nan)
+    ends = offsets + lengths - 1
+    last[has] = values[ends[has]]
+    two = lengths > 1
+    previous[two] = values[ends[two] - 1]
+    delta = last - previous
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pct = 100 * delta / np.abs(previous)
+
+    columns = {}
+    for j, metric in enumerate(DMO_METRICS):
+        columns[metric] = last[:, j]
+        columns[f'{metric}__delta'] = delta[:, j]
+        columns[f'{metric}__pct_change'] = pct[:, j]
+        columns[f'{metric}__trend'] = slopes[:, j]
+    return pd.DataFrame(columns, index=pd.Index(ids, name='participant'))
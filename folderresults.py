@@ -1,9 +1,47 @@
-import pandas as pd
-import math
 import os
 import json
+import concurrent.futures
 from datetime import date
 from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from functools import partial
+
+import profiling
+from discovery import discover_days
+from gait import GAIT_METRICS
+from gait import GaitStats
+from gait import bout_gait
+from lazyimport import lazy_import
+from schema import AGGREGATED_SCHEMA
+from schema import WB_SCHEMA
+from schema import read_table
+from stats import ColumnStats
+from strides import StrideSummary
+from strides import read_stride_summary
+from strides import read_strides
+
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+
+# Bout columns summarised by FolderResults.bout_stats
+BOUT_METRICS = ['duration_s', 'cadence_spm', 'stride_length_m', 'walking_speed_mps']
+
+# Figures AggregatedResults can report; read_data(summary_only=True, metrics=...)
+# takes a subset of these
+SUMMARY_METRICS = ['mean_cadence', 'mean_stride_length', 'mean_walking_speed',
+                   'mean_walking_bout_duration', 'maximum_walking_bout_duration',
+                   'mean_daily_walking_time', 'number_of_bouts', 'hourly_speed']
+
+# The subset that can be derived from aggregated.csv alone. The pipeline's
+# '__avg' is the plain mean for cadence, but for bout duration it is the
+# median and '__max' is the 90th percentile; '__var' is the coefficient of
+# variation (std / mean). So only the counts, total walking time, the cadence
+# mean and the CVs combine exactly across days; everything else (walking speed
+# and stride length over all bouts, the true longest bout, hourly speed) needs
+# wb.csv.
+AGGREGATED_METRICS = ['mean_cadence', 'mean_walking_bout_duration',
+                      'mean_daily_walking_time', 'number_of_bouts']
 
 # Get a list of subdirectories
 def fast_scandir(dirname):
@@ -12,128 +50,437 @@ def fast_scandir(dirname):
         subfolders.extend(fast_scandir(dirname))
     return subfolders
 
-# Class to hold results from a single day folder
+# Read a single day folder. Module level so it can be shipped to a process pool.
+# 'options' are passed through to FolderResults.read_folder.
+def load_folder(folder, **options):
+    r = FolderResults()
+    r.read_folder(folder, **options)
+    return r
+
+# Read a list of day folders, optionally in parallel. Results always come back
+# in the same order as 'dirs' so the serial and parallel paths are identical.
+#   executor: None, 'thread', 'process' or an existing concurrent.futures Executor
+#   options: passed to FolderResults.read_folder (cache=, stream_strides=)
+def load_folders(dirs, workers=None, executor=None, **options):
+    load = partial(load_folder, **options)
+    if executor is None and not workers:
+        return [load(d) for d in dirs]
+
+    if executor is None or isinstance(executor, str):
+        if executor is None or executor == 'thread':
+            pool_class = concurrent.futures.ThreadPoolExecutor
+        elif executor == 'process':
+            pool_class = concurrent.futures.ProcessPoolExecutor
+        else:
+            raise ValueError("Unsupported executor. Use 'thread', 'process' or an Executor instance.")
+
+        with pool_class(max_workers=workers) as pool:
+            return list(pool.map(load, dirs))
+
+    return list(executor.map(load, dirs))
+
+# Columns of FolderResults.hourly, one row per hour of the day: strides, sum
+# and count of the bout speeds, mean speed and seconds walked
+HOURLY_FIELDS = ('strides', 'sum', 'count', 'mean', 'duration')
+
+
+# Class to hold results from a single day folder.
+#
+# Slotted, with the hourly figures in a 24x5 array, so a day kept in an
+# AggregatedResults costs little once its frames are dropped. The wb, strides
+# and aggregated frames are properties: after drop_frames() (or for strides
+# read with stream_strides=True) they are re-read from the day folder or
+# DayStore on first access.
 class FolderResults:
+    __slots__ = ('_wb', '_strides', '_aggregated', '_source', '_lazy', 'mean_wb_duration',
+                 'maximum_wb_duration', 'stride_summary', 'bout_stats', 'folder', 'start_timestamp',
+                 'sample_rate', 'metadata', 'hourly', 'total_walking_time', 'day', 'gait', 'gait_stats')
+
     def __init__(self):
-        self.wb = None
+        self._wb = None
+        self._strides = None
+        self._aggregated = None
+        # Where frames not in memory can be reloaded from, and whether they should be
+        self._source = None
+        self._lazy = False
         self.mean_wb_duration = 0
         self.maximum_wb_duration = 0
-        self.aggregaged = None
-        self.strides = None
+        self.stride_summary = None
+        self.bout_stats = None
+        self.folder = ''
         self.start_timestamp = 0
         self.sample_rate = 100
         self.metadata = {}
-        self.hourly_speed = {}
+        self.hourly = None
         self.total_walking_time = 0
         self.day = ''
-    
-    def read_folder(self, folder):
+        # Per-bout gait figures and the day's GaitStats (see gait.py)
+        self.gait = None
+        self.gait_stats = None
+
+    @property
+    def wb(self):
+        if self._wb is None and self._lazy:
+            self._wb = self.load_frame('wb')
+        return self._wb
+
+    @wb.setter
+    def wb(self, frame):
+        self._wb = frame
+
+    @property
+    def strides(self):
+        if self._strides is None and self._lazy:
+            self._strides = self.load_frame('strides')
+        return self._strides
+
+    @strides.setter
+    def strides(self, frame):
+        self._strides = frame
+
+    @property
+    def aggregated(self):
+        if self._aggregated is None and self._lazy:
+            self._aggregated = self.load_frame('aggregated')
+        return self._aggregated
+
+    @aggregated.setter
+    def aggregated(self, frame):
+        self._aggregated = frame
+
+    # Free the frames; the summary values, stats and hourly figures stay
+    def drop_frames(self):
+        self._wb = None
+        self._strides = None
+        self._aggregated = None
+        self._lazy = self._source is not None
+
+    # A frame ('wb', 'strides' or 'aggregated') if it is in memory, else None
+    def loaded_frame(self, name):
+        return getattr(self, '_' + name)
+
+    # A frame ('wb', 'strides' or 'aggregated'), from memory or reloaded from
+    # the source without keeping it
+    def load_frame(self, name):
+        frame = getattr(self, '_' + name)
+        if frame is not None or not self._lazy:
+            return frame
+
+        if self._source[0] == 'store':
+            store, entry = self._source[1:]
+            frame = store.day_frame(name, entry) if name != 'aggregated' else None
+        else:
+            path = os.path.join(self._source[1], {'wb': 'wb.csv', 'strides': 'stride.csv', 'aggregated': 'aggregated.csv'}[name])
+            if os.path.exists(path):
+                if name == 'wb':
+                    frame = read_table(path, WB_SCHEMA)
+                elif name == 'strides':
+                    frame = read_strides(path)
+                else:
+                    frame = read_table(path, AGGREGATED_SCHEMA)
+
+        if name == 'wb' and frame is not None:
+            self.add_bout_times(frame)
+        return frame
+
+    # Dict view of self.hourly: {hour: {'strides', 'sum', 'count', 'mean', 'duration'}}
+    @property
+    def hourly_speed(self):
+        if self.hourly is None:
+            return {}
+        return {h: {'strides': float(row[0]), 'sum': float(row[1]), 'count': int(row[2]), 'mean': float(row[3]),
+                    'duration': float(row[4])}
+                for h, row in enumerate(self.hourly)}
+
+    @hourly_speed.setter
+    def hourly_speed(self, value):
+        if not value:
+            self.hourly = None
+        else:
+            # Dicts without 'duration' (older callers) leave it unknown
+            self.hourly = np.array([[value[h].get(f, np.nan) for f in HOURLY_FIELDS] for h in range(24)], dtype=float)
+
+    # cache: optional daycache.DayCache
+    # stream_strides: don't keep stride.csv in memory, only its StrideSummary
+    # summary_only: take the day's figures from aggregated.csv and never read
+    #   stride.csv; wb.csv is only read when 'metrics' (default SUMMARY_METRICS)
+    #   asks for something aggregated.csv doesn't have. The cache isn't used.
+    @profiling.profiled('read_folder')
+    def read_folder(self, folder, cache=None, stream_strides=False, summary_only=False, metrics=None):
+        self.folder = folder
+        self._source = ('folder', folder)
+
+        if summary_only:
+            self.read_summary(folder, metrics)
+            return
+
+        # stride.csv is left on disk; r.strides reads it on demand
+        self._lazy = stream_strides
+
+        # Past days never change, so reuse the parsed folder if we have it
+        if cache is not None:
+            with profiling.span('cache.load'):
+                hit = cache.load(folder, self, need_strides=not stream_strides)
+            if hit:
+                if stream_strides:
+                    self._strides = None
+                return
+
         if os.path.exists(folder + '/wb.csv'):
-            self.wb = pd.read_csv(folder + '/wb.csv')
+            with profiling.span('parse.wb') as s:
+                self.wb = read_table(folder + '/wb.csv', WB_SCHEMA)
+                s.rows = len(self.wb)
 
         if os.path.exists(folder + '/aggregated.csv'):
-            self.aggregated = pd.read_csv(folder + '/aggregated.csv')
+            self.aggregated = read_table(folder + '/aggregated.csv', AGGREGATED_SCHEMA)
+
+        with profiling.span('parse.strides') as s:
+            if stream_strides:
+                self.stride_summary = read_stride_summary(folder + '/stride.csv')
+                s.rows = self.stride_summary.strides
+            elif os.path.exists(folder + '/stride.csv'):
+                self.strides = read_strides(folder + '/stride.csv')
+                self.stride_summary = StrideSummary()
+                self.stride_summary.update(self.strides)
+                s.rows = len(self.strides)
 
-        if os.path.exists(folder + '/stride.csv'):
-            self.strides = pd.read_csv(folder + '/stride.csv')
+        # Streamed strides are never all in memory, so they get no gait figures
+        self.summarise_strides()
+
+        self.read_metadata(folder)
+
+        # Work out actual times for the walking bouts
+        self.summarise_bouts()
 
+        if cache is not None:
+            with profiling.span('cache.store'):
+                cache.store(folder, self)
+
+    # Load one day from a daystore.DayStore ('entry' from store.day_entries()).
+    # wb and strides are views of the store's memory-mapped columns.
+    @profiling.profiled('read_store')
+    def read_store(self, store, entry):
+        self.folder = entry['folder']
+        self._source = ('store', store, entry)
+        self.metadata = entry['metadata']
+        self.day = entry['day']
+        self.start_timestamp = entry['timestamp']
+
+        self.wb = store.day_frame('wb', entry)
+        self.strides = store.day_frame('strides', entry)
+        if self.strides is not None:
+            self.stride_summary = StrideSummary()
+            self.stride_summary.update(self.strides)
+
+        self.summarise_bouts()
+        self.summarise_strides()
+
+    def read_summary(self, folder, metrics=None):
+        metrics = SUMMARY_METRICS if metrics is None else metrics
+        self.read_metadata(folder)
+
+        if os.path.exists(folder + '/aggregated.csv'):
+            self.aggregated = read_table(folder + '/aggregated.csv', AGGREGATED_SCHEMA)
+            stats = aggregated_stats(self.aggregated)
+            if stats is not None and all(m in AGGREGATED_METRICS for m in metrics):
+                self.bout_stats = stats
+                self.total_walking_time = float(self.aggregated['total_walking_duration_h'].iloc[0]) * 3600
+                self.mean_wb_duration = self.total_walking_time / stats.rows if stats.rows else np.nan
+                self.maximum_wb_duration = np.nan
+                return
+
+        # Fall back to the bouts for whatever aggregated.csv can't provide
+        if os.path.exists(folder + '/wb.csv'):
+            self.wb = read_table(folder + '/wb.csv', WB_SCHEMA)
+        self.summarise_bouts()
+
+    def read_metadata(self, folder):
         if os.path.exists(folder + '/metadata.json'):
             with open(folder + '/metadata.json') as f:
                 self.metadata = json.load(f)
                 self.day = self.metadata['session_day']
                 self.start_timestamp = self.metadata['session_timestamp']
 
-                # Set the timestamps for the walking bouts etc
-        
-        
-        # Work out actual times for the walking bouts
+    # Timestamps, hourly speed and bout stats from self.wb
+    @profiling.profiled('summarise_bouts')
+    def summarise_bouts(self):
         if self.wb is not None:
             # Have walking bout data
-            starts = self.create_timestamps(self.wb['start'])
-            ends = self.create_timestamps(self.wb['end'])
-            self.wb['start_times'] = starts
-            self.wb['end_times'] = ends
-            bout_hours = self.create_hours_of_day(self.wb['start_times'])
-            self.wb['bout_hour'] = bout_hours
+            self.add_bout_times(self.wb)
             self.calculate_hourly_speed()
-            self.calculate_total_walking_time()
-            self.calculate_mean_walking_bout_duration()
-            self.calculate_maximum_walking_bout_duration()
-            
+
+        # One fused pass over the bout metrics; the duration figures read from it
+        self.bout_stats = ColumnStats.from_frame(self.wb, BOUT_METRICS)
+        self.calculate_total_walking_time()
+        self.calculate_mean_walking_bout_duration()
+        self.calculate_maximum_walking_bout_duration()
+
+    # Per-bout gait variability and the day's GaitStats from the strides in memory
+    @profiling.profiled('summarise_strides')
+    def summarise_strides(self):
+        if self._strides is not None and 'wb_id' in self._strides:
+            self.gait, self.gait_stats = bout_gait(self._strides)
+
+    # Wall-clock start/end times and hour of day for each bout in 'wb'
+    def add_bout_times(self, wb):
+        wb['start_times'] = self.create_timestamps(wb['start'])
+        wb['end_times'] = self.create_timestamps(wb['end'])
+        wb['bout_hour'] = self.create_hours_of_day(wb['start_times'])
+
     def calculate_total_walking_time(self):
         if self.wb is not None:
-            self.total_walking_time = self.wb['duration_s'].sum()
+            self.total_walking_time = self.bout_stats.sum[BOUT_METRICS.index('duration_s')]
         else:
             self.total_walking_time = 0
 
     def calculate_maximum_walking_bout_duration(self):
         if self.wb is not None:
-            self.maximum_wb_duration = self.wb['duration_s'].max()
+            self.maximum_wb_duration = self.bout_stats.get_max('duration_s')
         else:
             self.maximum_wb_duration = 0
 
     def calculate_mean_walking_bout_duration(self):
         if self.wb is not None:
-            self.mean_wb_duration = self.wb['duration_s'].mean()
+            self.mean_wb_duration = self.bout_stats.mean('duration_s')
         else:
             self.mean_wb_duration = 0
 
     def calculate_hourly_speed(self):
-        self.hourly_speed = {}
-        for i in range(0, 24):
-            self.hourly_speed[i] = {
-                'strides': 0,
-                'sum': 0,
-                'count': 0
-            }
-        
-        def do_mean(row):
-            hour = row['bout_hour']
-            speed = self.hourly_speed[hour]
-
-            bs = row['walking_speed_mps']
-            if math.isnan(bs) == False:
-                speed['sum'] = speed['sum'] + bs
-                speed['count'] = speed['count'] + 1
+        # Sum, count, stride and duration totals for each hour of the day in
+        # one pass; a bout counts towards the hour it starts in. np.bincount
+        # accumulates in row order so the sums match the old row-by-row loop
+        # exactly.
+        # Bouts without a start time (hour -1) have no hour to count in
+        hours = self.wb['bout_hour'].to_numpy(dtype=np.intp)
+        timed = hours >= 0
+        hours = hours[timed]
+        speed = self.wb['walking_speed_mps'].to_numpy(dtype=float)[timed]
+        strides = self.wb['n_strides'].to_numpy(dtype=float)[timed]
+        duration = self.wb['duration_s'].to_numpy(dtype=float)[timed]
 
-            strides = row['n_strides']
+        has_speed = ~np.isnan(speed)
+        sums = np.bincount(hours[has_speed], weights=speed[has_speed], minlength=24)
+        counts = np.bincount(hours[has_speed], minlength=24)
 
-            if math.isnan(strides)==False:
-                speed['strides'] = speed['strides'] + strides
+        has_strides = ~np.isnan(strides)
+        stride_sums = np.bincount(hours[has_strides], weights=strides[has_strides], minlength=24)
 
-            return row
+        has_duration = ~np.isnan(duration)
+        durations = np.bincount(hours[has_duration], weights=duration[has_duration], minlength=24)
 
-        self.wb.apply(do_mean, axis=1)
-        for i in range(0, len(self.hourly_speed)):
-            hr = self.hourly_speed[i]
-            if hr['count']!=0:
-                hr['mean'] = hr['sum'] / hr['count']
+        means = np.divide(sums, counts, out=np.zeros(24), where=counts != 0)
 
-            else:
-                hr['mean'] = 0
+        # Columns as in HOURLY_FIELDS
+        self.hourly = np.column_stack([stride_sums, sums, counts, means, durations])
 
-
-    
+    # Hour of day of each timestamp; -1 where it is missing
     def create_hours_of_day(self, column):
-        def do_hour(x):
-            return x.hour
-        
-        new_column = column.copy().apply(do_hour)
-        return new_column
-    
+        return column.dt.hour.fillna(-1).astype('int64')
+
     def create_timestamps(self, column):
-        def do_timestamp(x):
-            dt = datetime.fromtimestamp(((self.start_timestamp) / 1000.0) + (x / 100))
-            return dt
-            
-        new_column = column.copy().apply(do_timestamp)
+        # Sample offsets -> local wall-clock datetime64 column, matching
+        # datetime.fromtimestamp but without a Python object per bout. Missing
+        # offsets give NaT.
+        offsets = column.to_numpy(dtype=float)
+        known = ~np.isnan(offsets)
+        millis = self.start_timestamp + offsets[known] * (1000.0 / self.sample_rate)
+        micros = np.round(millis * 1000).astype('int64')
+        local = np.full(len(offsets), np.datetime64('NaT', 'us').astype('int64'))
+        local[known] = micros + local_utc_offsets(micros)
+
+        return pd.Series(local.astype('datetime64[us]'), index=column.index, name=column.name)
+
+
+# Local UTC offset (in microseconds) for each epoch microsecond value.
+# Offsets only change on quarter-hour boundaries in practice (half-hour zones
+# such as Australia/Adelaide switch at hh:30 UTC), so we look up each distinct
+# 15-minute bucket once rather than once per bout. A bucket whose two edges
+# disagree holds a transition after all, and its values are looked up one by
+# one.
+def local_utc_offsets(micros):
+    bucket_us = 15 * 60 * 1000000
+    buckets, inverse = np.unique(micros // bucket_us, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    offsets = np.empty(len(buckets), dtype='int64')
+    split = []
+
+    for i in range(0, len(buckets)):
+        start = int(buckets[i]) * bucket_us
+        offsets[i] = utc_offset(start)
+        if utc_offset(start + bucket_us - 1) != offsets[i]:
+            split.append(i)
+
+    result = offsets[inverse]
+    for i in split:
+        rows = np.flatnonzero(inverse == i)
+        result[rows] = [utc_offset(int(m)) for m in micros[rows]]
+    return result
+
+
+# Local UTC offset (in microseconds) at one epoch microsecond value
+def utc_offset(micros):
+    seconds = micros / 1000000
+    local = datetime.fromtimestamp(seconds)
+    utc = datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+    return (local - utc) // timedelta(microseconds=1)
 
-        return new_column
-    
 
-# Contains an aggregated set of results for a list of folders
+# A day's bout stats rebuilt from its aggregated.csv row: count, sum and M2
+# for bout duration and cadence (see AGGREGATED_METRICS). Minima/maxima are
+# unknown. Returns None if the row lacks the columns needed.
+def aggregated_stats(aggregated):
+    needed = ['wb_all__count', 'total_walking_duration_h', 'wb_all__duration_s__var',
+              'wb_all__cadence_spm__avg', 'wb_all__cadence_spm__var']
+    if len(aggregated) == 0 or any(c not in aggregated for c in needed):
+        return None
+    row = aggregated.iloc[0]
+
+    stats = ColumnStats(BOUT_METRICS)
+    n = int(row['wb_all__count'])
+    stats.rows = n
+    if n == 0:
+        return stats
+
+    means = {
+        'duration_s': float(row['total_walking_duration_h']) * 3600 / n,
+        'cadence_spm': float(row['wb_all__cadence_spm__avg'])
+    }
+    for col, mean in means.items():
+        if np.isnan(mean):
+            return None
+        i = BOUT_METRICS.index(col)
+        # The pipeline counts every bout, so cadence is taken to have no gaps
+        stats.count[i] = n
+        stats.sum[i] = mean * n
+        cv = float(row[f'wb_all__{col}__var'])
+        if n > 1 and not np.isnan(cv):
+            stats.m2[i] = (cv * mean) ** 2 * (n - 1)
+    return stats
+
+
+# Bout columns summarised by AggregatedResults, keyed by the attribute holding their mean
+MEAN_METRICS = {
+    'mean_cadence': 'cadence_spm',
+    'mean_stride_length': 'stride_length_m',
+    'mean_walking_speed': 'walking_speed_mps',
+    'mean_walking_bout_duration': 'duration_s'
+}
+
+# Contains an aggregated set of results for a list of folders.
+#
+# The summary values come from the days' bout_stats merged into one
+# ColumnStats, so add_folder()/remove_day() update them in O(new data) without
+# re-reading or re-concatenating the history. all_bouts/all_strides are only concatenated
+# when first accessed. Stride statistics are kept in stride_summary, which is
+# all the report needs, so read_data(stream_strides=True) never has to hold
+# the stride tables in memory.
+#
+# keep_frames=False drops each day's frames once it has been folded in, so only
+# the per-day summaries stay in memory; all_bouts/all_strides and r.wb etc.
+# still work by re-reading them.
 class AggregatedResults:
-    def __init__(self):
+    def __init__(self, keep_frames=True):
+        self.keep_frames = keep_frames
         self.results = []
         self.mean_cadence = 0
         self.mean_walking_speed = 0
@@ -143,56 +490,204 @@ class AggregatedResults:
         self.mean_daily_walking_time = 0
         self.number_sessions = 0
         self.number_of_bouts = 0
-        self.all_bouts = None;
-        self.all_strides = None;        
-
-    def read_data(self, base_path):
-        dirs = fast_scandir(base_path)
-        walking_bouts = []
-        strides = []
-        daily_walking_time = []
-
-        for i in range(0, len(dirs)):
-            r = FolderResults()
-            r.read_folder(dirs[i])
-            self.results.append(r)
-            walking_bouts.append(r.wb)
-            strides.append(r.strides)
-            daily_walking_time.append(r.total_walking_time)
-
-        # Aggregate the walking bouts
-        self.number_sessions = len(walking_bouts)
-        self.all_bouts = pd.concat(walking_bouts, axis=0)
-        self.number_of_bouts = len(self.all_bouts)
-
-        self.mean_cadence = self.all_bouts['cadence_spm'].mean()
-        self.mean_stride_length = self.all_bouts['stride_length_m'].mean()
-        self.mean_walking_speed = self.all_bouts['walking_speed_mps'].mean()
-        self.mean_walking_bout_duration = self.all_bouts['duration_s'].mean()
-        self.maximum_walking_bout_duration = self.all_bouts['duration_s'].max()
-        self.mean_daily_walking_time = pd.DataFrame(daily_walking_time,columns=['wt'])['wt'].mean()
-        
-        # Aggregate all of the strides
-        self.all_strides = pd.concat(strides, axis=0)
-                
-    def earliest_day(self):
-        earliest = 9999999999999
-        earliest_result = None
+        self.bout_stats = ColumnStats(BOUT_METRICS)
+        self.total_walking_time = 0
+        self._earliest = None
+        self._latest = None
+        self._all_bouts = None
+        self._all_strides = None
+        self.stride_summary = StrideSummary()
+        self.gait_stats = GaitStats()
+        self._all_gait = None
+        self.summary_metrics = None
 
-        for i in range(0, len(self.results)):
-            if self.results[i].start_timestamp < earliest:
-                earliest = self.results[i].start_timestamp
-                earliest_result = self.results[i]
+    # options are passed to FolderResults.read_folder:
+    #   cache: optional daycache.DayCache
+    #   stream_strides: summarise stride.csv in chunks instead of loading it
+    #   summary_only/metrics: combine the days' aggregated.csv instead of
+    #     reading bouts and strides; figures outside 'metrics' are left NaN
+    # Only day folders (with a metadata.json) are read, optionally limited to
+    # start <= session_day <= end. 'manifest' is passed to
+    # discovery.discover_days to skip re-walking unchanged directories.
+    def read_data(self, base_path, workers=None, executor=None, start=None, end=None, manifest=None, **options):
+        with profiling.span('read_data') as s:
+            with profiling.span('discover_days') as d:
+                dirs = [day.path for day in discover_days(base_path, start, end, manifest=manifest)]
+                d.rows = len(dirs)
+            if options.get('summary_only'):
+                self.summary_metrics = options.get('metrics') or SUMMARY_METRICS
 
-        return earliest_result
-    
-    def last_day(self):
-        latest = 0
-        latest_result = None
+            for r in load_folders(dirs, workers=workers, executor=executor, **options):
+                self.add_result(r)
+            s.rows = self.number_of_bouts
+
+    # Load the days start <= day <= end from a daystore.DayStore instead of
+    # the day folders. store.frame() gives the same range as one frame.
+    def read_store(self, store, start=None, end=None):
+        with profiling.span('read_data.store') as s:
+            for entry in store.day_entries(start, end):
+                r = FolderResults()
+                r.read_store(store, entry)
+                self.add_result(r)
+            s.rows = self.number_of_bouts
+
+    # Read one more day folder and fold it into the aggregate
+    def add_folder(self, folder, **options):
+        r = load_folder(folder, **options)
+        self.add_result(r)
+        return r
+
+    def add_result(self, r):
+        self.results.append(r)
+        self.merge_result(r)
+        if not self.keep_frames:
+            r.drop_frames()
 
-        for i in range(0, len(self.results)):
-            if self.results[i].start_timestamp > latest:
-                latest = self.results[i].start_timestamp
-                latest_result = self.results[i]
+        if self._earliest is None or r.start_timestamp < self._earliest.start_timestamp:
+            self._earliest = r
+        if r.start_timestamp > (self._latest.start_timestamp if self._latest is not None else 0):
+            self._latest = r
 
-        return latest_result        
\ No newline at end of file
+        self._all_bouts = None
+        self._all_strides = None
+        self._all_gait = None
+        self.update_means()
+
+    def merge_result(self, r):
+        if r.bout_stats is not None:
+            self.bout_stats.merge(r.bout_stats)
+        self.total_walking_time += r.total_walking_time
+        if r.stride_summary is not None:
+            self.stride_summary.merge(r.stride_summary)
+        if r.gait_stats is not None:
+            self.gait_stats.merge(r.gait_stats)
+
+    # Drop every result for 'day' from the aggregate. Returns the removed results.
+    def remove_day(self, day):
+        removed = [r for r in self.results if r.day == day]
+        if not removed:
+            return removed
+
+        # Minima/maxima can't be subtracted, so re-merge the per-day stats of
+        # the remaining days (no bout or stride data is touched)
+        self.results = [r for r in self.results if r.day != day]
+        self.bout_stats = ColumnStats(BOUT_METRICS)
+        self.stride_summary = StrideSummary()
+        self.gait_stats = GaitStats()
+        self.total_walking_time = 0
+        for r in self.results:
+            self.merge_result(r)
+
+        if self._earliest in removed or self._latest in removed:
+            self._earliest = min(self.results, key=lambda r: r.start_timestamp, default=None)
+            self._latest = max(self.results, key=lambda r: r.start_timestamp, default=None)
+            if self._latest is not None and self._latest.start_timestamp <= 0:
+                self._latest = None
+
+        self._all_bouts = None
+        self._all_strides = None
+        self._all_gait = None
+        self.update_means()
+
+        return removed
+
+    def update_means(self):
+        self.number_sessions = len(self.results)
+        self.number_of_bouts = self.bout_stats.rows
+        for attr, col in MEAN_METRICS.items():
+            setattr(self, attr, self.bout_stats.mean(col))
+        self.maximum_walking_bout_duration = self.bout_stats.get_max('duration_s')
+
+        if self.results:
+            self.mean_daily_walking_time = self.total_walking_time / len(self.results)
+        else:
+            self.mean_daily_walking_time = np.nan
+
+        # Days summarised from aggregated.csv only carry AGGREGATED_METRICS
+        if self.summary_metrics is not None:
+            for attr in MEAN_METRICS.keys() | {'maximum_walking_bout_duration'}:
+                if attr not in self.summary_metrics and attr not in AGGREGATED_METRICS:
+                    setattr(self, attr, np.nan)
+
+    # All walking bouts across the days, concatenated on first use
+    @property
+    def all_bouts(self):
+        if self._all_bouts is None and self.results:
+            # Dropped frames are re-read without being kept on the day; days
+            # read with summary_only=True may have no bouts at all
+            frames = [f for f in (r.load_frame('wb') for r in self.results) if f is not None]
+            if frames:
+                with profiling.span('concat.bouts') as s:
+                    self._all_bouts = pd.concat(frames, axis=0)
+                    s.rows = len(self._all_bouts)
+        return self._all_bouts
+
+    # All strides across the days, concatenated on first use. Days read with
+    # stream_strides=True (or dropped) are re-read from their source for this.
+    @property
+    def all_strides(self):
+        if self._all_strides is None and self.results:
+            strides = [f for f in (r.load_frame('strides') for r in self.results) if f is not None]
+            if strides:
+                with profiling.span('concat.strides') as s:
+                    self._all_strides = pd.concat(strides, axis=0)
+                    s.rows = len(self._all_strides)
+        return self._all_strides
+
+    # Per-bout gait figures of every day, with a 'day' column; kept on the
+    # days even when their frames are dropped, so nothing is re-read
+    @property
+    def all_gait(self):
+        if self._all_gait is None:
+            frames = [r.gait.assign(day=r.day) for r in self.results if r.gait is not None]
+            if frames:
+                self._all_gait = pd.concat(frames, axis=0, ignore_index=True)
+        return self._all_gait
+
+    # Gait variability of the whole recording, one row per GAIT_METRICS: 'cv'
+    # and 'asymmetry' (%) of all strides, exact from the merged GaitStats;
+    # 'bout_cv', the median within-bout CV; and 'p10'/'p50'/'p90' from the
+    # stride histograms (to their bin width)
+    def gait_summary(self):
+        bouts = self.all_gait
+        rows = {}
+        for metric in GAIT_METRICS:
+            rows[metric] = {
+                'cv': self.gait_stats.cv(metric),
+                'asymmetry': self.gait_stats.asymmetry(metric),
+                'bout_cv': float(bouts[f'{metric}__cv'].median()) if bouts is not None else np.nan,
+                **{f'p{q}': self.stride_summary.percentile(metric, q) for q in (10, 50, 90)}
+            }
+        return pd.DataFrame.from_dict(rows, orient='index')
+
+    # Day-by-hour 'minutes', 'strides' and mean bout 'speed' (days x 24, NaN
+    # where unknown) for the sorted 'days', stacked from the days' hourly
+    # figures so no bouts are re-read. Bouts count in the hour they start in.
+    def activity_matrix(self):
+        days = sorted({r.day for r in self.results if r.day is not None})
+        hourly = np.full((len(days), 24, len(HOURLY_FIELDS)), np.nan)
+
+        known = [r for r in self.results if r.day is not None and r.hourly is not None]
+        if known:
+            rows = np.searchsorted(days, [r.day for r in known])
+            totals = np.zeros_like(hourly)
+            np.add.at(totals, rows, np.stack([r.hourly for r in known]))
+            hourly[rows] = totals[rows]
+
+        field = {name: i for i, name in enumerate(HOURLY_FIELDS)}
+        counts = hourly[:, :, field['count']]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            speed = np.where(counts > 0, hourly[:, :, field['sum']] / counts, np.nan)
+
+        return {
+            'days': days,
+            'minutes': hourly[:, :, field['duration']] / 60,
+            'strides': hourly[:, :, field['strides']],
+            'speed': speed
+        }
+
+    def earliest_day(self):
+        return self._earliest
+
+    def last_day(self):
+        return self._latest
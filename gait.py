@@ -0,0 +1,237 @@
+# Stride-level gait variability per walking bout and per day.
+#
+# stride.csv holds one row per stride with its bout (wb_id) and side
+# (lr_label). gait_kernel() computes, for every bout at once, the stride
+# count, mean, coefficient of variation, left/right asymmetry and percentiles
+# of each GAIT_METRICS column. The strides are put in wb_id order (a no-op
+# for stride.csv, which is already sorted), so each bout is a contiguous
+# segment and every figure is a segment reduction: np.add.reduceat for the
+# counts, sums and squared deviations, and for the percentiles one argsort
+# per metric of bout + scaled value, falling back to np.lexsort (by bout,
+# then value) when rounding leaves a bout out of order (_segment_sorted).
+# There is no Python loop over bouts and no groupby.apply, so the cost is a
+# few passes over the stride array however many bouts a day has.
+#
+# GaitStats holds the day's sufficient statistics (count, sum and M2 of all
+# strides, counts and sums per side), built from the per-bout sums with
+# Chan et al.'s pairwise update rather than another pass. GaitStats of
+# different days merge exactly, so AggregatedResults reports the CV and
+# asymmetry of the whole recording without touching the strides again.
+#
+# Asymmetry is the symmetry index 100 * |L - R| / ((L + R) / 2) of the mean
+# left and right stride values, in percent. CVs use the sample standard
+# deviation (ddof=1), as pandas would.
+
+from lazyimport import lazy_import
+from stats import ColumnStats
+from strides import STRIDE_METRICS
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+GAIT_METRICS = STRIDE_METRICS
+
+# Per-bout percentiles of each metric
+PERCENTILES = (10, 50, 90)
+
+
+def _side_masks(labels):
+    # Boolean left/right masks from an lr_label column (categorical or text)
+    if isinstance(labels.dtype, pd.CategoricalDtype):
+        codes = labels.cat.codes.to_numpy()
+        categories = list(labels.cat.categories)
+        return tuple(codes == categories.index(side) if side in categories else np.zeros(len(codes), dtype=bool)
+                     for side in ('left', 'right'))
+    labels = labels.to_numpy(dtype=object)
+    return labels == 'left', labels == 'right'
+
+
+def _cv(count, total, m2):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count >= 2, np.sqrt(np.maximum(m2, 0) / (count - 1)) / (total / count), np.nan)
+
+
+def _asymmetry(left_count, left_sum, right_count, right_sum):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        left = np.where(left_count > 0, left_sum / left_count, np.nan)
+        right = np.where(right_count > 0, right_sum / right_count, np.nan)
+        return 100 * np.abs(left - right) / ((left + right) / 2)
+
+
+def _segment_sorted(values, valid, segment):
+    # 'values' sorted within each run of the (sorted) segment numbers, NaNs
+    # last. One argsort of segment + the value scaled into [0, 0.5]: the
+    # segments are already in order, so this is much cheaper than a lexsort.
+    # The scaling is monotonic, but nearly equal values can round to the
+    # same key; if that leaves any segment out of order, fall back to lexsort.
+    if not valid.any():
+        return values
+    low = values[valid].min()
+    span = values[valid].max() - low
+    scale = 0.5 / span if span > 0 else 0.0
+    key = segment + np.where(valid, (values - low) * scale, 0.75)
+    ordered = values[np.argsort(key, kind='stable')]
+    if np.any((ordered[1:] < ordered[:-1]) & (segment[1:] == segment[:-1])):
+        ordered = values[np.lexsort((values, segment))]
+    return ordered
+
+
+# Per-bout figures from strides x metrics 'values' (NaNs skipped) and the
+# left/right side masks: a dict of per-bout 'wb_id'/'n_strides', bouts x
+# metrics arrays ('count', 'sum', 'm2', ..., 'cv', 'asymmetry') and
+# bouts x metrics x percentiles 'percentiles'
+def gait_kernel(wb_id, left, right, values, percentiles=PERCENTILES):
+    wb_id = np.asarray(wb_id)
+    values = np.asarray(values, dtype=float).reshape(len(wb_id), -1)
+    left = np.asarray(left, dtype=bool)
+    right = np.asarray(right, dtype=bool)
+    n, width = values.shape
+
+    if n and np.any(wb_id[1:] < wb_id[:-1]):
+        order = np.argsort(wb_id, kind='stable')
+        wb_id, values, left, right = wb_id[order], values[order], left[order], right[order]
+
+    if n == 0:
+        empty = np.empty((0, width))
+        return {'wb_id': wb_id, 'n_strides': np.empty(0, dtype=np.intp),
+                **{k: empty for k in ('count', 'sum', 'm2', 'min', 'max', 'left_count', 'left_sum',
+                                      'right_count', 'right_sum', 'cv', 'asymmetry')},
+                'percentiles': np.empty((0, width, len(percentiles)))}
+
+    starts = np.flatnonzero(np.r_[True, wb_id[1:] != wb_id[:-1]])
+    lengths = np.diff(np.r_[starts, n])
+
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    count = np.add.reduceat(valid, starts, axis=0).astype(float)
+    total = np.add.reduceat(filled, starts, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+    deviations = np.where(valid, values - np.repeat(mean, lengths, axis=0), 0.0)
+    m2 = np.add.reduceat(deviations * deviations, starts, axis=0)
+    low = np.minimum.reduceat(np.where(valid, values, np.inf), starts, axis=0)
+    high = np.maximum.reduceat(np.where(valid, values, -np.inf), starts, axis=0)
+
+    on_left = valid & left[:, None]
+    on_right = valid & right[:, None]
+    left_count = np.add.reduceat(on_left, starts, axis=0).astype(float)
+    left_sum = np.add.reduceat(np.where(on_left, values, 0.0), starts, axis=0)
+    right_count = np.add.reduceat(on_right, starts, axis=0).astype(float)
+    right_sum = np.add.reduceat(np.where(on_right, values, 0.0), starts, axis=0)
+
+    # Percentiles: within each bout's segment the values are sorted (NaNs
+    # last), then read at the interpolated positions, as np.percentile
+    segment = np.repeat(np.arange(len(starts)), lengths)
+    q = np.asarray(percentiles, dtype=float) / 100
+    result = np.full((len(starts), width, len(q)), np.nan)
+    # Position of each bout's last valid value, per metric
+    last = (starts[:, None] + np.maximum(count - 1, 0)).astype(np.intp)
+    for j in range(width):
+        ordered = _segment_sorted(values[:, j], valid[:, j], segment)
+        position = starts[:, None] + q[None, :] * (last[:, j, None] - starts[:, None])
+        lower = np.floor(position).astype(np.intp)
+        upper = np.minimum(lower + 1, last[:, j, None])
+        interpolated = ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+        result[:, j] = np.where(count[:, j, None] > 0, interpolated, np.nan)
+
+    return {
+        'wb_id': wb_id[starts],
+        'n_strides': lengths,
+        'count': count,
+        'sum': total,
+        'm2': m2,
+        'min': low,
+        'max': high,
+        'left_count': left_count,
+        'left_sum': left_sum,
+        'right_count': right_count,
+        'right_sum': right_sum,
+        'cv': _cv(count, total, m2),
+        'asymmetry': _asymmetry(left_count, left_sum, right_count, right_sum),
+        'percentiles': result
+    }
+
+
+# Gait figures of a day's strides (stride.csv rows): one row per bout with
+# wb_id, n_strides and <metric>__cv, __asymmetry and __p<q> per metric, and
+# the day's GaitStats
+def bout_gait(strides, percentiles=PERCENTILES):
+    values = strides.reindex(columns=GAIT_METRICS).to_numpy(dtype='float64')
+    if 'lr_label' in strides:
+        left, right = _side_masks(strides['lr_label'])
+    else:
+        left = right = np.zeros(len(strides), dtype=bool)
+    kernel = gait_kernel(strides['wb_id'].to_numpy(), left, right, values, percentiles)
+
+    columns = {'wb_id': kernel['wb_id'], 'n_strides': kernel['n_strides']}
+    for j, metric in enumerate(GAIT_METRICS):
+        columns[f'{metric}__cv'] = kernel['cv'][:, j]
+        columns[f'{metric}__asymmetry'] = kernel['asymmetry'][:, j]
+        for k, p in enumerate(percentiles):
+            columns[f'{metric}__p{p:g}'] = kernel['percentiles'][:, j, k]
+    return pd.DataFrame(columns), GaitStats.from_kernel(kernel, rows=len(strides))
+
+
+class GaitStats:
+    def __init__(self):
+        self.stats = ColumnStats(GAIT_METRICS)
+        self.left = ColumnStats(GAIT_METRICS, variance=False)
+        self.right = ColumnStats(GAIT_METRICS, variance=False)
+
+    @classmethod
+    def from_kernel(cls, kernel, rows=None):
+        # Combine the per-bout sums of gait_kernel() into the day's stats
+        gait = cls()
+        count = kernel['count'].sum(axis=0)
+        total = kernel['sum'].sum(axis=0)
+        mean = np.divide(total, count, out=np.zeros(len(GAIT_METRICS)), where=count != 0)
+        bout_mean = np.divide(kernel['sum'], kernel['count'], out=np.zeros_like(kernel['sum']),
+                              where=kernel['count'] != 0)
+        # Chan et al.: M2 of the day = the bouts' M2 + their spread about the day mean
+        spread = kernel['count'] * (bout_mean - mean) ** 2
+
+        stats = gait.stats
+        stats.rows = int(kernel['n_strides'].sum()) if rows is None else rows
+        stats.count = count.astype('int64')
+        stats.nan_count = stats.rows - stats.count
+        stats.sum = total
+        stats.m2 = kernel['m2'].sum(axis=0) + spread.sum(axis=0)
+        stats.min = kernel['min'].min(axis=0, initial=np.inf)
+        stats.max = kernel['max'].max(axis=0, initial=-np.inf)
+        for side in ('left', 'right'):
+            side_stats = getattr(gait, side)
+            side_stats.count = kernel[side + '_count'].sum(axis=0).astype('int64')
+            side_stats.sum = kernel[side + '_sum'].sum(axis=0)
+        return gait
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.left.merge(other.left)
+        self.right.merge(other.right)
+        return self
+
+    def cv(self, metric):
+        i = GAIT_METRICS.index(metric)
+        return float(_cv(self.stats.count[i], self.stats.sum[i], self.stats.m2[i]))
+
+    def asymmetry(self, metric):
+        i = GAIT_METRICS.index(metric)
+        return float(_asymmetry(self.left.count[i], self.left.sum[i], self.right.count[i], self.right.sum[i]))
+
+    # Plain arrays/values for caching alongside a day folder
+    def to_arrays(self):
+        arrays = {}
+        info = {}
+        for name in ('stats', 'left', 'right'):
+            part_arrays, info[name] = getattr(self, name).to_arrays()
+            arrays.update({f'{name}/{k}': v for k, v in part_arrays.items()})
+        return arrays, info
+
+    @classmethod
+    def from_arrays(cls, arrays, info):
+        gait = cls()
+        for name in ('stats', 'left', 'right'):
+            part = {k[len(name) + 1:]: v for k, v in arrays.items() if k.startswith(name + '/')}
+            setattr(gait, name, ColumnStats.from_arrays(part, info[name]))
+        return gait
@@ -0,0 +1,350 @@
+# Self-contained report output.
+#
+# Inliner rewrites a rendered report so it needs no files next to it:
+#   - local stylesheets become <style> blocks. Rules whose selectors name a
+#     class or id the report doesn't use are dropped, as are @font-face rules
+#     for families nothing uses; url() references inside are inlined;
+#   - chart SVGs become <svg> elements in the page rather than base64
+#     images: minified (no XML prolog, metadata or comments, coordinates
+#     rounded, whitespace collapsed), their ids prefixed so several charts
+#     can share a document, and their own <style> scoped to the chart;
+#   - other images, fonts and scripts become base64 data: URIs.
+#
+# Files under the shared directories (the repo's assets: stylesheets, logos,
+# fonts) are memoized by content hash, so a process producing many reports
+# encodes each of them once, and only re-hashes them when their size or mtime
+# changes. Everything else -- the report's own charts -- is read and processed
+# each time and not kept, so a long-running service doesn't accumulate every
+# chart it has inlined. Remote (http/https) references are left as they are.
+
+import base64
+import hashlib
+import mimetypes
+import os
+import re
+from urllib.parse import unquote
+from urllib.parse import urlsplit
+
+ATTR_RE = re.compile(r'([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+TAG_RES = {
+    'link': re.compile(r'<link\b[^>]*>', re.I),
+    'img': re.compile(r'<img\b[^>]*>', re.I),
+    'script': re.compile(r'<script\b[^>]*\bsrc\s*=[^>]*>\s*</script>', re.I)
+}
+COMMENT_RE = re.compile(r'<!--(?!\[if).*?-->', re.S)
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+CSS_URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+SELECTOR_NAME_RE = re.compile(r'([.#])(-?[_a-zA-Z][-\w]*)')
+SVG_NUMBER_RE = re.compile(r'(?<![\w#.-])(-?\d+\.\d+)')
+# Geometry attributes whose numbers are rounded when minifying. transform and
+# style are left alone: matplotlib draws text as glyphs scaled by e.g.
+# scale(0.015625), which rounding would visibly distort.
+SVG_GEOMETRY_RE = re.compile(r'(\s(?:d|points|x|y|x1|y1|x2|y2|cx|cy|r|rx|ry)=")([^"]*)(")')
+SVG_ID_RE = re.compile(r'\bid="([^"]+)"')
+
+# Static assets shipped with the repo, shared by every report
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+
+
+def _attrs(tag):
+    return {m.group(1).lower(): m.group(2) if m.group(2) is not None else m.group(3) for m in ATTR_RE.finditer(tag)}
+
+
+def _is_local(url):
+    return bool(url) and not urlsplit(url).scheme and not url.startswith(('//', '#'))
+
+
+def _split_css(css):
+    # Top-level (prelude, block) pairs; block is None for statements like @import
+    rules = []
+    start = 0
+    i = 0
+    while i < len(css):
+        c = css[i]
+        if c == ';':
+            statement = css[start:i].strip()
+            if statement:
+                rules.append((statement, None))
+            start = i + 1
+        elif c == '{':
+            depth = 1
+            j = i + 1
+            while j < len(css) and depth:
+                depth += {'{': 1, '}': -1}.get(css[j], 0)
+                j += 1
+            rules.append((css[start:i].strip(), css[i + 1:j - 1]))
+            start = i = j
+            continue
+        i += 1
+    return rules
+
+
+def _minify_declarations(block):
+    declarations = []
+    for declaration in block.split(';'):
+        name, colon, value = declaration.partition(':')
+        if colon and name.strip():
+            declarations.append(f"{name.strip()}:{' '.join(value.split())}")
+    return ';'.join(declarations)
+
+
+def _font_families(value):
+    return {f.strip().strip('\'"').lower() for f in value.split(',')}
+
+
+class Inliner:
+    """
+    Turns rendered reports into self-contained HTML.
+
+    Parameters
+    ----------
+    prune_css : bool
+        Drop CSS rules and @font-face rules the report doesn't use.
+    minify_svg : bool
+        Minify the inlined SVGs.
+    svg_precision : int
+        Decimal places kept for SVG coordinates when minifying.
+    shared_dirs : sequence of str
+        Directories whose files are memoized across reports.
+    """
+
+    def __init__(self, prune_css=True, minify_svg=True, svg_precision=2, shared_dirs=(ASSETS_DIR,)):
+        self.prune_css = prune_css
+        self.minify_svg = minify_svg
+        self.svg_precision = svg_precision
+        self.shared_dirs = tuple(os.path.join(os.path.realpath(d), '') for d in shared_dirs)
+        # shared path -> ((size, mtime_ns), digest, bytes)
+        self._files = {}
+        # (kind, digest, ...) -> encoded/processed output of shared files
+        self._memo = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _shared(self, path):
+        return os.path.realpath(path).startswith(self.shared_dirs)
+
+    # (digest, bytes) of a file; kept only for shared files
+    def _read(self, path):
+        path = os.path.realpath(path)
+        shared = path.startswith(self.shared_dirs)
+        stat = os.stat(path)
+        key = (stat.st_size, stat.st_mtime_ns)
+        cached = self._files.get(path)
+        if cached is None or cached[0] != key:
+            with open(path, 'rb') as f:
+                data = f.read()
+            cached = (key, hashlib.sha1(data).hexdigest(), data)
+            if shared:
+                self._files[path] = cached
+        return cached[1], cached[2]
+
+    # Memoize build() under 'key' if it comes from a shared file
+    def _memoized(self, key, build, path):
+        if not self._shared(path):
+            return build()
+        value = self._memo.get(key)
+        if value is None:
+            self.misses += 1
+            value = self._memo[key] = build()
+        else:
+            self.hits += 1
+        return value
+
+    def data_uri(self, path):
+        digest, data = self._read(path)
+        mime_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        return self._memoized(('uri', digest, mime_type),
+                              lambda: f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}", path)
+
+    def inline(self, html, base_dir):
+        """
+        Inline the local stylesheets, images and scripts of 'html', whose
+        relative URLs resolve against base_dir.
+        """
+        html = COMMENT_RE.sub('', html)
+        classes = {c for value in re.findall(r'\bclass\s*=\s*"([^"]*)"', html) for c in value.split()}
+        ids = set(re.findall(r'\bid\s*=\s*"([^"]*)"', html))
+
+        def resolve(url):
+            path = os.path.join(base_dir, unquote(urlsplit(url).path))
+            return path if os.path.isfile(path) else None
+
+        def link(match):
+            tag = match.group(0)
+            attrs = _attrs(tag)
+            path = resolve(attrs.get('href', '')) if _is_local(attrs.get('href')) else None
+            if 'stylesheet' not in attrs.get('rel', '').lower().split() or path is None:
+                return tag
+            media = f' media="{attrs["media"]}"' if 'media' in attrs else ''
+            return f"<style{media}>{self.stylesheet(path, classes, ids)}</style>"
+
+        def img(match):
+            tag = match.group(0)
+            attrs = _attrs(tag)
+            path = resolve(attrs.get('src', '')) if _is_local(attrs.get('src')) else None
+            if path is None:
+                return tag
+            if path.lower().endswith('.svg'):
+                return self.svg_element(path, attrs)
+            return tag.replace(attrs['src'], self.data_uri(path), 1)
+
+        def script(match):
+            tag = match.group(0)
+            attrs = _attrs(tag)
+            path = resolve(attrs.get('src', '')) if _is_local(attrs.get('src')) else None
+            if path is None:
+                return tag
+            return tag.replace(attrs['src'], self.data_uri(path), 1)
+
+        for name, handler in (('link', link), ('img', img), ('script', script)):
+            html = TAG_RES[name].sub(handler, html)
+        return html
+
+    def inline_file(self, path, output=None):
+        # Inline a report.html in place (or into 'output')
+        with open(path) as f:
+            html = self.inline(f.read(), os.path.dirname(os.path.abspath(path)))
+        with open(output or path, 'w') as f:
+            f.write(html)
+        return output or path
+
+    def stylesheet(self, path, classes=None, ids=None):
+        path = os.path.realpath(path)
+        digest, data = self._read(path)
+        used = (frozenset(classes), frozenset(ids)) if self.prune_css and classes is not None else None
+        return self._memoized(('css', digest, os.path.dirname(path), used),
+                              lambda: self._process_css(data.decode('utf-8'), os.path.dirname(path), used), path)
+
+    def _process_css(self, css, css_dir, used):
+        rules = self._prune(_split_css(CSS_COMMENT_RE.sub('', css)), used)
+
+        # @font-face rules only for the families the remaining rules name
+        families = set()
+        for prelude, block in self._walk(rules):
+            if not prelude.startswith('@font-face') and block is not None:
+                for name, _, value in (d.partition(':') for d in block.split(';')):
+                    if name.strip().lower() in ('font-family', 'font'):
+                        families |= _font_families(value)
+
+        def keep_font(rule):
+            prelude, block = rule
+            if not prelude.startswith('@font-face') or used is None:
+                return True
+            match = re.search(r'font-family\s*:\s*([^;]+)', block)
+            return match is None or bool(_font_families(match.group(1)) & families)
+
+        css = self._serialise([r for r in rules if keep_font(r)])
+
+        def url(match):
+            ref = match.group(2)
+            path = os.path.join(css_dir, unquote(urlsplit(ref).path))
+            if not _is_local(ref) or not os.path.isfile(path):
+                return match.group(0)
+            return f'url("{self.data_uri(path)}")'
+
+        return CSS_URL_RE.sub(url, css)
+
+    def _prune(self, rules, used):
+        if used is None:
+            return rules
+        classes, ids = used
+        kept = []
+        for prelude, block in rules:
+            if block is None or prelude.startswith('@font-face') or prelude.startswith(('@keyframes', '@-webkit-keyframes', '@page')):
+                kept.append((prelude, block))
+            elif prelude.startswith('@'):
+                # Conditional group rules (@media, @supports): prune inside
+                inner = self._prune(_split_css(block), used)
+                if inner:
+                    kept.append((prelude, inner))
+            else:
+                selectors = []
+                for selector in prelude.split(','):
+                    # Names inside :not(...) or [...] don't have to be present
+                    plain = re.sub(r':not\([^)]*\)|\[[^\]]*\]', '', selector)
+                    names = SELECTOR_NAME_RE.findall(plain)
+                    if all(name in (classes if kind == '.' else ids) for kind, name in names):
+                        selectors.append(' '.join(selector.split()))
+                if selectors:
+                    kept.append((','.join(selectors), block))
+        return kept
+
+    def _walk(self, rules):
+        for prelude, block in rules:
+            if isinstance(block, list):
+                yield from self._walk(block)
+            else:
+                yield prelude, block
+
+    def _serialise(self, rules):
+        out = []
+        for prelude, block in rules:
+            prelude = ' '.join(prelude.split())
+            if block is None:
+                out.append(prelude + ';')
+            elif isinstance(block, list):
+                out.append(f"{prelude}{{{self._serialise(block)}}}")
+            elif prelude.startswith('@'):
+                # Nested blocks (e.g. @keyframes steps) kept as they are, whitespace collapsed
+                out.append(f"{prelude}{{{' '.join(block.split())}}}")
+            else:
+                out.append(f"{prelude}{{{_minify_declarations(block)}}}")
+        return ''.join(out)
+
+    def svg_element(self, path, attrs=None):
+        """
+        The SVG file as an inline <svg> element. class and style are copied
+        from 'attrs' (the <img> it replaces); alt becomes its aria-label.
+        """
+        digest, data = self._read(path)
+        svg = self._memoized(('svg', digest, self.minify_svg, self.svg_precision),
+                             lambda: self._process_svg(data.decode('utf-8'), 's' + digest[:8]), path)
+
+        extra = ''
+        for name in ('class', 'style'):
+            if attrs and attrs.get(name):
+                extra += f' {name}="{attrs[name]}"'
+        if attrs and attrs.get('alt'):
+            extra += f' role="img" aria-label="{attrs["alt"]}"'
+        return svg.replace('<svg', '<svg' + extra, 1)
+
+    def _process_svg(self, svg, prefix):
+        svg = svg[svg.index('<svg'):]
+        svg = re.sub(r'<!--.*?-->', '', svg, flags=re.S)
+
+        # Ids made unique to this chart; unreferenced ones dropped when minifying
+        referenced = set(re.findall(r'(?:url\(#|href="#)([^)"]+)', svg))
+
+        def rename_id(match):
+            name = match.group(1)
+            if self.minify_svg and name not in referenced:
+                return ''
+            return f'id="{prefix}-{name}"'
+        svg = SVG_ID_RE.sub(rename_id, svg)
+        svg = re.sub(r'(url\(#|href="#)([^)"]+)', lambda m: f'{m.group(1)}{prefix}-{m.group(2)}', svg)
+        svg = svg.replace('<svg', f'<svg id="{prefix}"', 1)
+
+        # The chart's own stylesheet would otherwise apply to the whole page
+        def scope(match):
+            rules = _split_css(match.group(2))
+            scoped = [(','.join(f'#{prefix} {s.strip()}' for s in p.split(',')), b) for p, b in rules]
+            return f'{match.group(1)}{self._serialise(scoped)}{match.group(3)}'
+        svg = re.sub(r'(<style[^>]*>)(.*?)(</style>)', scope, svg, flags=re.S)
+
+        if self.minify_svg:
+            svg = re.sub(r'<metadata>.*?</metadata>', '', svg, flags=re.S)
+            precision = self.svg_precision
+
+            def number(match):
+                text = f'{float(match.group(1)):.{precision}f}'.rstrip('0').rstrip('.')
+                return '0' if text == '-0' else text
+            svg = SVG_GEOMETRY_RE.sub(
+                lambda m: m.group(1) + SVG_NUMBER_RE.sub(number, m.group(2)) + m.group(3), svg)
+            svg = re.sub(r'\s+', ' ', svg)
+            svg = re.sub(r'>\s+<', '><', svg)
+            svg = re.sub(r'\s+(/?>)', r'\1', svg)
+            svg = re.sub(r' z "', ' z"', svg)
+        return svg.strip()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'files': len(self._files), 'entries': len(self._memo)}
@@ -0,0 +1,44 @@
+# Deferred imports for heavy dependencies.
+#
+#   pd = lazy_import('pandas')
+#
+# gives a module object that only imports pandas the first time one of its
+# attributes is used. Short-lived worker processes that never touch a stage
+# (e.g. a chart worker never parses CSVs) then never pay for its imports.
+
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        value = getattr(self._load(), attr)
+        # Cache on the proxy so later lookups are plain attribute reads
+        self.__dict__[attr] = value
+        return value
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_lazy_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name):
+    # Already imported: nothing to defer
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
@@ -1,28 +1,120 @@
 #!/usr/bin/env python3
 
+import argparse
 import os
 import json
-import pandas as pd
-import numpy as np
-import pdfkit
-import jinja2
+import time
+import concurrent.futures
 
+# Heavy dependencies are imported on first use, see lazyimport.py
+from lazyimport import lazy_import
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+jinja2 = lazy_import('jinja2')
+# Optional stages, only loaded when a report asks for them
+chartcache = lazy_import('chartcache')
+cohortindex = lazy_import('cohortindex')
+inliner = lazy_import('inliner')
+pdfrender = lazy_import('pdfrender')
+
+import dmo
+import profiling
 # Example: Your custom result class
 from folderresults import AggregatedResults
 import plot_gen  # Our new separate plotting module
 
-def main():
-    # Directory to load data from
-    load_dir = './test/'
+# Static assets (css, logos) shipped with the repo
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+
+# Longer recordings get the hourly activity as a heatmap
+MAX_BAR_CHART_DAYS = 7
+
+# Peers a cohort needs in the cohort index before the report shows percentiles
+# and the cohort's distribution (instead of the cohorts.json mean), and the
+# number of bins in the distribution charts
+MIN_PEERS = 5
+PEER_BINS = 20
+
+# Peer comparisons: cohorts.json/cohort index key, AggregatedResults figure,
+# chart label, axis label, chart file, and the wording of the comment
+PEER_COMPARISONS = (
+    ('mws', 'mean_walking_speed', 'Walking Speed', 'Mean Walking Speed (m/s)', 'peer_ws.svg',
+     'walking speed', 'faster', 'slower'),
+    ('msl', 'mean_stride_length', 'Stride Length', 'Mean Stride Length (m)', 'peer_msl.svg',
+     'stride length', 'longer', 'shorter'),
+    ('mc', 'mean_cadence', 'Cadence', 'Mean Cadence (/s)', 'peer_mcad.svg',
+     'cadence', 'higher', 'lower'),
+)
+
+
+def load_cohort_map(path='cohorts.json'):
+    # Load cohorts.json (peer data)
+    with open(path) as f:
+        return json.load(f)
+
+
+@profiling.profiled('load_template')
+def load_template(searchpath='', name='index.html'):
+    env = jinja2.Environment(loader=jinja2.FileSystemLoader(searchpath=searchpath))
+    return env.get_template(name)
+
+
+# Change of a figure from an earlier value: (delta, percentage), NaN when
+# there is no earlier value
+def change_since(value, previous):
+    delta = np.float64(value) - previous
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return delta, 100 * delta / abs(previous)
+
+
+# Sentence on a change since the last assessment, at the given precision
+def describe_change(delta, unit, precision):
+    if not np.isfinite(delta):
+        return 'This is your first assessment.'
+    if round(abs(delta), precision) == 0:
+        return 'It has not changed from your last assessment.'
+    direction = 'increased' if delta > 0 else 'declined'
+    return f"It {direction} by {abs(delta):.{precision}f} {unit} from your last assessment."
+
+
+# Sentence placing a figure among the peers: by its percentile rank when
+# known, otherwise against the cohort mean
+def describe_peer(what, more, less, percentile=None, value=None, mean=None):
+    if percentile is not None and np.isfinite(percentile):
+        if percentile >= 50:
+            return f"Your {what} is {more} than {percentile:.0f}% of people with your condition"
+        return f"Your {what} is {less} than {100 - percentile:.0f}% of people with your condition"
+    return f"Your {what} is {more if value > mean else less} than the average for your condition"
+
+
+# Build the mobility report for one participant: load_dir holds form.json,
+# cohort.json, dmo_history.json and one sub-folder per recorded day;
+# report.html goes to output_dir and the chart SVGs to chart_dir (default
+# <output_dir>/img). Only days with start <= session_day <= end are reported.
+# Optional stages:
+#   plot_workers / plot_executor: render the charts on worker processes
+#     (an existing plot_gen.make_executor pool overrides plot_workers)
+#   chart_cache: a chartcache.ChartCache reusing identical charts
+#   pdf: a pdfrender.PdfRenderer that also writes report.pdf
+#   inliner: an inliner.Inliner making report.html self-contained
+#   cohort_index: a cohortindex.CohortIndex placing the participant (the
+#     load_dir name) among their cohort by percentile
+# Returns the wall time in seconds of each stage ('load', 'plots', 'render'
+# and, with pdf, 'pdf').
+@profiling.profiled('generate_report')
+def generate_report(load_dir, output_dir, cohort_map, template, chart_dir=None, plot_workers=None, chart_cache=None,
+                    start=None, end=None, plot_executor=None, pdf=None, inliner=None, cohort_index=None):
+    timings = {}
+    t0 = time.perf_counter()
+
+    if chart_dir is None:
+        chart_dir = os.path.join(output_dir, 'img')
+    os.makedirs(chart_dir, exist_ok=True)
 
     # Load form.json
     with open(os.path.join(load_dir, 'form.json')) as f:
         form = json.load(f)
 
-    # Load cohorts.json (peer data)
-    with open('cohorts.json') as f:
-        cohort_map = json.load(f)
-
     # Identify the participant's cohort
     with open(os.path.join(load_dir, 'cohort.json')) as f:
         cohort_json = json.load(f)
@@ -30,127 +122,113 @@ def main():
 
     # This is the peer data for that cohort
     participant_peer_data = cohort_map[cohort]
-    print(participant_peer_data)
-
-    # Load DMO history
-    with open(os.path.join(load_dir, 'dmo_history.json')) as f:
-        dmo_history = json.load(f)
-
-    # Example: build your typical arrays (just a demonstration)
-    # The real code depends on your actual data structure
-    dmo_index = [entry['StartDay'] for entry in dmo_history]
-    dmo_walking_speed = [entry['MeanWalkingSpeed'] for entry in dmo_history]
-
-    # Convert into a DataFrame
-    # Suppose you want to plot 'Walking Speed' vs 'Capture Day'
-    # We'll just override with example data for demonstration:
-    dmo_speed_df = pd.DataFrame({
-        "Capture Day": [1, 2, 3, 4, 5],
-        "Walking Speed (m/sec)": [0.52, 0.50, 0.47, 0.49, 0.48]
-    }).set_index("Capture Day")
-
-    # Generate a line plot for DMO speed
-    plot_gen.save_plot(
-        data=dmo_speed_df,
+
+    # Earlier assessments (DMO history)
+    history = dmo.load_history(os.path.join(load_dir, 'dmo_history.json'))
+
+    # Now load or compute the participant's results. The report only needs
+    # the per-day summaries, so the day frames aren't kept.
+    result = AggregatedResults(keep_frames=False)
+    result.read_data(load_dir, start=start, end=end)
+
+    timings['load'] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+
+    # This recording joins the history in StartDay order (it may predate the
+    # latest assessment when a date range is asked for), unless it already has it
+    if result.number_sessions and np.datetime64(result.earliest_day().day, 'D') not in history.start_days:
+        history.append_result(result, stage_name='Current')
+
+    # Charts are collected as specs and rendered together by plot_gen.render_all
+    charts = []
+
+    # Walking speed over the assessments
+    charts.append(dict(
+        kind='save_plot',
+        data=history.series('MeanWalkingSpeed').rename('Walking Speed (m/sec)').to_frame(),
         plot_type='line',
         xlabel='Assessment Number',
         ylabel='Walking Speed (m/sec)',
         title='Change in Walking Speed',
-        filename='assets/img/dmo.svg'
-    )
+        filename=os.path.join(chart_dir, 'dmo.svg')
+    ))
 
-    # Another sample for your 'Longest Walking Bout' data
-    # (Overriding with example numbers)
-    dmo_max_bout_df = pd.DataFrame({
-        "Capture Day": [1, 2, 3, 4, 5],
-        "Longest Walk Bout (s)": [38.2, 40.51, 39.8, 37.6, 33.2]
-    }).set_index("Capture Day")
-    plot_gen.save_plot(
-        data=dmo_max_bout_df.rename(columns={"Longest Walk Bout (s)":"Longest Bout (s)"}),
+    # Longest walking bout over the assessments
+    charts.append(dict(
+        kind='save_plot',
+        data=history.series('MaximumWalkingBoutDuration').rename('Longest Bout (s)').to_frame(),
         plot_type='line',
         xlabel='Assessment Number',
         ylabel='Longest Bout (s)',
         title='Change in Longest Walking Bouts',
-        filename='assets/img/wbd.svg'
-    )
+        filename=os.path.join(chart_dir, 'wbd.svg')
+    ))
 
-    # Now load or compute the participant's results
-    result = AggregatedResults()
-    result.read_data(load_dir)
+    # Peer comparison: where the participant falls in their cohort's
+    # distribution when the cohort index has enough peers, otherwise against
+    # the cohort mean from cohorts.json
+    participant = os.path.basename(os.path.normpath(load_dir))
+    peer_comments = {}
+    for key, attr, name, ylabel, filename, what, more, less in PEER_COMPARISONS:
+        value = getattr(result, attr)
+        if cohort_index is not None and cohort_index.size(cohort, key) >= MIN_PEERS and np.isfinite(value):
+            peers = cohort_index.values(cohort, key)
+            counts, edges = cohort_index.histogram(
+                cohort, key, bins=PEER_BINS, range=(min(peers[0], value), max(peers[-1], value)))
+            peer_comments[key] = describe_peer(what, more, less, cohort_index.percentile(cohort, key, value, participant),
+                                               value, participant_peer_data[key])
+            charts.append(dict(
+                kind='save_plot',
+                data=pd.DataFrame({name: 100 * counts / counts.sum()}, index=(edges[:-1] + edges[1:]) / 2),
+                plot_type='distribution',
+                xlabel=ylabel,
+                ylabel='% of peers',
+                title=f'Peer Comparison - {name}',
+                filename=os.path.join(chart_dir, filename),
+                highlight=value
+            ))
+        else:
+            peer_comments[key] = describe_peer(what, more, less, value=value, mean=participant_peer_data[key])
+            charts.append(dict(
+                kind='save_plot',
+                data=pd.DataFrame([value, participant_peer_data[key]], columns=[name],
+                                  index=[form['participantId'], cohort]),
+                plot_type='bar',
+                xlabel='',
+                ylabel=ylabel,
+                title=f'Peer Comparison - {name}',
+                filename=os.path.join(chart_dir, filename)
+            ))
 
-    # Peer comparison data frames
-    peer_mws_df = pd.DataFrame(
-        [result.mean_walking_speed, participant_peer_data['mws']],
-        columns=['Walking Speed'],
-        index=[form['participantId'], cohort]
-    )
-    peer_msl_df = pd.DataFrame(
-        [result.mean_stride_length, participant_peer_data['msl']],
-        columns=['Stride Length'],
-        index=[form['participantId'], cohort]
-    )
-    peer_cad_df = pd.DataFrame(
-        [result.mean_cadence, participant_peer_data['mc']],
-        columns=['Cadence'],
-        index=[form['participantId'], cohort]
-    )
+    # Minutes walked in each hour of each day: one bar chart per day for a
+    # short recording, a single heatmap beyond that (a bar subplot per day
+    # gets slow to lay out and unreadable for long recordings)
+    activity = result.activity_matrix()
+    if len(activity['days']) <= MAX_BAR_CHART_DAYS:
+        charts.append(dict(
+            kind='plot_bar_multiple',
+            data_list=list(np.nan_to_num(activity['minutes'])),
+            labels=activity['days'],
+            ylabel="Minutes of activity",
+            title="Activity Levels by Session",
+            filename=os.path.join(chart_dir, 'hourly_steps.svg'),
+            facecolor=(247/256, 240/256, 231/256),  # optional
+            bar_color="#FF6F61"                     # optional
+        ))
+    else:
+        charts.append(dict(
+            kind='plot_activity_heatmap',
+            matrix=activity['minutes'],
+            days=activity['days'],
+            label="Minutes of activity",
+            title="Activity Levels by Session",
+            filename=os.path.join(chart_dir, 'hourly_steps.svg')
+        ))
 
-    # Create bar charts for peer comparison
-    plot_gen.save_plot(
-        peer_mws_df,
-        'bar',
-        '',
-        'Mean Walking Speed (m/s)',
-        'Peer Comparison - Walking Speed',
-        'assets/img/peer_ws.svg'
-    )
-    plot_gen.save_plot(
-        peer_msl_df,
-        'bar',
-        '',
-        'Mean Stride Length (m)',
-        'Peer Comparison - Stride Length',
-        'assets/img/peer_msl.svg'
-    )
-    plot_gen.save_plot(
-        peer_cad_df,
-        'bar',
-        '',
-        'Mean Cadence (/s)',
-        'Peer Comparison - Cadence',
-        'assets/img/peer_mcad.svg'
-    )
+    plot_gen.render_all(charts, workers=plot_workers, executor=plot_executor, cache=chart_cache)
 
-    # Example: multi-subplot bar chart for daily stride charts (hourly data)
-    steps_index = list(range(24))  # Hours
-    all_step_data = []
-    all_step_labels = []
-
-    # for i in range(result.number_sessions):
-    #     session = result.results[i]
-    #     steps = []
-    #     for j in range(len(session.hourly_speed)):
-    #         # Directly append the integer if session.hourly_speed[j] is just an int
-    #         steps.append(session.hourly_speed[j])
-    #     all_step_data.append(steps)
-    #     all_step_labels.append(session.day)
-    all_step_data = [
-        [0, 0., 0., 0., 0., 0., 19.2, 8.47, 24., 036.23, 33.52, 08.50, 3.47, 4.49, 2.9, 35.52, 45.50, 12.47, 3.49, 0.48, 0, 0, 0, 0],         # Session 1
-        [ 0, 0., 0., 0., 0., 0., 19.2, 8.47, 24., 36.23, 33.52, 8.50, 3.47, 4.49, 2.9, 35.52, 45.50, 12.47, 3.49, 0.48, 0, 0, 0, 0]    # Session 2
-    ]
-    all_step_labels = ["Session 1", "Session 2"]
-    
-
-
-    plot_gen.plot_bar_multiple(
-        data_list=all_step_data,
-        labels=all_step_labels,
-        ylabel="Minutes of activity",
-        title="Activity Levels by Session",
-        filename="assets/img/hourly_steps.svg",
-        facecolor=(247/256, 240/256, 231/256),  # optional
-        bar_color="#FF6F61"                     # optional
-    )
+    timings['plots'] = time.perf_counter() - t0
+    t0 = time.perf_counter()
 
     # Now, optionally build a summary dictionary for a Jinja2 template
     sd = {
@@ -169,26 +247,181 @@ def main():
         'pid': form['participantId']
     }
 
-    # Add some logic to compare participant vs peer
-    if result.mean_walking_speed > participant_peer_data['mws']:
-        sd['pmws_comments'] = 'Your walking speed is faster than the average for your condition'
-    else:
-        sd['pmws_comments'] = 'Your walking speed is slower than the average for your condition'
+    # Change since the previous assessment, for the summary table and the
+    # DMO comments: this recording's figures against the latest assessment
+    # before it. The history may already hold this recording, so its own
+    # last rows are not used.
+    current_day = result.earliest_day().day
+    for key, metric in (('mws', 'MeanWalkingSpeed'), ('cad', 'MeanCadence'), ('sl', 'MeanStrideLength')):
+        _, pct = change_since(getattr(result, dmo.RESULT_ATTRS[metric]), history.previous(metric, current_day))
+        sd[key + '_change'] = f"{pct:+.0f}%" if np.isfinite(pct) else '-'
 
-    # etc. for stride length, cadence, etc.
-    # ... fill out sd dict as needed ...
+    speed = result.mean_walking_speed
+    speed_delta, _ = change_since(speed, history.previous('MeanWalkingSpeed', current_day))
+    sd['dmo_mws'] = f"{speed:.1f}"
+    sd['dmo_mws_comments'] = describe_change(speed_delta, 'metres per second', 1)
+    bout = result.maximum_walking_bout_duration
+    bout_delta, _ = change_since(bout, history.previous('MaximumWalkingBoutDuration', current_day))
+    sd['dmo_wbd'] = f"{bout:.0f}"
+    sd['dmo_wbd_comments'] = describe_change(bout_delta, 'seconds', 1)
 
-    # Render a Jinja2 template (index.html) into an HTML report
-    env = jinja2.Environment(loader=jinja2.FileSystemLoader(searchpath=''))
-    template = env.get_template('index.html')
-    html = template.render(results=result, pid='100', sd=sd)
+    # Participant vs peers
+    sd['pmws_comments'] = peer_comments['mws']
+    sd['pmcad_comments'] = peer_comments['mc']
+    sd['pmsl_comments'] = peer_comments['msl']
 
-    with open('report.html', 'w') as f:
+    # Render the Jinja2 template (index.html) into an HTML report.
+    # Paths in the template are relative to the report itself.
+    with profiling.span('render.template'):
+        html = template.render(
+            results=result,
+            pid='100',
+            sd=sd,
+            assets=os.path.relpath(ASSETS_DIR, output_dir),
+            charts=os.path.relpath(chart_dir, output_dir)
+        )
+
+    if inliner is not None:
+        with profiling.span('render.inline'):
+            html = inliner.inline(html, output_dir)
+
+    html_path = os.path.join(output_dir, 'report.html')
+    with open(html_path, 'w') as f:
         f.write(html)
 
-    # Optionally convert HTML to PDF:
-    # pdfkit.from_file('report.html', 'report.pdf')
+    timings['render'] = time.perf_counter() - t0
+
+    if pdf is not None:
+        t0 = time.perf_counter()
+        with profiling.span('render.pdf'):
+            pdf.write_pdf(html_path)
+        timings['pdf'] = time.perf_counter() - t0
+
+    return timings
+
+
+def main(cohorts_path='cohorts.json', chart_cache_dir=None, trace_path=None, pdf_backend=None, inline=False,
+         cohort_index_path=None):
+    # Directory to load data from
+    load_dir = './test/'
+
+    generate_report(
+        load_dir,
+        output_dir='.',
+        cohort_map=load_cohort_map(cohorts_path),
+        template=load_template(),
+        chart_dir='assets/img',
+        chart_cache=chartcache.ChartCache(chart_cache_dir) if chart_cache_dir else None,
+        pdf=pdfrender.PdfRenderer(pdf_backend) if pdf_backend else None,
+        inliner=inliner.Inliner() if inline else None,
+        cohort_index=cohortindex.CohortIndex.load(cohort_index_path) if cohort_index_path else None
+    )
+
+    # Per-stage trace when profiling is on (--profile or MOBILITY_PROFILE)
+    if profiling.is_enabled():
+        print(f"Profile trace written to {profiling.write_trace(trace_path)}")
+
+
+# Per-process state for batch workers: the template (and the PDF renderer's
+# stylesheets) are compiled once per worker process rather than once per
+# report, and the inliner's encoded assets are shared by its reports.
+_worker = {}
+
+
+def _init_worker(cohort_map, searchpath, chart_cache_dir, pdf_backend=None, inline=False, cohort_index_path=None):
+    _worker['cohort_map'] = cohort_map
+    _worker['template'] = load_template(searchpath)
+    _worker['chart_cache'] = chartcache.ChartCache(chart_cache_dir) if chart_cache_dir else None
+    _worker['pdf'] = pdfrender.PdfRenderer(pdf_backend) if pdf_backend else None
+    _worker['inliner'] = inliner.Inliner() if inline else None
+    _worker['cohort_index'] = cohortindex.CohortIndex.load(cohort_index_path) if cohort_index_path else None
+
+
+def _batch_job(load_dir, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    # One trace per report, next to it
+    profiling.reset()
+    timings = generate_report(load_dir, output_dir, _worker['cohort_map'], _worker['template'],
+                              chart_cache=_worker['chart_cache'], pdf=_worker['pdf'],
+                              inliner=_worker['inliner'], cohort_index=_worker['cohort_index'])
+    profiling.write_trace(os.path.join(output_dir, 'profile.json'))
+    return timings
+
+
+def batch_main(participant_dirs, output_root='reports', workers=None, cohorts_path='cohorts.json', searchpath='',
+               chart_cache_dir=None, pdf_backend=None, inline=False, cohort_index_path=None):
+    """
+    Generate reports for many participants on a process pool.
+
+    Each participant gets its own <output_root>/<participant dir name>/ with
+    report.html (self-contained with inline=True; report.pdf too with a
+    pdf_backend) and an img/ folder of charts. cohorts.json is read once; the
+    template, PDF renderer, inliner and cohort index (cohort_index_path) are
+    set up once per worker process. A throughput summary is printed at the
+    end.
+
+    Returns
+    -------
+    dict
+        Participant directory -> stage timings (or the exception raised).
+    """
+    cohort_map = load_cohort_map(cohorts_path)
+    outcomes = {}
+
+    t0 = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cohort_map, searchpath, chart_cache_dir, pdf_backend, inline, cohort_index_path)) as pool:
+        futures = {}
+        for load_dir in participant_dirs:
+            name = os.path.basename(os.path.normpath(load_dir))
+            futures[load_dir] = pool.submit(_batch_job, load_dir, os.path.join(output_root, name))
+
+        for load_dir, future in futures.items():
+            try:
+                outcomes[load_dir] = future.result()
+            except Exception as e:
+                outcomes[load_dir] = e
+    wall = time.perf_counter() - t0
+
+    done = [t for t in outcomes.values() if isinstance(t, dict)]
+    failed = [d for d, t in outcomes.items() if not isinstance(t, dict)]
+
+    print(f"Reports: {len(done)} ok, {len(failed)} failed in {wall:.2f}s "
+          f"({len(done) / wall if wall > 0 else 0:.2f} reports/sec)")
+    for stage in ('load', 'plots', 'render', 'pdf'):
+        if done and stage in done[0]:
+            times = [t[stage] for t in done]
+            print(f"  {stage:<8} mean {np.mean(times):8.3f}s  max {np.max(times):8.3f}s  total {np.sum(times):8.2f}s")
+    for load_dir in failed:
+        print(f"  FAILED {load_dir}: {outcomes[load_dir]!r}")
+
+    return outcomes
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='Generate mobility reports.')
+    parser.add_argument('participants', nargs='*', help='Participant directories (batch mode). Without any, the ./test/ sample is reported.')
+    parser.add_argument('--out', default='reports', help='Output root for batch mode')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes for batch mode')
+    parser.add_argument('--cohorts', default='cohorts.json', help='Path to cohorts.json')
+    parser.add_argument('--chart-cache', default=None, help='Directory for the rendered chart cache')
+    parser.add_argument('--profile', nargs='?', const='1', default=None,
+                        help="Record a per-stage trace: 'spans' (default), optionally with ',cprofile' and/or ',memory'")
+    parser.add_argument('--trace', default=None, help='Where to write the trace (default: profile.json)')
+    parser.add_argument('--pdf', nargs='?', const='auto', default=None, choices=('auto', 'weasyprint', 'pdfkit'),
+                        help='Also write report.pdf (default backend: weasyprint if installed, else pdfkit)')
+    parser.add_argument('--inline', action='store_true', help='Write a self-contained report.html (assets inlined)')
+    parser.add_argument('--cohort-index', default=None,
+                        help='Cohort index (cohortindex.py) for percentile peer comparisons')
+    args = parser.parse_args()
+
+    if args.profile:
+        # Through the environment so batch worker processes pick it up too
+        os.environ[profiling.ENV_VAR] = args.profile
+        profiling.configure_from_string(args.profile)
+
+    if args.participants:
+        batch_main(args.participants, args.out, workers=args.workers, cohorts_path=args.cohorts,
+                   chart_cache_dir=args.chart_cache, pdf_backend=args.pdf, inline=args.inline,
+                   cohort_index_path=args.cohort_index)
+    else:
+        main(args.cohorts, args.chart_cache, args.trace, args.pdf, args.inline, args.cohort_index)
@@ -1,14 +1,177 @@
 # Various utility functions for interacting with the OSM
-from osmclient.client import *
+import concurrent.futures
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from lazyimport import lazy_import
+
+# osmclient is only needed once we actually talk to the OSM
+client = lazy_import('osmclient.client')
 
 def get_properties(project_code='', participant_code='', property_name=''):
-    pc = OSMProjectApiClient()
-    dc = OSMIoTManagmentAPIClient()
+    # Shares pooled clients and cached lookups with every other call
+    return list(default_fetcher().iter_properties(project_code, participant_code, property_name))
+
+
+# A fixed set of (project client, IoT client) pairs shared between threads.
+# Clients are created on first use and handed out one pair per caller, so
+# connections are reused instead of being rebuilt for every lookup.
+class ClientPool:
+    def __init__(self, size=8, project_client_factory=None, iot_client_factory=None):
+        self.size = size
+        self.project_client_factory = project_client_factory or (lambda: client.OSMProjectApiClient())
+        self.iot_client_factory = iot_client_factory or (lambda: client.OSMIoTManagmentAPIClient())
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            pair = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                reserve = self._created < self.size
+                if reserve:
+                    self._created += 1
+            # Pool exhausted: wait for another caller to hand a pair (or a
+            # free slot) back
+            pair = None if reserve else self._idle.get()
+        if pair is None:
+            # A free slot: build its clients outside the lock. If that fails
+            # the slot goes back to the pool rather than being lost.
+            try:
+                pair = (self.project_client_factory(), self.iot_client_factory())
+            except BaseException:
+                self._idle.put(None)
+                raise
+        return pair
+
+    @contextmanager
+    def clients(self):
+        pair = self._acquire()
+        try:
+            yield pair
+        except BaseException:
+            # The clients may be in a bad state: drop them and free the slot,
+            # so the next caller builds a fresh pair
+            self._idle.put(None)
+            raise
+        self._idle.put(pair)
+
+
+# Thread-safe memo with a time-to-live, for lookups that rarely change
+# (projects, participants, property definitions).
+class TTLCache:
+    def __init__(self, ttl=300.0, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+
+        value = loader()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class PropertyFetcher:
+    """
+    Batched access to participant property values (e.g. DMO history).
+
+    Parameters
+    ----------
+    pool : ClientPool
+        Clients to use (default: a new pool of 8).
+    ttl : float
+        Seconds to remember project/participant/property-definition lookups.
+    page_size : int
+        Number of property values requested per call.
+    """
+    def __init__(self, pool=None, ttl=300.0, page_size=1000):
+        self.pool = pool or ClientPool()
+        self.cache = TTLCache(ttl)
+        self.page_size = page_size
+
+    def property_definition(self, property_name):
+        def load():
+            with self.pool.clients() as (pc, dc):
+                return dc.getPropertyDefinitionByName(property_name)
+        return self.cache.get(('property', property_name), load)
+
+    def project(self, project_code):
+        def load():
+            with self.pool.clients() as (pc, dc):
+                return pc.getProjectByCode(project_code)
+        return self.cache.get(('project', project_code), load)
+
+    def participant(self, participant_code):
+        def load():
+            with self.pool.clients() as (pc, dc):
+                return pc.getParticipantByCode(participant_code)
+        return self.cache.get(('participant', participant_code), load)
+
+    def iter_properties(self, project_code, participant_code, property_name, page_size=None):
+        # Yields property values one page at a time, so a long history never
+        # has to arrive as a single response
+        page_size = page_size or self.page_size
+        property_definition = self.property_definition(property_name)
+        project = self.project(project_code)
+        participant = self.participant(participant_code)
+
+        # The server may cap a page below page_size, so a short page is not
+        # the end: carry on from what actually arrived until a page is empty
+        start = 0
+        while True:
+            with self.pool.clients() as (pc, dc):
+                page = pc.listParticipantPropertiesInProject(
+                    project.id, participant.id, property_definition.id, start, page_size)
+            page = list(page or [])
+            if not page:
+                break
+            yield from page
+            start += len(page)
+
+    def fetch_many(self, project_code, participant_codes, property_name, workers=8):
+        """
+        Fetch property values for many participants concurrently.
+
+        Returns
+        -------
+        dict
+            Participant code -> list of values, in the order of
+            'participant_codes'.
+        """
+        def fetch(code):
+            return list(self.iter_properties(project_code, code, property_name))
+
+        # Warm the shared lookups once rather than in every thread
+        self.property_definition(property_name)
+        self.project(project_code)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            values = pool.map(fetch, participant_codes)
+            return dict(zip(participant_codes, values))
 
-    property_definition = dc.getPropertyDefinitionByName(property_name)
-    project = pc.getProjectByCode(project_code)
-    participant = pc.getParticipantByCode(participant_code);
-    values = pc.listParticipantPropertiesInProject(project.id, participant.id, property_definition.id, 0, 10000000)
-    return values
 
+_default_fetcher = None
+_default_lock = threading.Lock()
 
+def default_fetcher():
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = PropertyFetcher()
+        return _default_fetcher
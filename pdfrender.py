@@ -0,0 +1,140 @@
+# PDF output for the reports.
+#
+# pdfkit converts report.html by running the external wkhtmltopdf binary: a new
+# process per report that re-reads and re-parses every stylesheet, font and
+# image the page references. The weasyprint backend renders in-process
+# instead, and a PdfRenderer is meant to be created once and reused for many
+# reports (mobility batch workers, the report service):
+#   - custom.css is parsed once into a weasyprint.CSS; the report's own <link>
+#     to it is answered with an empty sheet rather than parsed again;
+#   - fonts are configured once (one FontConfiguration);
+#   - static files under assets/ (logos, fonts) are read through a cache keyed
+#     on (size, mtime), so a batch reads them once per process;
+#   - the chart SVGs already written for the HTML report are embedded as they
+#     are, nothing is re-rendered;
+#   - remote resources (the Google font link) aren't fetched unless asked.
+#
+# pdfkit stays available as a fallback where weasyprint isn't installed.
+
+import importlib.util
+import mimetypes
+import os
+import shutil
+from urllib.parse import urlsplit
+from urllib.request import url2pathname
+
+from lazyimport import lazy_import
+pdfkit = lazy_import('pdfkit')
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+CUSTOM_CSS = os.path.join(ASSETS_DIR, 'css', 'custom.css')
+
+BACKENDS = ('weasyprint', 'pdfkit')
+
+
+def available_backends():
+    backends = []
+    if importlib.util.find_spec('weasyprint') is not None:
+        backends.append('weasyprint')
+    if importlib.util.find_spec('pdfkit') is not None and shutil.which('wkhtmltopdf'):
+        backends.append('pdfkit')
+    return backends
+
+
+class PdfRenderer:
+    """
+    Converts rendered report.html files to PDF.
+
+    Parameters
+    ----------
+    backend : str
+        'weasyprint', 'pdfkit' or 'auto' (weasyprint if installed, otherwise
+        pdfkit).
+    stylesheets : sequence of str
+        Stylesheets the reports link to, parsed once (weasyprint only).
+    static_dirs : sequence of str
+        Files below these directories are cached in memory (weasyprint only).
+    allow_remote : bool
+        Fetch http(s) resources; otherwise they are skipped.
+    """
+
+    def __init__(self, backend='auto', stylesheets=(CUSTOM_CSS,), static_dirs=(ASSETS_DIR,), allow_remote=False):
+        available = available_backends()
+        if backend == 'auto':
+            if not available:
+                raise RuntimeError('No PDF backend: install weasyprint, or pdfkit and wkhtmltopdf')
+            backend = available[0]
+        elif backend not in BACKENDS:
+            raise ValueError(f"Unknown PDF backend {backend!r}")
+        elif backend not in available:
+            raise RuntimeError(f"PDF backend {backend!r} is not available")
+
+        self.backend = backend
+        self.allow_remote = allow_remote
+        self.static_dirs = [os.path.join(os.path.realpath(d), '') for d in static_dirs]
+        self.count = 0
+        self._files = {}
+
+        if backend == 'weasyprint':
+            import weasyprint
+            from weasyprint.text.fonts import FontConfiguration
+            self._weasyprint = weasyprint
+            self._font_config = FontConfiguration()
+            self._stylesheets = [weasyprint.CSS(filename=path, font_config=self._font_config) for path in stylesheets]
+            self._preparsed = {os.path.realpath(path) for path in stylesheets}
+
+    def _fetch(self, url):
+        parts = urlsplit(url)
+        if parts.scheme != 'file':
+            if not self.allow_remote:
+                # weasyprint logs the failed resource and carries on without it
+                raise ValueError(f"Remote resource not fetched: {url}")
+            return self._weasyprint.default_url_fetcher(url)
+
+        path = os.path.realpath(url2pathname(parts.path))
+        mime_type = mimetypes.guess_type(path)[0]
+        if path in self._preparsed:
+            return {'string': b'', 'mime_type': 'text/css', 'redirected_url': url}
+
+        if not any(path.startswith(d) for d in self.static_dirs):
+            with open(path, 'rb') as f:
+                return {'string': f.read(), 'mime_type': mime_type, 'redirected_url': url}
+
+        stat = os.stat(path)
+        key = (stat.st_size, stat.st_mtime_ns)
+        cached = self._files.get(path)
+        if cached is None or cached[0] != key:
+            with open(path, 'rb') as f:
+                cached = self._files[path] = (key, f.read())
+        return {'string': cached[1], 'mime_type': mime_type, 'redirected_url': url}
+
+    def write_pdf(self, html_path, pdf_path=None):
+        """
+        Convert a report.html; relative paths in it resolve against its
+        directory. Writes next to it (report.pdf) unless pdf_path is given.
+        """
+        if pdf_path is None:
+            pdf_path = os.path.splitext(html_path)[0] + '.pdf'
+
+        if self.backend == 'weasyprint':
+            document = self._weasyprint.HTML(filename=html_path, url_fetcher=self._fetch)
+            document.write_pdf(pdf_path, stylesheets=self._stylesheets, font_config=self._font_config)
+        else:
+            pdfkit.from_file(html_path, pdf_path, options={'enable-local-file-access': '', 'quiet': ''})
+
+        self.count += 1
+        return pdf_path
+
+    def write_many(self, html_paths):
+        return [self.write_pdf(path) for path in html_paths]
+
+
+# One renderer per process and backend, for pool workers
+_renderers = {}
+
+
+def render_file(html_path, pdf_path=None, backend='auto'):
+    renderer = _renderers.get(backend)
+    if renderer is None:
+        renderer = _renderers[backend] = PdfRenderer(backend)
+    return renderer.write_pdf(html_path, pdf_path)
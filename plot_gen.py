@@ -1,8 +1,59 @@
-import matplotlib.pyplot as plt
-import pandas as pd
-import numpy as np
+import inspect
+import io
+import os
+import concurrent.futures
 
+import profiling
+from lazyimport import lazy_import
 
+# Charts are only ever written to files, so pin a headless backend before
+# matplotlib is first imported. pyplot itself is never needed.
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+matplotlib = lazy_import('matplotlib')
+mfigure = lazy_import('matplotlib.figure')
+mticker = lazy_import('matplotlib.ticker')
+mcolors = lazy_import('matplotlib.colors')
+np = lazy_import('numpy')
+
+
+# Figures are drawn through the object API (no pyplot state) and handed back
+# to a small per-process pool once saved, so repeated charts with the same
+# size/background reuse a warmed-up figure instead of building a new one.
+_figure_pool = {}
+
+
+def _get_figure(facecolor, figsize=None, layout=None):
+    key = (tuple(facecolor) if not isinstance(facecolor, str) else facecolor, figsize, layout)
+    pool = _figure_pool.get(key)
+    if pool:
+        return pool.pop()
+
+    fig = mfigure.Figure(facecolor=facecolor, figsize=figsize, layout=layout)
+    fig._pool_key = key
+    return fig
+
+
+def _release_figure(fig):
+    fig.clear()
+    _figure_pool.setdefault(fig._pool_key, []).append(fig)
+
+
+def warm_up():
+    """
+    Pay the one-off costs of the first chart (font cache, SVG backend import)
+    up front. Used as the initializer for render_all worker processes.
+    """
+    matplotlib.use('Agg')
+    fig = _get_figure((1, 1, 1))
+    ax = fig.add_subplot()
+    ax.bar([0, 1], [1, 2])
+    ax.set_title('warm up')
+    fig.savefig(io.StringIO(), format='svg', bbox_inches='tight')
+    _release_figure(fig)
+
+
+@profiling.profiled('plot.save_plot')
 def save_plot(
     data,
     plot_type,
@@ -10,9 +61,11 @@ def save_plot(
     ylabel,
     title,
     filename,
-    facecolor=(247/256, 240/256, 231/256)):
+    facecolor=(247/256, 240/256, 231/256),
+    cache=None,
+    highlight=None):
     """
-    Generate and save a plot (bar or line) based on input parameters.
+    Generate and save a plot (bar, line or distribution) based on input parameters.
 
     Parameters
     ----------
@@ -20,7 +73,8 @@ def save_plot(
         Data to plot (assumes one column of data).
         The DataFrame must be indexed by its x-values.
     plot_type : str
-        Either 'bar' or 'line'.
+        'bar', 'line' or 'distribution' (a histogram: data indexed by
+        equal-width bin centres, e.g. the percentage of peers per bin).
     xlabel : str
         Label for the x-axis.
     ylabel : str
@@ -31,7 +85,20 @@ def save_plot(
         File path to save the resulting plot.
     facecolor : tuple
         Background color as an (R, G, B) tuple with floats in [0,1].
+    cache : chartcache.ChartCache
+        Optional cache; an identical earlier chart is copied instead of redrawn.
+    highlight : float
+        For 'distribution': an x-value (the participant's own) marked with a
+        labelled line.
     """
+    key = None
+    if cache is not None:
+        key = cache.key('save_plot', dict(
+            data=data, plot_type=plot_type, xlabel=xlabel,
+            ylabel=ylabel, title=title, facecolor=facecolor, highlight=highlight))
+        if cache.get(key, filename):
+            return
+
     figsize=(12, 6)
     
     # Larger font sizes
@@ -49,7 +116,8 @@ def save_plot(
 
     if plot_type == 'bar':
         
-        fig, ax = plt.subplots(facecolor=facecolor)
+        fig = _get_figure(facecolor)
+        ax = fig.add_subplot()
         # Simple 2-color palette
         colors = ['#FF6F61', '#6B5B95']
         bar_width = 0.5
@@ -85,7 +153,8 @@ def save_plot(
 
     elif plot_type == 'line':
         
-        fig, ax = plt.subplots(facecolor=facecolor, figsize=figsize)
+        fig = _get_figure(facecolor, figsize)
+        ax = fig.add_subplot()
         # Plot each row in 'data' (but typically you have 1 column)
         # NOTE: key difference from your original approach is we use data.index
         # as the X-values, not 0..N. This keeps points & labels aligned.
@@ -118,17 +187,38 @@ def save_plot(
         # If a Pandas legend is auto-generated, remove it:
         if ax.get_legend():
             ax.legend().remove()
+    elif plot_type == 'distribution':
+
+        fig = _get_figure(facecolor, figsize)
+        ax = fig.add_subplot()
+        centres = data.index.to_numpy(dtype=float)
+        width = centres[1] - centres[0] if len(centres) > 1 else 1.0
+        ax.bar(centres, data.iloc[:, 0], width=width * 0.9, color='#6B5B95', alpha=0.6)
+
+        if highlight is not None and np.isfinite(highlight):
+            ax.axvline(highlight, color='#FF6F61', linewidth=3)
+            ax.annotate(
+                f'You: {highlight:.2f}',
+                (highlight, 1),
+                xycoords=('data', 'axes fraction'),
+                xytext=(6, -4),
+                textcoords='offset points',
+                ha='left',
+                va='top',
+                fontsize=tick_size,
+                color='#FF6F61'
+            )
     else:
-        raise ValueError("Unsupported plot type. Use 'bar' or 'line'.")
+        raise ValueError("Unsupported plot type. Use 'bar', 'line' or 'distribution'.")
 
-    # Adjust Y-limits to have a bit of space above
-    min_value = data.min().min()
+    # Adjust Y-limits to have a bit of space above (histograms start at zero)
+    min_value = 0 if plot_type == 'distribution' else data.min().min()
     max_value = data.max().max()
     buffer = (max_value - min_value) * 0.15 if (max_value - min_value) != 0 else 0.05
-    ax.set_ylim(min_value - buffer, max_value + buffer)
+    ax.set_ylim(0 if plot_type == 'distribution' else min_value - buffer, max_value + buffer)
 
     # Limit Y-axis ticks to ~5
-    ax.yaxis.set_major_locator(plt.MaxNLocator(5))
+    ax.yaxis.set_major_locator(mticker.MaxNLocator(5))
 
     ax.tick_params(axis='both', labelsize=tick_size)
 
@@ -147,9 +237,13 @@ def save_plot(
         bbox_inches="tight",
         pad_inches=0.5
     )
-    plt.close(fig)
+    _release_figure(fig)
+
+    if key is not None:
+        cache.put(key, filename)
 
 
+@profiling.profiled('plot.plot_bar_multiple')
 def plot_bar_multiple(
     data_list,
     labels,
@@ -157,7 +251,8 @@ def plot_bar_multiple(
     title,
     filename,
     facecolor=(247/256, 240/256, 231/256),
-    bar_color='#FF6F61'
+    bar_color='#FF6F61',
+    cache=None
 ):
     """
     Generate a multi-subplot bar chart and save it with larger font sizes.
@@ -178,19 +273,23 @@ def plot_bar_multiple(
         Background color as an (R, G, B) tuple, 0..1.
     bar_color : str
         Hex color code for the bar (default #FF6F61).
+    cache : chartcache.ChartCache
+        Optional cache; an identical earlier chart is copied instead of redrawn.
     """
+    key = None
+    if cache is not None:
+        key = cache.key('plot_bar_multiple', dict(
+            data_list=data_list, labels=labels, ylabel=ylabel, title=title,
+            facecolor=facecolor, bar_color=bar_color))
+        if cache.get(key, filename):
+            return
 
     num_plots = len(data_list)
 
     # Create figure with subplots
     # layout="constrained" auto-adjusts padding so labels, titles don’t overlap
-    fig, axes = plt.subplots(
-        num_plots,
-        1,
-        layout="constrained",
-        facecolor=facecolor,
-        figsize=(10, num_plots * 3)
-    )
+    fig = _get_figure(facecolor, (10, num_plots * 3), "constrained")
+    axes = fig.subplots(num_plots, 1)
 
     # Larger font sizes
     title_size = 18
@@ -246,7 +345,7 @@ def plot_bar_multiple(
 
         # Use the same tick size on both x and y
         ax.tick_params(axis='both', labelsize=tick_size)
-        ax.yaxis.set_major_locator(plt.MaxNLocator(5))
+        ax.yaxis.set_major_locator(mticker.MaxNLocator(5))
 
         # Axis labels, subplot titles
         ax.set_ylabel(ylabel, fontsize=label_size, rotation=0, labelpad=40)
@@ -270,4 +369,186 @@ def plot_bar_multiple(
         pad_inches=0.5
     )
 
-    plt.close(fig)
+    _release_figure(fig)
+
+    if key is not None:
+        cache.put(key, filename)
+
+
+@profiling.profiled('plot.plot_activity_heatmap')
+def plot_activity_heatmap(
+    matrix,
+    days,
+    label,
+    title,
+    filename,
+    facecolor=(247/256, 240/256, 231/256),
+    bar_color='#FF6F61',
+    cache=None
+):
+    """
+    Draw a days x 24 activity matrix as one heatmap image.
+
+    Unlike plot_bar_multiple (24 bar artists per day), the whole matrix is a
+    single image artist and the figure height is capped, so the render time
+    stays about the same however many days there are.
+
+    Parameters
+    ----------
+    matrix : array-like
+        Days x 24 values (e.g. minutes walked per hour); NaN cells are left
+        blank.
+    days : list of str
+        Row labels, one per day. At most ~15 are written on the axis.
+    label : str
+        Colour bar label.
+    title : str
+        Plot title.
+    filename : str
+        File path to save the resulting chart image.
+    facecolor : tuple
+        Background color as an (R, G, B) tuple, 0..1.
+    bar_color : str
+        Hex color code for the most active cells (default #FF6F61).
+    cache : chartcache.ChartCache
+        Optional cache; an identical earlier chart is copied instead of redrawn.
+    """
+    key = None
+    if cache is not None:
+        key = cache.key('plot_activity_heatmap', dict(
+            matrix=matrix, days=days, label=label, title=title,
+            facecolor=facecolor, bar_color=bar_color))
+        if cache.get(key, filename):
+            return
+
+    matrix = np.ma.masked_invalid(np.asarray(matrix, dtype=float).reshape(-1, 24))
+    num_days = matrix.shape[0]
+
+    title_size = 18
+    label_size = 12
+    tick_size = 10
+
+    fig = _get_figure(facecolor, (12, min(3 + 0.25 * num_days, 10)), "constrained")
+    ax = fig.add_subplot()
+
+    cmap = mcolors.LinearSegmentedColormap.from_list('activity', ['#FFFFFF', bar_color])
+    cmap.set_bad(facecolor)
+    image = ax.imshow(matrix, cmap=cmap, aspect='auto', interpolation='nearest', vmin=0,
+                      extent=(-0.5, 23.5, num_days - 0.5, -0.5))
+
+    ax.set_xticks(range(0, 24, 2))
+    ax.set_xticklabels(range(0, 24, 2), fontsize=tick_size)
+    ax.set_xlabel('Hour of day', fontsize=label_size)
+
+    step = max(1, int(np.ceil(num_days / 15)))
+    ax.set_yticks(range(0, num_days, step))
+    ax.set_yticklabels(list(days)[::step], fontsize=tick_size)
+
+    colorbar = fig.colorbar(image, ax=ax, pad=0.02)
+    colorbar.set_label(label, fontsize=label_size)
+    colorbar.ax.tick_params(labelsize=tick_size)
+
+    ax.set_title(title, fontsize=title_size)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+
+    fig.savefig(
+        filename,
+        transparent=True,
+        bbox_inches="tight",
+        pad_inches=0.5
+    )
+
+    _release_figure(fig)
+
+    if key is not None:
+        cache.put(key, filename)
+
+
+# Plot functions that can be named in a render_all spec
+PLOT_FUNCTIONS = {
+    'save_plot': save_plot,
+    'plot_bar_multiple': plot_bar_multiple,
+    'plot_activity_heatmap': plot_activity_heatmap,
+}
+
+
+def _render_spec(spec):
+    spec = dict(spec)
+    kind = spec.pop('kind')
+    if kind not in PLOT_FUNCTIONS:
+        raise ValueError(f"Unsupported plot kind '{kind}'. Use one of {sorted(PLOT_FUNCTIONS)}.")
+    PLOT_FUNCTIONS[kind](**spec)
+    return spec['filename']
+
+
+def _spec_key(cache, spec):
+    # Same parameters (defaults filled in) that the plot function itself hashes
+    spec = dict(spec)
+    kind = spec.pop('kind')
+    bound = inspect.signature(PLOT_FUNCTIONS[kind]).bind(**spec)
+    bound.apply_defaults()
+    params = {k: v for k, v in bound.arguments.items() if k not in ('filename', 'cache')}
+    return cache.key(kind, params)
+
+
+def render_all(specs, workers=None, executor=None, cache=None):
+    """
+    Render a list of charts, optionally on a pool of worker processes.
+
+    Parameters
+    ----------
+    specs : list of dict
+        One dict per chart: 'kind' (a PLOT_FUNCTIONS name) plus
+        the keyword arguments for that function.
+    workers : int
+        Number of worker processes. None or 1 renders serially in-process.
+    executor : concurrent.futures.Executor
+        Existing pool to reuse across calls (e.g. from make_executor);
+        overrides 'workers'.
+    cache : chartcache.ChartCache
+        Optional chart cache. Lookups happen here in the calling process, so
+        only misses are sent to the workers and the hit/miss counters stay
+        accurate.
+
+    Returns
+    -------
+    list of str
+        The written filenames, in the same order as 'specs'.
+    """
+    with profiling.span('plot.render_all', rows=len(specs)):
+        if cache is None:
+            return _render_specs(specs, workers, executor)
+
+        misses = []
+        for spec in specs:
+            key = _spec_key(cache, spec)
+            if not cache.get(key, spec['filename']):
+                misses.append((key, spec))
+
+        _render_specs([spec for key, spec in misses], workers, executor)
+        for key, spec in misses:
+            cache.put(key, spec['filename'])
+
+        return [spec['filename'] for spec in specs]
+
+
+def _render_specs(specs, workers=None, executor=None):
+    if executor is not None:
+        return list(executor.map(_render_spec, specs))
+
+    if workers is None or workers <= 1 or not specs:
+        return [_render_spec(spec) for spec in specs]
+
+    with make_executor(workers) as pool:
+        return list(pool.map(_render_spec, specs))
+
+
+def make_executor(workers=None, mp_context=None):
+    """
+    Process pool of chart workers, each warmed up with the Agg backend.
+
+    Pass mp_context (e.g. multiprocessing.get_context('spawn')) when the
+    calling process already runs threads, where forking workers is unsafe.
+    """
+    return concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=mp_context, initializer=warm_up)
@@ -0,0 +1,268 @@
+# Stage-level timing for the report pipeline.
+#
+# Code marks its stages with named spans:
+#
+#     with profiling.span('read_folder') as s:
+#         ...
+#         s.rows = len(wb)
+#
+#     @profiling.profiled('plot.save_plot')
+#     def save_plot(...): ...
+#
+# Each span records wall time, CPU time of its thread, rows processed and,
+# with memory tracing on, peak traced memory. write_trace() dumps them as JSON
+# together with per-stage totals and, optionally, a cProfile summary.
+#
+# Profiling is off unless configure() is called, or MOBILITY_PROFILE is set in
+# the environment (e.g. MOBILITY_PROFILE=1, MOBILITY_PROFILE=cprofile,memory).
+# When off, span() returns a shared no-op object and profiled() wrappers call
+# straight through, so the instrumentation can stay in place.
+#
+# Spans are collected per process: work done on a process pool (e.g.
+# load_folders(executor='process')) is only visible as the enclosing span.
+
+import functools
+import json
+import os
+import threading
+import time
+
+ENV_VAR = 'MOBILITY_PROFILE'
+TRACE_ENV_VAR = 'MOBILITY_TRACE'
+
+# The active profiler, or None when profiling is off
+_profiler = None
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ('profiler', 'name', 'rows', 'parent', 'start', 'cpu_start', 'peak_mem', 'depth')
+
+    def __init__(self, profiler, name, rows):
+        self.profiler = profiler
+        self.name = name
+        self.rows = rows
+        self.peak_mem = None
+
+    def __enter__(self):
+        stack = self.profiler.stack()
+        self.parent = stack[-1].name if stack else None
+        self.depth = len(stack)
+        stack.append(self)
+        if self.profiler.memory:
+            self.profiler.enter_memory(self)
+        self.cpu_start = time.thread_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        cpu = time.thread_time() - self.cpu_start
+        stack = self.profiler.stack()
+        stack.pop()
+        if self.profiler.memory:
+            self.profiler.exit_memory(self, stack)
+
+        self.profiler.record({
+            'name': self.name,
+            'parent': self.parent,
+            'depth': self.depth,
+            'thread': threading.current_thread().name,
+            'start': self.start - self.profiler.t0,
+            'wall': end - self.start,
+            'cpu': cpu,
+            'rows': self.rows,
+            'peak_mem': self.peak_mem
+        })
+        return False
+
+
+class Profiler:
+    def __init__(self, cprofile=False, memory=False):
+        self.cprofile = None
+        self.memory = memory
+        self.spans = []
+        self.t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        if memory:
+            import tracemalloc
+            self._tracemalloc = tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+        if cprofile:
+            import cProfile
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+
+    def stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def record(self, entry):
+        with self._lock:
+            self.spans.append(entry)
+
+    # tracemalloc keeps a single peak, so each span resets it on entry and
+    # hands its own peak up to the enclosing span on exit
+    def enter_memory(self, span):
+        stack = self.stack()
+        current, peak = self._tracemalloc.get_traced_memory()
+        if len(stack) > 1:
+            parent = stack[-2]
+            parent.peak_mem = max(parent.peak_mem or 0, peak)
+        self._tracemalloc.reset_peak()
+        span.peak_mem = current
+
+    def exit_memory(self, span, stack):
+        current, peak = self._tracemalloc.get_traced_memory()
+        span.peak_mem = max(span.peak_mem, peak)
+        if stack:
+            stack[-1].peak_mem = max(stack[-1].peak_mem or 0, span.peak_mem)
+
+    def stop(self):
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        if self.memory and self._tracemalloc.is_tracing():
+            self._tracemalloc.stop()
+
+    # Totals per stage name, in order of first appearance
+    def totals(self):
+        totals = {}
+        with self._lock:
+            spans = list(self.spans)
+        for s in sorted(spans, key=lambda s: s['start']):
+            t = totals.setdefault(s['name'], {'count': 0, 'wall': 0.0, 'cpu': 0.0, 'rows': 0, 'peak_mem': None})
+            t['count'] += 1
+            t['wall'] += s['wall']
+            t['cpu'] += s['cpu']
+            t['rows'] += s['rows'] or 0
+            if s['peak_mem'] is not None:
+                t['peak_mem'] = max(t['peak_mem'] or 0, s['peak_mem'])
+        return totals
+
+    def cprofile_summary(self, limit=30):
+        import pstats
+        stats = pstats.Stats(self.cprofile)
+        rows = []
+        for (filename, line, func), (cc, nc, tt, ct, callers) in stats.stats.items():
+            rows.append({'function': f'{os.path.basename(filename)}:{line}({func})',
+                         'calls': nc, 'tottime': tt, 'cumtime': ct})
+        rows.sort(key=lambda r: r['cumtime'], reverse=True)
+        return rows[:limit]
+
+    def report(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s['start'])
+        report = {
+            'pid': os.getpid(),
+            'wall': time.perf_counter() - self.t0,
+            'totals': self.totals(),
+            'spans': spans
+        }
+        if self.cprofile is not None:
+            report['cprofile'] = self.cprofile_summary()
+        return report
+
+
+def configure(cprofile=False, memory=False):
+    # Start profiling (replacing any active profiler); returns the Profiler
+    global _profiler
+    if _profiler is not None:
+        _profiler.stop()
+    _profiler = Profiler(cprofile=cprofile, memory=memory)
+    return _profiler
+
+
+# Start a fresh trace with the same options, e.g. once per report in a worker
+def reset():
+    if _profiler is None:
+        return None
+    return configure(cprofile=_profiler.cprofile is not None, memory=_profiler.memory)
+
+
+def disable():
+    global _profiler
+    if _profiler is not None:
+        _profiler.stop()
+    _profiler = None
+
+
+def is_enabled():
+    return _profiler is not None
+
+
+# Parse a MOBILITY_PROFILE / --profile value: '1', 'on' or 'spans' for spans
+# only; add 'cprofile' and/or 'memory' (comma separated) for more.
+def configure_from_string(value):
+    options = {o.strip().lower() for o in value.split(',') if o.strip()}
+    if not options or options <= {'0', 'off', 'false', 'no'}:
+        disable()
+        return None
+    return configure(cprofile='cprofile' in options, memory='memory' in options)
+
+
+def configure_from_env():
+    value = os.environ.get(ENV_VAR)
+    if value:
+        return configure_from_string(value)
+    return None
+
+
+def span(name, rows=None):
+    if _profiler is None:
+        return _NULL_SPAN
+    return Span(_profiler, name, rows)
+
+
+def profiled(name=None):
+    # Decorator: run the function inside a span (named after it by default)
+    def decorate(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return func(*args, **kwargs)
+            with Span(_profiler, span_name, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def report():
+    return _profiler.report() if _profiler is not None else None
+
+
+# Write the trace of the active profiler as JSON (plus the raw cProfile stats
+# next to it as <path>.prof). Default path: $MOBILITY_TRACE or profile.json.
+def write_trace(path=None):
+    if _profiler is None:
+        return None
+    path = path or os.environ.get(TRACE_ENV_VAR) or 'profile.json'
+    with open(path, 'w') as f:
+        json.dump(_profiler.report(), f, indent=1)
+    if _profiler.cprofile is not None:
+        _profiler.cprofile.dump_stats(path + '.prof')
+    return path
+
+
+configure_from_env()
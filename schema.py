@@ -0,0 +1,159 @@
+# Explicit schemas for the CSV files in a day folder.
+#
+# Every file is read with a fixed column list and compact dtypes (int32,
+# float32, categoricals) instead of letting pandas infer types on every file.
+# The header is checked against the schema before parsing, so a file whose
+# columns have drifted fails straight away with a SchemaError naming the file
+# and the offending columns, rather than surfacing later as a KeyError or a
+# silently wrong mean.
+
+import csv
+import importlib.util
+import re
+
+from lazyimport import lazy_import
+
+pd = lazy_import('pandas')
+
+
+# The pyarrow CSV engine is used when installed; it doesn't support chunked
+# reads, so those always use the C engine.
+DEFAULT_ENGINE = 'pyarrow' if importlib.util.find_spec('pyarrow') else 'c'
+
+
+class SchemaError(ValueError):
+    pass
+
+
+class TableSchema:
+    def __init__(self, name, dtypes, optional=(), ignored=(), patterns=(), rename=None):
+        # dtypes: column -> dtype for the columns we load
+        # optional: loaded when present, but not required
+        # ignored: allowed in the file, never loaded
+        # patterns: (regex, dtype) for families of columns (e.g. aggregated.csv)
+        # rename: header name -> column name (e.g. the unnamed index column)
+        self.name = name
+        self.dtypes = dtypes
+        self.optional = set(optional)
+        self.ignored = set(ignored)
+        self.patterns = [(re.compile(p), dtype) for p, dtype in patterns]
+        self.rename = rename or {}
+
+    def dtype_for(self, column):
+        if column in self.dtypes:
+            return self.dtypes[column]
+        for pattern, dtype in self.patterns:
+            if pattern.fullmatch(column):
+                return dtype
+        return None
+
+    # Check a header row; returns the (renamed) column names
+    def validate(self, header, path=''):
+        columns = [self.rename.get(c, c) for c in header]
+
+        missing = [c for c in self.dtypes if c not in columns and c not in self.optional]
+        unknown = [c for c in columns if c not in self.ignored and self.dtype_for(c) is None]
+        duplicated = sorted(set(c for c in columns if columns.count(c) > 1))
+
+        problems = []
+        if missing:
+            problems.append(f"missing columns {missing}")
+        if unknown:
+            problems.append(f"unexpected columns {unknown}")
+        if duplicated:
+            problems.append(f"duplicated columns {duplicated}")
+        if problems:
+            raise SchemaError(f"{path or self.name}: {self.name} schema mismatch: " + '; '.join(problems))
+
+        return columns
+
+
+# Bouts may lack their sample range or stride count (empty cells), so those
+# are floats: float64 holds any sample offset exactly, float32 any count
+WB_SCHEMA = TableSchema('wb', {
+    'wb_id': 'int32',
+    'start': 'float64',
+    'end': 'float64',
+    'n_strides': 'float32',
+    'rule_name': 'category',
+    'duration_s': 'float32',
+    'stride_duration_s': 'float32',
+    'cadence_spm': 'float32',
+    'stride_length_m': 'float32',
+    'walking_speed_mps': 'float32'
+})
+
+STRIDE_SCHEMA = TableSchema('stride', {
+    'wb_id': 'int32',
+    'start': 'int64',
+    'end': 'int64',
+    'lr_label': 'category',
+    'stride_duration_s': 'float32',
+    'cadence_spm': 'float32',
+    'stride_length_m': 'float32',
+    'walking_speed_mps': 'float32'
+}, ignored=['s_id', 'original_gs_id'])
+
+MASK_SCHEMA = TableSchema('mask', {
+    'wb_id': 'int32',
+    'start': 'boolean',
+    'end': 'boolean',
+    'n_strides': 'boolean',
+    'rule_name': 'boolean',
+    'rule_obj': 'boolean',
+    'duration_s': 'boolean',
+    'stride_duration_s': 'boolean',
+    'cadence_spm': 'boolean',
+    'stride_length_m': 'boolean',
+    'walking_speed_mps': 'boolean'
+}, optional=['rule_obj'])
+
+# aggregated.csv is one row of <bout group>__<metric>__<stat> columns. The
+# groups vary with the pipeline configuration, so they are matched by pattern.
+# It is a single row, so float64 costs nothing and keeps full precision.
+AGGREGATED_SCHEMA = TableSchema('aggregated', {
+    'group': 'str',
+    'wb_all__count': 'int32',
+    'total_walking_duration_h': 'float64',
+    'wb_all__duration_s__avg': 'float64',
+    'wb_all__duration_s__max': 'float64'
+}, patterns=[
+    (r'wb_\w+__count', 'int32'),
+    (r'wb_\w+__\w+__(avg|max|min|var|std|median)', 'float64'),
+    (r'total_\w+', 'float64')
+], rename={'': 'group'})
+
+
+def read_header(path):
+    with open(path, newline='') as f:
+        return next(csv.reader(f), [])
+
+
+# Read a day-folder CSV with its schema (WB_SCHEMA, STRIDE_SCHEMA, ...). With
+# a chunksize, returns an iterator of frames of that many rows. The engine
+# defaults to pyarrow when installed. Raises SchemaError if the header doesn't
+# match the schema or a value can't be parsed as its column's dtype.
+def read_table(path, schema, chunksize=None, engine=None):
+    header = read_header(path)
+    columns = schema.validate(header, path)
+
+    usecols = [c for c in columns if c not in schema.ignored]
+    dtypes = {c: schema.dtype_for(c) for c in usecols}
+
+    kwargs = dict(header=0, names=columns, usecols=usecols, dtype=dtypes)
+    if chunksize is not None:
+        return _read_chunks(path, chunksize, kwargs)
+
+    try:
+        return pd.read_csv(path, engine=engine or DEFAULT_ENGINE, **kwargs)
+    except (ValueError, TypeError) as e:
+        raise SchemaError(f"{path}: {e}") from e
+
+
+def _read_chunks(path, chunksize, kwargs):
+    try:
+        with pd.read_csv(path, chunksize=chunksize, engine='c', **kwargs) as reader:
+            for chunk in reader:
+                yield chunk
+    except (ValueError, TypeError) as e:
+        raise SchemaError(f"{path}: {e}") from e
@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+# Report service: generates mobility reports on demand, e.g. when a device
+# upload completes, rather than as one-shot `python mobility.py` runs.
+#
+# Jobs (participant, start, end) come from three front ends, all feeding the
+# same asyncio queue:
+#   - ReportService.submit(), for callers in the same process;
+#   - DirectoryWatcher, which polls a data root and queues a participant once
+#     its day folders changed and then stayed unchanged for a poll;
+#   - a small HTTP endpoint (asyncio.start_server):
+#       POST /reports   {"participant": "<dir name>", "start": ..., "end": ..., "wait": false}
+#       GET  /reports/<job id>
+#       GET  /metrics
+#
+# A fixed number of consumer tasks bounds how many reports run at once. Each
+# report runs mobility.generate_report on a thread pool (file loading and
+# template rendering are mostly I/O and pandas, which release the GIL), while
+# its charts (and, with a PDF backend, report.pdf) go to a shared process pool
+# of warmed-up workers. cohorts.json, the compiled template, the chart cache
+# and the cohort index are loaded once when the service starts and shared by
+# every job.
+#
+# A request for a (participant, start, end) that is already queued or running
+# gets the existing job back instead of a second one. Once a job finishes, the
+# next identical request generates a fresh report (the data may have grown).
+#
+#   python service.py DATA_ROOT [--out reports] [--http 127.0.0.1:8080] [--watch 5]
+#                     [--concurrency 2] [--load-workers 4] [--render-workers 2] [--pdf [BACKEND]] [--inline]
+#                     [--cohort-index cohort_index.npz]
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from urllib.parse import urlsplit
+
+from lazyimport import lazy_import
+np = lazy_import('numpy')
+
+import cohortindex
+import mobility
+import pdfrender
+import plot_gen
+from chartcache import ChartCache
+from discovery import discover_days
+from inliner import Inliner
+
+# Finished jobs kept for GET /reports/<id> and the latency percentiles
+HISTORY = 1000
+
+
+class Job:
+    __slots__ = ('id', 'key', 'participant', 'load_dir', 'output_dir', 'start', 'end', 'source', 'future',
+                 'submitted', 'started', 'finished', 'timings', 'error')
+
+    def __init__(self, job_id, participant, load_dir, output_dir, start, end, source, future):
+        self.id = job_id
+        self.key = (participant, start, end)
+        self.participant = participant
+        self.load_dir = load_dir
+        self.output_dir = output_dir
+        self.start = start
+        self.end = end
+        self.source = source
+        self.future = future
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.timings = None
+        self.error = None
+
+    @property
+    def status(self):
+        if self.finished is not None:
+            return 'failed' if self.error is not None else 'done'
+        return 'running' if self.started is not None else 'queued'
+
+    def to_dict(self):
+        info = {
+            'id': self.id,
+            'participant': self.participant,
+            'start': self.start,
+            'end': self.end,
+            'source': self.source,
+            'status': self.status,
+            'output_dir': self.output_dir,
+            'submitted': self.submitted
+        }
+        if self.started is not None:
+            info['wait_s'] = self.started - self.submitted
+        if self.finished is not None:
+            info['run_s'] = self.finished - self.started
+            info['latency_s'] = self.finished - self.submitted
+            info['stages'] = self.timings
+        if self.error is not None:
+            info['error'] = self.error
+        return info
+
+
+class ReportService:
+    """
+    Asyncio front end around mobility.generate_report.
+
+    Parameters
+    ----------
+    data_root : str
+        Directory holding one sub-directory per participant.
+    output_root : str
+        Reports go to <output_root>/<participant>[_<start>_<end>]/.
+    cohorts_path : str
+        cohorts.json, read once at start.
+    searchpath : str
+        Template directory; the template is compiled once at start.
+    concurrency : int
+        Maximum number of reports generated at the same time.
+    load_workers : int
+        Threads for loading data and rendering the templates.
+    render_workers : int
+        Chart worker processes.
+    chart_cache_dir : str
+        Optional chartcache.ChartCache directory shared by all jobs.
+    pdf_backend : str
+        Also write report.pdf with this pdfrender backend ('auto',
+        'weasyprint' or 'pdfkit'), on the chart worker processes.
+    inline : bool
+        Write self-contained reports; one inliner.Inliner is shared by all
+        jobs, so the static assets are encoded once.
+    cohort_index_path : str
+        cohortindex.CohortIndex file for percentile peer comparisons. It is
+        brought up to date with data_root (and saved) at start.
+    """
+
+    def __init__(self, data_root, output_root='reports', cohorts_path='cohorts.json', searchpath='', concurrency=2,
+                 load_workers=4, render_workers=2, chart_cache_dir=None, pdf_backend=None, inline=False,
+                 cohort_index_path=None):
+        self.data_root = os.path.abspath(data_root)
+        self.output_root = output_root
+        self.cohorts_path = cohorts_path
+        self.searchpath = searchpath
+        self.concurrency = concurrency
+        self.load_workers = max(load_workers, concurrency)
+        self.render_workers = render_workers
+        self.chart_cache_dir = chart_cache_dir
+        self.pdf_backend = pdf_backend
+        self.inliner = Inliner() if inline else None
+        self.cohort_index_path = cohort_index_path
+
+        self.cohort_map = None
+        self.template = None
+        self.chart_cache = None
+        self.cohort_index = None
+        self.load_pool = None
+        self.render_pool = None
+
+        self.queue = None
+        self.jobs = collections.OrderedDict()
+        self._inflight = {}
+        self._ids = itertools.count(1)
+        self._consumers = []
+        self._counters = collections.Counter()
+        self._history = collections.deque(maxlen=HISTORY)
+        self._started_at = None
+
+    async def start(self):
+        # Warm state shared by every job
+        self.cohort_map = mobility.load_cohort_map(self.cohorts_path)
+        self.template = mobility.load_template(self.searchpath)
+        self.chart_cache = ChartCache(self.chart_cache_dir) if self.chart_cache_dir else None
+        if self.pdf_backend:
+            # Fail now rather than on every job
+            self.pdf_backend = pdfrender.PdfRenderer(self.pdf_backend).backend
+
+        self.load_pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.load_workers,
+                                                               thread_name_prefix='report')
+        # Spawned rather than forked: this process already runs threads
+        self.render_pool = plot_gen.make_executor(self.render_workers, mp_context=multiprocessing.get_context('spawn'))
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self.render_pool, plot_gen.warm_up)
+                               for _ in range(self.render_workers)])
+        if self.cohort_index_path:
+            # Only participants added or changed since the index was saved are read
+            self.cohort_index = await loop.run_in_executor(
+                self.load_pool, cohortindex.load_or_build, self.cohort_index_path, self.data_root)
+
+        self.queue = asyncio.Queue()
+        self._consumers = [asyncio.create_task(self._consume()) for _ in range(self.concurrency)]
+        self._started_at = time.time()
+
+    async def stop(self, drain=True):
+        if drain:
+            await self.queue.join()
+        for task in self._consumers:
+            task.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers = []
+        self.load_pool.shutdown()
+        self.render_pool.shutdown()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop(drain=exc[0] is None)
+
+    def participant_dir(self, participant):
+        # Only plain directory names under data_root are accepted
+        if not participant or participant in ('.', '..') or os.sep in participant or '/' in participant:
+            raise ValueError(f"invalid participant {participant!r}")
+        path = os.path.join(self.data_root, participant)
+        if not os.path.isdir(path):
+            raise ValueError(f"unknown participant {participant!r}")
+        return path
+
+    def output_dir(self, participant, start=None, end=None):
+        name = participant
+        if start is not None or end is not None:
+            name += f"_{start or 'first'}_{end or 'last'}"
+        return os.path.join(self.output_root, name)
+
+    def submit(self, participant, start=None, end=None, source='local'):
+        """
+        Queue a report for a participant (a directory name under data_root).
+
+        Returns the Job; await job.future for the stage timings. If the same
+        participant and date range is already queued or running, that job is
+        returned instead.
+        """
+        start = str(start) if start is not None else None
+        end = str(end) if end is not None else None
+        self._counters['submitted'] += 1
+
+        job = self._inflight.get((participant, start, end))
+        if job is not None:
+            self._counters['deduplicated'] += 1
+            return job
+
+        load_dir = self.participant_dir(participant)
+        future = asyncio.get_running_loop().create_future()
+        job = Job(next(self._ids), participant, load_dir, self.output_dir(participant, start, end), start, end,
+                  source, future)
+        self._inflight[job.key] = job
+        self.jobs[job.id] = job
+        while len(self.jobs) > HISTORY and next(iter(self.jobs.values())).finished is not None:
+            self.jobs.popitem(last=False)
+
+        self.queue.put_nowait(job)
+        return job
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            job.started = time.time()
+            try:
+                os.makedirs(job.output_dir, exist_ok=True)
+                job.timings = await loop.run_in_executor(
+                    self.load_pool, lambda: mobility.generate_report(
+                        job.load_dir, job.output_dir, self.cohort_map, self.template,
+                        chart_cache=self.chart_cache, start=job.start, end=job.end,
+                        plot_executor=self.render_pool, inliner=self.inliner, cohort_index=self.cohort_index))
+                if self.pdf_backend:
+                    t0 = time.perf_counter()
+                    await loop.run_in_executor(self.render_pool, pdfrender.render_file,
+                                               os.path.join(job.output_dir, 'report.html'), None, self.pdf_backend)
+                    job.timings['pdf'] = time.perf_counter() - t0
+            except Exception as e:
+                job.error = repr(e)
+                job.future.set_exception(e)
+                # Nobody may be awaiting this job; the error is kept in job.error
+                job.future.exception()
+                self._counters['failed'] += 1
+            else:
+                job.future.set_result(job.timings)
+                self._counters['completed'] += 1
+            finally:
+                job.finished = time.time()
+                del self._inflight[job.key]
+                self._history.append(job)
+                self.queue.task_done()
+
+    def metrics(self):
+        """
+        Counters, queue state and latency percentiles over the last HISTORY
+        finished jobs (seconds; 'wait' is time queued, 'run' time generating).
+        """
+        running = sum(1 for job in self._inflight.values() if job.started is not None)
+        metrics = {
+            'uptime_s': time.time() - self._started_at if self._started_at else 0.0,
+            'jobs': {
+                'submitted': self._counters['submitted'],
+                'deduplicated': self._counters['deduplicated'],
+                'completed': self._counters['completed'],
+                'failed': self._counters['failed'],
+                'queued': len(self._inflight) - running,
+                'running': running
+            },
+            'concurrency': self.concurrency,
+            'latency': {}
+        }
+
+        done = [job for job in self._history if job.error is None]
+        series = {
+            'wait': [job.started - job.submitted for job in self._history],
+            'run': [job.finished - job.started for job in self._history],
+            'total': [job.finished - job.submitted for job in self._history]
+        }
+        for stage in ('load', 'plots', 'render', 'pdf'):
+            series[stage] = [job.timings[stage] for job in done if stage in job.timings]
+        for name, values in series.items():
+            if values:
+                p50, p95, p99 = np.percentile(values, [50, 95, 99])
+                metrics['latency'][name] = {'count': len(values), 'mean': float(np.mean(values)), 'p50': float(p50),
+                                            'p95': float(p95), 'p99': float(p99), 'max': float(np.max(values))}
+
+        if self.chart_cache is not None:
+            metrics['chart_cache'] = self.chart_cache.stats()
+        return metrics
+
+
+class DirectoryWatcher:
+    """
+    Polls data_root for new or changed day folders and queues a report for
+    each participant whose days changed and then stayed unchanged for one
+    more poll (so a report isn't started halfway through an upload).
+
+    Changes already present when the watcher starts are not reported unless
+    initial=True.
+    """
+
+    def __init__(self, service, interval=5.0, initial=False):
+        self.service = service
+        self.interval = interval
+        self.initial = initial
+        self._reported = {}
+        self._pending = {}
+
+    def scan(self):
+        # participant -> signature of its day folders (paths and file sizes/mtimes)
+        signatures = collections.defaultdict(list)
+        for day in discover_days(self.service.data_root, refresh=True):
+            rel = os.path.relpath(day.path, self.service.data_root)
+            participant = rel.split(os.sep, 1)[0]
+            if participant != rel:
+                signatures[participant].append((rel, tuple(sorted(day.files.items()))))
+        return {p: tuple(sig) for p, sig in signatures.items()}
+
+    def poll(self, signatures):
+        # The participants that are ready to report, given this poll's scan
+        ready = []
+        for participant, signature in signatures.items():
+            if signature == self._reported.get(participant):
+                self._pending.pop(participant, None)
+            elif signature == self._pending.get(participant):
+                self._reported[participant] = self._pending.pop(participant)
+                ready.append(participant)
+            else:
+                self._pending[participant] = signature
+        return ready
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        signatures = await loop.run_in_executor(self.service.load_pool, self.scan)
+        if self.initial:
+            self._pending = dict(signatures)
+        else:
+            self._reported = dict(signatures)
+
+        while True:
+            await asyncio.sleep(self.interval)
+            signatures = await loop.run_in_executor(self.service.load_pool, self.scan)
+            for participant in self.poll(signatures):
+                try:
+                    self.service.submit(participant, source='watch')
+                except ValueError as e:
+                    print(f"watch: {e}")
+
+
+class HttpFrontend:
+    """
+    Minimal HTTP/1.1 endpoint (one request per connection) for queuing
+    reports and reading the service metrics.
+    """
+
+    MAX_BODY = 64 * 1024
+
+    def __init__(self, service, host='127.0.0.1', port=8080):
+        self.service = service
+        self.host = host
+        self.port = port
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        # The real port when started with port=0
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        try:
+            status, payload = await self._dispatch(reader)
+        except (ValueError, KeyError, TypeError) as e:
+            status, payload = 400, {'error': str(e)}
+        except Exception as e:
+            status, payload = 500, {'error': repr(e)}
+
+        body = json.dumps(payload).encode()
+        reason = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}
+        writer.write(f"HTTP/1.1 {status} {reason.get(status, '')}\r\n"
+                     f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode() + body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _dispatch(self, reader):
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) != 3:
+            raise ValueError('malformed request line')
+        method, target, _ = request_line
+
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1')
+            if line in ('\r\n', '\n', ''):
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length', 0))
+        if length > self.MAX_BODY:
+            raise ValueError('request body too large')
+        body = await reader.readexactly(length) if length else b''
+        path = urlsplit(target).path
+
+        if method == 'GET' and path == '/metrics':
+            return 200, self.service.metrics()
+
+        if method == 'GET' and path.startswith('/reports/'):
+            job = self.service.jobs.get(int(path[len('/reports/'):]))
+            if job is None:
+                return 404, {'error': 'unknown job'}
+            return 200, job.to_dict()
+
+        if method == 'POST' and path == '/reports':
+            request = json.loads(body or b'{}')
+            job = self.service.submit(request['participant'], request.get('start'), request.get('end'), source='http')
+            if request.get('wait'):
+                await asyncio.wait([job.future])
+                return (200 if job.error is None else 500), job.to_dict()
+            return 202, job.to_dict()
+
+        return 404, {'error': f'no route for {method} {path}'}
+
+
+async def serve(args):
+    service = ReportService(args.data_root, args.out, cohorts_path=args.cohorts, searchpath=args.templates,
+                            concurrency=args.concurrency, load_workers=args.load_workers,
+                            render_workers=args.render_workers, chart_cache_dir=args.chart_cache,
+                            pdf_backend=args.pdf, inline=args.inline, cohort_index_path=args.cohort_index)
+    await service.start()
+    tasks = []
+
+    for participant in args.participant:
+        service.submit(participant)
+
+    if args.watch:
+        tasks.append(asyncio.create_task(DirectoryWatcher(service, args.watch).run()))
+
+    frontend = None
+    if args.http:
+        host, _, port = args.http.rpartition(':')
+        frontend = HttpFrontend(service, host or '127.0.0.1', int(port))
+        await frontend.start()
+        print(f"Listening on http://{frontend.host}:{frontend.port}")
+
+    try:
+        if tasks or frontend:
+            await asyncio.Event().wait()
+    finally:
+        for task in tasks:
+            task.cancel()
+        if frontend:
+            await frontend.stop()
+        await service.stop()
+        print(json.dumps(service.metrics(), indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate mobility reports on demand.')
+    parser.add_argument('data_root', help='Directory with one sub-directory per participant')
+    parser.add_argument('participant', nargs='*', help='Participants to report right away')
+    parser.add_argument('--out', default='reports', help='Output root')
+    parser.add_argument('--cohorts', default='cohorts.json', help='Path to cohorts.json')
+    parser.add_argument('--templates', default='', help='Directory holding index.html')
+    parser.add_argument('--chart-cache', default=None, help='Directory for the rendered chart cache')
+    parser.add_argument('--http', default=None, metavar='[HOST:]PORT', help='Serve the HTTP endpoint')
+    parser.add_argument('--watch', type=float, default=None, metavar='SECONDS', help='Poll data_root for new days')
+    parser.add_argument('--concurrency', type=int, default=2, help='Reports generated at the same time')
+    parser.add_argument('--load-workers', type=int, default=4, help='Threads for loading and templating')
+    parser.add_argument('--render-workers', type=int, default=2, help='Chart and PDF worker processes')
+    parser.add_argument('--pdf', nargs='?', const='auto', default=None, choices=('auto', 'weasyprint', 'pdfkit'),
+                        help='Also write report.pdf')
+    parser.add_argument('--inline', action='store_true', help='Write self-contained reports (assets inlined)')
+    parser.add_argument('--cohort-index', default=None,
+                        help='Cohort index (cohortindex.py) for percentile peer comparisons; updated at start')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
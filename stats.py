@@ -0,0 +1,121 @@
+# Fused column statistics.
+#
+# ColumnStats computes count, NaN count, sum, min, max and the sum of squared
+# deviations from the mean (M2, for the variance) for a set of columns in one
+# pass over a single float64 block, instead of a separate pandas reduction per
+# statistic per column. Stats for different days merge exactly for the counts,
+# sums and extrema, and via Chan et al.'s pairwise update for M2, so an
+# aggregate over many days never has to look at the bouts again.
+
+from lazyimport import lazy_import
+
+np = lazy_import('numpy')
+
+
+class ColumnStats:
+    def __init__(self, columns, variance=True):
+        n = len(columns)
+        self.columns = list(columns)
+        self.variance = variance
+        self.rows = 0
+        self.count = np.zeros(n, dtype='int64')
+        self.nan_count = np.zeros(n, dtype='int64')
+        self.sum = np.zeros(n)
+        self.min = np.full(n, np.inf)
+        self.max = np.full(n, -np.inf)
+        self.m2 = np.zeros(n)
+
+    @classmethod
+    def from_frame(cls, frame, columns, variance=True):
+        stats = cls(columns, variance)
+        if frame is not None:
+            stats.update(frame)
+        return stats
+
+    # Fold a frame (or chunk) into the stats. Columns missing from the frame
+    # count as all-NaN.
+    def update(self, frame):
+        rows = len(frame)
+        if rows == 0:
+            return
+
+        values = frame.reindex(columns=self.columns).to_numpy(dtype='float64')
+        nan = np.isnan(values)
+        filled = np.where(nan, 0.0, values)
+
+        block = ColumnStats(self.columns, self.variance)
+        block.rows = rows
+        block.nan_count = nan.sum(axis=0)
+        block.count = rows - block.nan_count
+        block.sum = filled.sum(axis=0)
+        block.min = np.where(nan, np.inf, values).min(axis=0)
+        block.max = np.where(nan, -np.inf, values).max(axis=0)
+
+        if self.variance:
+            # Deviations from the block mean; the blocks are then combined
+            # pairwise, which is Welford's update applied a block at a time
+            mean = np.divide(block.sum, block.count, out=np.zeros(len(self.columns)), where=block.count != 0)
+            deviations = np.where(nan, 0.0, values - mean)
+            block.m2 = np.einsum('ij,ij->j', deviations, deviations)
+
+        self.merge(block)
+
+    def merge(self, other):
+        if self.variance:
+            n = self.count + other.count
+            delta = other.mean_array() - self.mean_array()
+            correction = np.divide(delta * delta * self.count * other.count, n,
+                                   out=np.zeros(len(self.columns)), where=n != 0)
+            self.m2 = self.m2 + other.m2 + correction
+
+        self.rows += other.rows
+        self.count = self.count + other.count
+        self.nan_count = self.nan_count + other.nan_count
+        self.sum = self.sum + other.sum
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        return self
+
+    def copy(self):
+        return ColumnStats(self.columns, self.variance).merge(self)
+
+    def mean_array(self):
+        return np.divide(self.sum, self.count, out=np.zeros(len(self.columns)), where=self.count != 0)
+
+    def mean(self, column):
+        i = self.columns.index(column)
+        return self.sum[i] / self.count[i] if self.count[i] else np.nan
+
+    def get_min(self, column):
+        i = self.columns.index(column)
+        return float(self.min[i]) if self.count[i] else np.nan
+
+    def get_max(self, column):
+        i = self.columns.index(column)
+        return float(self.max[i]) if self.count[i] else np.nan
+
+    def var(self, column, ddof=1):
+        # ddof=1 gives the sample variance, as pandas would
+        i = self.columns.index(column)
+        if not self.variance or self.count[i] - ddof <= 0:
+            return np.nan
+        return max(self.m2[i], 0.0) / (self.count[i] - ddof)
+
+    def std(self, column, ddof=1):
+        return np.sqrt(self.var(column, ddof))
+
+    # Plain arrays/values for caching alongside a day folder
+    def to_arrays(self):
+        arrays = {
+            'count': self.count, 'nan_count': self.nan_count, 'sum': self.sum,
+            'min': self.min, 'max': self.max, 'm2': self.m2
+        }
+        return arrays, {'columns': self.columns, 'variance': self.variance, 'rows': self.rows}
+
+    @classmethod
+    def from_arrays(cls, arrays, info):
+        stats = cls(info['columns'], info['variance'])
+        stats.rows = info['rows']
+        for name in ('count', 'nan_count', 'sum', 'min', 'max', 'm2'):
+            setattr(stats, name, arrays[name].copy())
+        return stats
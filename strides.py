@@ -0,0 +1,141 @@
+# Stride-level statistics without keeping stride tables in memory.
+#
+# stride.csv is by far the largest file in a day folder (one row per stride at
+# 100 Hz), but the report only needs summary statistics and distributions from
+# it. read_stride_summary() streams the file in chunks with the compact dtypes
+# of schema.STRIDE_SCHEMA and folds each chunk into a StrideSummary: a
+# stats.ColumnStats per metric (count/sum/min/max and the M2 of Chan et al.,
+# so the standard deviation stays accurate over millions of strides) plus
+# fixed-bin histograms. Summaries from different days merge exactly.
+
+import os
+
+from lazyimport import lazy_import
+from schema import STRIDE_SCHEMA
+from schema import read_table
+from stats import ColumnStats
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+STRIDE_METRICS = ['stride_duration_s', 'cadence_spm', 'stride_length_m', 'walking_speed_mps']
+
+# Fixed histogram bins per metric: (low, high, number of bins). Values outside
+# the range land in an underflow/overflow bin at either end.
+HISTOGRAM_BINS = {
+    'stride_duration_s': (0.0, 4.0, 80),
+    'cadence_spm': (0.0, 240.0, 120),
+    'stride_length_m': (0.0, 4.0, 80),
+    'walking_speed_mps': (0.0, 4.0, 80)
+}
+
+
+class StrideSummary:
+    def __init__(self):
+        self.stats = ColumnStats(STRIDE_METRICS)
+        self.histograms = {m: np.zeros(HISTOGRAM_BINS[m][2] + 2, dtype='int64') for m in STRIDE_METRICS}
+        self.labels = {}
+
+    @property
+    def strides(self):
+        return self.stats.rows
+
+    @property
+    def count(self):
+        return self.stats.count
+
+    @property
+    def min(self):
+        return self.stats.min
+
+    @property
+    def max(self):
+        return self.stats.max
+
+    # Fold a frame (or chunk) of strides into the running totals
+    def update(self, strides):
+        self.stats.update(strides)
+
+        for metric in STRIDE_METRICS:
+            if metric not in strides:
+                continue
+            values = strides[metric].to_numpy(dtype='float64')
+            values = values[~np.isnan(values)]
+            low, high, bins = HISTOGRAM_BINS[metric]
+            index = np.floor((values - low) * (bins / (high - low))).astype('int64')
+            index = np.clip(index, -1, bins) + 1
+            self.histograms[metric] += np.bincount(index, minlength=bins + 2)
+
+        if 'lr_label' in strides:
+            for label, n in strides['lr_label'].value_counts(sort=False).items():
+                self.labels[label] = self.labels.get(label, 0) + int(n)
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        for metric in STRIDE_METRICS:
+            self.histograms[metric] += other.histograms[metric]
+        for label, n in other.labels.items():
+            self.labels[label] = self.labels.get(label, 0) + n
+
+    def mean(self, metric):
+        return self.stats.mean(metric)
+
+    def std(self, metric):
+        # Sample standard deviation (ddof=1), as pandas would give
+        return self.stats.std(metric)
+
+    # Approximate percentile (0..100) from the histogram, interpolated within
+    # the bin it falls in: exact to the bin width, clamped to min/max
+    def percentile(self, metric, q):
+        i = STRIDE_METRICS.index(metric)
+        if self.count[i] == 0:
+            return np.nan
+        low, high, bins = HISTOGRAM_BINS[metric]
+        counts = self.histograms[metric]
+        # The underflow/overflow bins reach from min/max to the histogram range
+        edges = np.r_[min(self.min[i], low), np.linspace(low, high, bins + 1), max(self.max[i], high)]
+        cumulative = np.r_[0, np.cumsum(counts)]
+        target = q / 100 * cumulative[-1]
+        k = max(int(np.searchsorted(cumulative, target, 'left')), 1) - 1
+        fraction = (target - cumulative[k]) / counts[k] if counts[k] else 0.0
+        value = edges[k] + fraction * (edges[k + 1] - edges[k])
+        return float(np.clip(value, self.min[i], self.max[i]))
+
+    # Bin counts and edges, without the underflow/overflow bins
+    def histogram(self, metric):
+        low, high, bins = HISTOGRAM_BINS[metric]
+        return self.histograms[metric][1:-1], np.linspace(low, high, bins + 1)
+
+    # Plain arrays/values for caching alongside a day folder
+    def to_arrays(self):
+        arrays, stats_info = self.stats.to_arrays()
+        arrays = {'stats/' + k: v for k, v in arrays.items()}
+        for metric in STRIDE_METRICS:
+            arrays['hist/' + metric] = self.histograms[metric]
+        return arrays, {'stats': stats_info, 'labels': self.labels}
+
+    @classmethod
+    def from_arrays(cls, arrays, info):
+        summary = cls()
+        stats = {k[len('stats/'):]: v for k, v in arrays.items() if k.startswith('stats/')}
+        summary.stats = ColumnStats.from_arrays(stats, info['stats'])
+        for metric in STRIDE_METRICS:
+            summary.histograms[metric] = arrays['hist/' + metric].copy()
+        summary.labels = dict(info['labels'])
+        return summary
+
+
+def read_strides(path, chunksize=None):
+    # Compact dtypes from the stride schema; s_id/original_gs_id are not loaded
+    return read_table(path, STRIDE_SCHEMA, chunksize=chunksize)
+
+
+# Stream a stride.csv into a StrideSummary, chunksize rows at a time
+def read_stride_summary(path, chunksize=100000, summary=None):
+    if summary is None:
+        summary = StrideSummary()
+    if os.path.exists(path):
+        for chunk in read_strides(path, chunksize=chunksize):
+            summary.update(chunk)
+    return summary
@@ -0,0 +1,7 @@
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+# Synthetic participant data for the tests
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
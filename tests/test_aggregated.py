@@ -0,0 +1,100 @@
+import math
+import os
+
+import pandas as pd
+import pytest
+
+from folderresults import AGGREGATED_METRICS
+from folderresults import AggregatedResults
+from folderresults import load_folder
+from synthetic import write_day_folder
+from synthetic import write_participant
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'test')
+
+SUMMARY = ('mean_cadence', 'mean_walking_speed', 'mean_stride_length', 'mean_walking_bout_duration',
+           'maximum_walking_bout_duration', 'mean_daily_walking_time', 'number_sessions', 'number_of_bouts')
+
+# Averaged in float64, as AggregatedResults does
+BOUT_METRICS = ('cadence_spm', 'walking_speed_mps', 'stride_length_m', 'duration_s')
+
+
+def concatenated(folders):
+    # The summary figures the way the original AggregatedResults computed
+    # them: from every day's bouts concatenated
+    days = [load_folder(folder) for folder in folders]
+    bouts = pd.concat([day.wb for day in days]).astype({column: 'float64' for column in BOUT_METRICS})
+    return {
+        'mean_cadence': bouts['cadence_spm'].mean(),
+        'mean_walking_speed': bouts['walking_speed_mps'].mean(),
+        'mean_stride_length': bouts['stride_length_m'].mean(),
+        'mean_walking_bout_duration': bouts['duration_s'].mean(),
+        'maximum_walking_bout_duration': bouts['duration_s'].max(),
+        'mean_daily_walking_time': sum(day.total_walking_time for day in days) / len(days),
+        'number_sessions': len(days),
+        'number_of_bouts': len(bouts),
+        'days': sorted(day.day for day in days)
+    }
+
+
+def check_matches(result, folders, names=SUMMARY, rel_tol=1e-9):
+    expected = concatenated(folders)
+    for name in names:
+        assert math.isclose(getattr(result, name), expected[name], rel_tol=rel_tol), \
+            (name, getattr(result, name), expected[name])
+    assert result.earliest_day().day == expected['days'][0]
+    assert result.last_day().day == expected['days'][-1]
+
+
+def test_read_data_matches_concatenated_bouts():
+    result = AggregatedResults()
+    result.read_data(FIXTURE)
+    check_matches(result, [os.path.join(FIXTURE, day) for day in ('2024-12-11', '2024-12-12')])
+
+
+def test_add_folder_and_remove_day(tmp_path):
+    folders = write_participant(str(tmp_path), days=4, n_bouts=60)
+    result = AggregatedResults()
+    for i, folder in enumerate(folders):
+        result.add_folder(folder)
+        check_matches(result, folders[:i + 1])
+
+    new_day = os.path.join(str(tmp_path), '2030-01-01')
+    write_day_folder(new_day, '2030-01-01', n_bouts=80, seed=99)
+    result.add_folder(new_day)
+    check_matches(result, folders + [new_day])
+
+    result.remove_day('2030-01-01')
+    check_matches(result, folders)
+    result.remove_day(os.path.basename(folders[0]))
+    check_matches(result, folders[1:])
+
+    rebuilt = AggregatedResults()
+    rebuilt.read_data(str(tmp_path))
+    rebuilt.remove_day('2030-01-01')
+    rebuilt.remove_day(os.path.basename(folders[0]))
+    for name in SUMMARY:
+        assert math.isclose(getattr(result, name), getattr(rebuilt, name), rel_tol=1e-9), name
+
+
+@pytest.mark.parametrize('metrics', [AGGREGATED_METRICS, None])
+def test_summary_only_matches_full_read(tmp_path, metrics):
+    write_participant(str(tmp_path), days=4, n_bouts=60)
+    full = AggregatedResults()
+    full.read_data(str(tmp_path))
+
+    options = {'metrics': metrics} if metrics else {}
+    summary = AggregatedResults()
+    summary.read_data(str(tmp_path), summary_only=True, **options)
+    assert all(day.strides is None for day in summary.results)
+
+    # Without 'metrics' the figures aggregated.csv lacks come from wb.csv
+    names = AGGREGATED_METRICS if metrics else list(SUMMARY)
+    for name in names:
+        # aggregated.csv is float64, wb.csv is read as float32
+        assert math.isclose(getattr(full, name), getattr(summary, name), rel_tol=1e-6), name
+    for column in ('duration_s', 'cadence_spm'):
+        assert math.isclose(full.bout_stats.std(column), summary.bout_stats.std(column), rel_tol=1e-6), column
+    if metrics:
+        assert all(day.wb is None for day in summary.results)
+        assert math.isnan(summary.mean_walking_speed)
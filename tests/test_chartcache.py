@@ -0,0 +1,57 @@
+import concurrent.futures
+import os
+
+from chartcache import ChartCache
+
+
+def write(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_hit_and_miss(tmp_path):
+    cache = ChartCache(str(tmp_path / 'cache'))
+    chart = str(tmp_path / 'chart.svg')
+    write(chart, '<svg>a</svg>')
+    key = cache.key('bar', {'values': [1, 2, 3]})
+    assert key == cache.key('bar', {'values': [1, 2, 3]})
+    assert key != cache.key('bar', {'values': [1, 2, 4]})
+
+    out = str(tmp_path / 'out.svg')
+    assert not cache.get(key, out)
+    cache.put(key, chart)
+    assert cache.get(key, out)
+    assert read(out) == '<svg>a</svg>'
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_concurrent_put_get_evict(tmp_path):
+    # Few entries allowed, so the threads keep evicting each other's entries
+    cache = ChartCache(str(tmp_path / 'cache'), max_entries=3)
+    keys = [f'{i:040x}' for i in range(6)]
+    sources = {}
+    for key in keys:
+        sources[key] = str(tmp_path / f'{key}.svg')
+        write(sources[key], f'<svg>{key}</svg>')
+
+    def work(worker):
+        for i in range(150):
+            key = keys[(i + worker) % len(keys)]
+            out = str(tmp_path / f'out-{worker}.svg')
+            if cache.get(key, out):
+                assert read(out) == f'<svg>{key}</svg>'
+            else:
+                cache.put(key, sources[key])
+
+    with concurrent.futures.ThreadPoolExecutor(4) as pool:
+        # Re-raises any error from a worker
+        list(pool.map(work, range(4)))
+
+    names = os.listdir(tmp_path / 'cache')
+    assert not [n for n in names if n.endswith('.tmp')]
+    assert len(names) <= 3
@@ -0,0 +1,126 @@
+import shutil
+
+import numpy as np
+import pytest
+
+import cohortindex
+from cohortindex import PEER_METRICS
+from cohortindex import CohortIndex
+from synthetic import write_day_folder
+from synthetic import write_participant
+
+
+def naive_percentile(peers, value):
+    peers = np.asarray(peers, dtype=float)
+    peers = peers[np.isfinite(peers)]
+    return 100 * (np.sum(peers < value) + 0.5 * np.sum(peers == value)) / len(peers)
+
+
+def check_sorted(index):
+    # The incrementally maintained arrays against a fresh _resort
+    fresh = CohortIndex()
+    fresh.participants = dict(index.participants)
+    fresh._resort(index.cohorts)
+    keys = {k for k, v in index._sorted.items() if len(v)} | {k for k, v in fresh._sorted.items() if len(v)}
+    for key in keys:
+        assert np.array_equal(index._sorted.get(key, np.empty(0)), fresh._sorted.get(key, np.empty(0))), key
+
+
+def test_percentile_with_ties_and_own_value_left_out():
+    index = CohortIndex()
+    speeds = {'a': 1.0, 'b': 1.2, 'c': 1.2, 'd': 1.5, 'e': np.nan}
+    for name, speed in speeds.items():
+        index.add(name, 'PD', (speed, 1.0, 90.0))
+    index.add('x', 'HC', (9.0, 9.0, 99.0))
+
+    assert index.percentile('PD', 'mws', 1.2) == naive_percentile([1.0, 1.2, 1.2, 1.5], 1.2) == 50.0
+    # 'b' is one of the tied values: left out, 'c' is the only tie
+    assert index.percentile('PD', 'mws', 1.2, participant='b') == naive_percentile([1.0, 1.2, 1.5], 1.2)
+    # Left out when their indexed value is below the query, too
+    assert index.percentile('PD', 'mws', 1.3, participant='a') == naive_percentile([1.2, 1.2, 1.5], 1.3)
+    # A participant of another cohort (or with a NaN value) doesn't change it
+    assert index.percentile('PD', 'mws', 1.3, participant='x') == naive_percentile([1.0, 1.2, 1.2, 1.5], 1.3)
+    assert index.percentile('PD', 'mws', 1.3, participant='e') == naive_percentile([1.0, 1.2, 1.2, 1.5], 1.3)
+    # All tied values equal: the middle
+    assert index.percentile('PD', 'mc', 90.0, participant='a') == 50.0
+    assert np.isnan(index.percentile('PD', 'mws', np.nan))
+    assert np.isnan(index.percentile('HC', 'mws', 9.0, participant='x'))
+
+
+def test_add_remove_and_add_many_match_a_resort():
+    rng = np.random.default_rng(1)
+    index = CohortIndex()
+    for i in range(40):
+        values = rng.normal((1.1, 1.2, 95), (0.2, 0.2, 10))
+        if i % 7 == 0:
+            values[i % 3] = np.nan
+        index.add(f'p{i}', ('PD', 'HC')[i % 2], values)
+    check_sorted(index)
+
+    # Replace some (one moving cohort), remove some
+    index.add('p1', 'PD', (1.0, 1.0, 90.0))
+    index.add('p2', 'PD', (0.5, np.nan, 80.0))
+    assert index.remove('p3') and not index.remove('p3')
+    check_sorted(index)
+
+    # A few entries are spliced in; many re-sort their cohorts
+    index.add_many([('p4', 'HC', (2.0, 2.0, 100.0), 's'), ('new', 'PD', (1.1, 1.1, 91.0), 's')])
+    check_sorted(index)
+    index.add_many((f'q{i}', 'OTHER', rng.normal((1.1, 1.2, 95), 0.1), 's') for i in range(20))
+    index.add_many([(f'p{i}', 'HC', (1.0 + i / 100, 1.0, 90.0), 's') for i in range(0, 40, 3)])
+    check_sorted(index)
+    assert index.participants['p0'][0] == 'HC'
+    for cohort in index.cohorts:
+        for metric in PEER_METRICS:
+            values = index.values(cohort, metric)
+            assert np.allclose(index.quantiles(cohort, metric), np.percentile(values, (5, 25, 50, 75, 95)))
+            counts, edges = index.histogram(cohort, metric)
+            expected, expected_edges = np.histogram(values, bins=20)
+            assert np.array_equal(counts, expected) and np.allclose(edges, expected_edges)
+
+
+def test_update_and_save_load(tmp_path):
+    data_root = tmp_path / 'data'
+    for i, cohort in enumerate(('PD', 'HC', 'PD')):
+        write_participant(str(data_root / f'p{i}'), days=2, n_bouts=30, seed=10 * i, participant_files=True,
+                          cohort=cohort)
+    index = CohortIndex.build(str(data_root))
+    assert sorted(index.participants) == ['p0', 'p1', 'p2']
+    for name in index.participants:
+        cohort, values = cohortindex.participant_values(str(data_root / name))
+        assert index.participants[name][0] == cohort
+        assert np.allclose(index.participants[name][2], values)
+
+    path = str(tmp_path / 'cohort_index.npz')
+    index.save(path)
+    loaded = CohortIndex.load(path)
+    assert loaded.participants == index.participants
+    assert sorted(loaded._sorted) == sorted(index._sorted)
+    for key, values in index._sorted.items():
+        assert np.array_equal(loaded._sorted[key], values), key
+    assert loaded.update(str(data_root)) == {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 3}
+
+    # One participant gets a new day, one is added and one removed
+    write_day_folder(str(data_root / 'p0' / '2030-01-01'), '2030-01-01', n_bouts=200, seed=99)
+    write_participant(str(data_root / 'p3'), days=2, n_bouts=30, seed=30, participant_files=True, cohort='HC')
+    shutil.rmtree(data_root / 'p1')
+    counts = loaded.update(str(data_root), workers=2)
+    assert counts == {'added': 1, 'updated': 1, 'removed': 1, 'unchanged': 1}
+
+    rebuilt = CohortIndex.build(str(data_root))
+    assert loaded.participants == rebuilt.participants
+    for key in set(loaded._sorted) | set(rebuilt._sorted):
+        assert np.allclose(loaded._sorted.get(key, np.empty(0)), rebuilt._sorted.get(key, np.empty(0))), key
+    check_sorted(loaded)
+
+
+def test_load_rejects_another_format(tmp_path):
+    path = str(tmp_path / 'index.npz')
+    CohortIndex().save(path)
+    assert len(CohortIndex.load(path)) == 0
+    with np.load(path) as npz:
+        arrays = dict(npz)
+    arrays['__header__'] = np.array('{"version": 0, "metrics": [], "sorted": []}')
+    np.savez(path, **arrays)
+    with pytest.raises(ValueError):
+        CohortIndex.load(path)
@@ -0,0 +1,31 @@
+import os
+
+import numpy as np
+
+from daycache import DayCache
+from folderresults import FolderResults
+
+DAY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'test', '2024-12-11')
+
+
+def test_truncated_entry_is_reparsed(tmp_path):
+    cache = DayCache(str(tmp_path))
+    expected = FolderResults()
+    expected.read_folder(DAY, cache=cache)
+    entry = cache.entry_path(DAY)
+    assert os.path.exists(entry)
+
+    # A partly written entry
+    with open(entry, 'r+b') as f:
+        f.truncate(os.path.getsize(entry) // 2)
+
+    result = FolderResults()
+    result.read_folder(DAY, cache=cache)
+    assert result.total_walking_time == expected.total_walking_time
+    assert np.array_equal(result.hourly, expected.hourly, equal_nan=True)
+    assert len(result.wb) == len(expected.wb)
+
+    # Stored again, and loads
+    again = FolderResults()
+    assert cache.load(DAY, again)
+    assert again.total_walking_time == expected.total_walking_time
@@ -0,0 +1,122 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import daystore
+from daystore import DayStore
+from folderresults import AggregatedResults
+from folderresults import FolderResults
+from schema import STRIDE_SCHEMA
+from schema import WB_SCHEMA
+from schema import read_table
+from synthetic import write_participant
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'test')
+SUMMARY = ('mean_cadence', 'mean_walking_speed', 'mean_stride_length', 'mean_walking_bout_duration',
+           'maximum_walking_bout_duration', 'mean_daily_walking_time', 'number_sessions', 'number_of_bouts')
+
+
+def csv_frame(folders, table):
+    filename, schema = daystore.TABLES[table]
+    frame = pd.concat([read_table(os.path.join(f, filename), schema) for f in folders], ignore_index=True)
+    return frame[list(schema.dtypes)]
+
+
+def check_frame(frame, expected):
+    assert list(frame.columns) == list(expected.columns)
+    assert len(frame) == len(expected)
+    for column in expected.columns:
+        if isinstance(expected[column].dtype, pd.CategoricalDtype):
+            assert list(frame[column].astype(str)) == list(expected[column].astype(str)), column
+        else:
+            assert np.array_equal(frame[column].to_numpy(), expected[column].to_numpy(), equal_nan=True), column
+
+
+def test_read_store_matches_csv(tmp_path):
+    store, added = daystore.convert(FIXTURE, str(tmp_path / 'store'))
+    assert added == ['2024-12-11', '2024-12-12']
+
+    for entry in store.day_entries():
+        folder = os.path.join(FIXTURE, entry['day'])
+        expected = FolderResults()
+        expected.read_folder(folder)
+        result = FolderResults()
+        result.read_store(store, entry)
+        assert result.day == expected.day
+        assert result.total_walking_time == expected.total_walking_time
+        assert np.array_equal(result.hourly, expected.hourly, equal_nan=True)
+        check_frame(result.wb[list(WB_SCHEMA.dtypes)], expected.wb[list(WB_SCHEMA.dtypes)])
+
+    from_csv = AggregatedResults()
+    from_csv.read_data(FIXTURE)
+    # A fresh store object, as a new report process would have
+    from_store = AggregatedResults()
+    from_store.read_store(DayStore(str(tmp_path / 'store')))
+    for name in SUMMARY:
+        assert getattr(from_store, name) == getattr(from_csv, name), name
+    assert from_store.earliest_day().day == '2024-12-11'
+    assert not store.append_folder(os.path.join(FIXTURE, '2024-12-11'))
+
+
+def test_categories_are_remapped_across_days(tmp_path):
+    folders = [os.path.join(FIXTURE, day) for day in ('2024-12-11', '2024-12-12')]
+    store = DayStore(str(tmp_path / 'store'))
+    for i, folder in enumerate(folders):
+        with open(os.path.join(folder, 'metadata.json')) as f:
+            metadata = json.load(f)
+        strides = read_table(os.path.join(folder, 'stride.csv'), STRIDE_SCHEMA)
+        # Each day knows a different set of labels, in a different order
+        labels = ['right', 'left', 'unknown'] if i else ['left', 'right']
+        strides['lr_label'] = strides['lr_label'].cat.set_categories(labels)
+        store.append(metadata, {'wb': read_table(os.path.join(folder, 'wb.csv'), WB_SCHEMA), 'strides': strides},
+                     folder)
+    check_frame(store.frame('strides'), csv_frame(folders, 'strides'))
+    assert store.index['tables']['strides']['categories']['lr_label'][:2] == ['left', 'right']
+
+
+def test_interrupted_append(tmp_path):
+    folders = write_participant(str(tmp_path / 'participant'), days=3, n_bouts=20)
+    store = DayStore(str(tmp_path / 'store'))
+    store.append_folder(folders[0])
+
+    # A crash mid-append: bytes written past the indexed rows, index.json untouched
+    for table in daystore.TABLES:
+        for name in os.listdir(tmp_path / 'store' / table):
+            with open(tmp_path / 'store' / table / name, 'ab') as f:
+                f.write(b'\xff' * 13)
+
+    store = DayStore(str(tmp_path / 'store'))
+    assert store.days() == [os.path.basename(folders[0])]
+    check_frame(store.frame('wb'), csv_frame(folders[:1], 'wb'))
+
+    for folder in folders[1:]:
+        store.append_folder(folder)
+    store = DayStore(str(tmp_path / 'store'))
+    check_frame(store.frame('wb'), csv_frame(folders, 'wb'))
+    check_frame(store.frame('strides'), csv_frame(folders, 'strides'))
+    rows = store.index['tables']['wb']['rows']
+    assert os.path.getsize(tmp_path / 'store' / 'wb' / 'duration_s.bin') == rows * 4
+
+
+def test_date_ranges(tmp_path):
+    folders = write_participant(str(tmp_path / 'participant'), days=4, n_bouts=20)
+    days = [os.path.basename(f) for f in folders]
+
+    # In date order: a range is one slice of the memory-mapped columns
+    store = DayStore(str(tmp_path / 'ordered'))
+    for folder in folders:
+        store.append_folder(folder)
+    frame = store.frame('wb', days[1], days[2])
+    check_frame(frame, csv_frame(folders[1:3], 'wb'))
+    assert np.shares_memory(frame['duration_s'].to_numpy(), store.column('wb', 'duration_s'))
+
+    # Out of order: the days' rows aren't contiguous, and come back in date order
+    store = DayStore(str(tmp_path / 'shuffled'))
+    for i in (2, 0, 3, 1):
+        store.append_folder(folders[i])
+    check_frame(store.frame('wb', days[1], days[2]), csv_frame(folders[1:3], 'wb'))
+    check_frame(store.frame('wb'), csv_frame(folders, 'wb'))
+    check_frame(store.frame('strides', days[0], days[1]), csv_frame(folders[:2], 'strides'))
+    assert len(store.frame('wb', '2031-01-01')) == 0
@@ -0,0 +1,50 @@
+import numpy as np
+
+from dmo import DMO_METRICS
+from dmo import DmoHistory
+
+
+def record(day, speed, stage=''):
+    values = {m: float(speed + j) for j, m in enumerate(DMO_METRICS)}
+    return {'StartDay': day, 'StageID': 1, 'StageName': stage, 'Days': 2, 'PropertyUUID': stage, **values}
+
+
+def check_same(history, expected):
+    assert list(history.start_days) == list(expected.start_days)
+    assert history.stage_names == expected.stage_names
+    for name in ('values', 'delta', 'rolling_mean'):
+        assert np.allclose(getattr(history, name), getattr(expected, name), equal_nan=True), name
+    assert np.allclose(list(history.trend.values()), list(expected.trend.values()), equal_nan=True)
+
+
+def test_append_in_order():
+    records = [record('2024-01-01', 1.0, 'a'), record('2024-03-01', 1.2, 'b'), record('2024-06-01', 1.1, 'c')]
+    history = DmoHistory.from_records(records[:1])
+    for r in records[1:]:
+        history.append(r, r['StartDay'], stage_name=r['StageName'], days=2, property_uuid=r['PropertyUUID'])
+    check_same(history, DmoHistory.from_records(records))
+
+
+def test_append_before_the_last_assessment():
+    records = [record('2024-01-01', 1.0, 'a'), record('2024-03-01', 1.2, 'b'), record('2024-06-01', 1.1, 'c')]
+    # The current recording, from a date range before the latest assessment
+    current = record('2024-03-01', 0.9, 'current')
+    history = DmoHistory.from_records(records)
+    history.append(current, current['StartDay'], stage_id=1, stage_name='current', days=2,
+                   property_uuid='current')
+    assert history.stage_names == ['a', 'b', 'current', 'c']
+    check_same(history, DmoHistory.from_records(records[:2] + [current] + records[2:]))
+
+    # Later appends keep working incrementally
+    later = record('2024-09-01', 1.3, 'd')
+    history.append(later, later['StartDay'], stage_name='d', days=2, property_uuid='d')
+    check_same(history, DmoHistory.from_records(records[:2] + [current] + records[2:] + [later]))
+
+
+def test_previous_skips_same_day_and_missing():
+    records = [record('2024-01-01', 1.0), record('2024-03-01', 1.2), record('2024-06-01', 1.1)]
+    records[1]['MeanWalkingSpeed'] = None
+    history = DmoHistory.from_records(records)
+    assert history.previous('MeanWalkingSpeed', '2024-06-01') == 1.0
+    assert history.previous('MeanWalkingSpeed', '2024-06-02') == 1.1
+    assert np.isnan(history.previous('MeanWalkingSpeed', '2024-01-01'))
@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import gait
+from gait import GAIT_METRICS
+from gait import PERCENTILES
+from gait import GaitStats
+from strides import read_strides
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'test')
+
+
+def expected_bouts(strides):
+    # One groupby per figure, with np.percentile for the percentiles
+    values = strides[GAIT_METRICS].astype('float64').assign(wb_id=strides['wb_id'],
+                                                            lr_label=strides['lr_label'].astype(str))
+    by_bout = values.groupby('wb_id')
+    columns = {'n_strides': by_bout.size()}
+    for metric in GAIT_METRICS:
+        columns[f'{metric}__cv'] = by_bout[metric].std() / by_bout[metric].mean()
+        left, right = (values[values['lr_label'] == side].groupby('wb_id')[metric].mean()
+                       .reindex(columns['n_strides'].index) for side in ('left', 'right'))
+        columns[f'{metric}__asymmetry'] = 100 * (left - right).abs() / ((left + right) / 2)
+        for q in PERCENTILES:
+            columns[f'{metric}__p{q}'] = by_bout[metric].agg(
+                lambda v: np.percentile(v.dropna(), q) if v.notna().any() else np.nan)
+    return pd.DataFrame(columns)
+
+
+def check(strides):
+    result, stats = gait.bout_gait(strides)
+    expected = expected_bouts(strides)
+    result = result.set_index('wb_id')
+    assert list(result.index) == list(expected.index)
+    for column in expected.columns:
+        assert np.allclose(result[column].to_numpy(dtype=float), expected[column].to_numpy(dtype=float),
+                           rtol=1e-9, atol=1e-12, equal_nan=True), column
+
+    for metric in GAIT_METRICS:
+        values = strides[metric].astype('float64')
+        assert np.isclose(stats.cv(metric), values.std() / values.mean(), rtol=1e-9), metric
+        sides = strides['lr_label'].astype(str)
+        left, right = values[sides == 'left'].mean(), values[sides == 'right'].mean()
+        assert np.isclose(stats.asymmetry(metric), 100 * abs(left - right) / ((left + right) / 2), rtol=1e-9)
+    return stats
+
+
+@pytest.mark.parametrize('day', ['2024-12-11', '2024-12-12'])
+def test_bout_gait_on_the_fixture(day):
+    check(read_strides(os.path.join(FIXTURE, day, 'stride.csv')))
+
+
+def test_unsorted_bouts_and_missing_values():
+    rng = np.random.default_rng(3)
+    n = 3000
+    strides = pd.DataFrame({
+        # Shuffled bout ids, some bouts with a single stride
+        'wb_id': rng.permutation(np.r_[rng.integers(0, 150, n - 5), [900, 901, 902, 903, 904]]).astype('int32'),
+        'lr_label': pd.Categorical.from_codes(rng.integers(0, 2, n), ['left', 'right']),
+        'stride_duration_s': rng.normal(1.1, 0.15, n).astype('float32'),
+        'cadence_spm': rng.normal(100, 8, n).astype('float32'),
+        # Repeated values, so the percentile sort has ties to get right
+        'stride_length_m': np.round(rng.normal(1.3, 0.2, n), 1).astype('float32'),
+        'walking_speed_mps': rng.normal(1.2, 0.25, n).astype('float32')
+    })
+    strides.loc[rng.random(n) < 0.05, 'cadence_spm'] = np.nan
+    # A bout with no cadence at all
+    strides.loc[strides['wb_id'] == 7, 'cadence_spm'] = np.nan
+    check(strides)
+
+
+def test_day_stats_merge_like_all_strides():
+    frames = [read_strides(os.path.join(FIXTURE, day, 'stride.csv')) for day in ('2024-12-11', '2024-12-12')]
+    merged = GaitStats()
+    for frame in frames:
+        merged.merge(gait.bout_gait(frame)[1])
+    whole = check(pd.concat(frames, ignore_index=True).assign(
+        wb_id=lambda f: f['wb_id'] + np.repeat([0, 10000], [len(frames[0]), len(frames[1])])))
+    for metric in GAIT_METRICS:
+        assert np.isclose(merged.cv(metric), whole.cv(metric), rtol=1e-9), metric
+        assert np.isclose(merged.asymmetry(metric), whole.asymmetry(metric), rtol=1e-9), metric
+
+    arrays, info = merged.to_arrays()
+    loaded = GaitStats.from_arrays(arrays, info)
+    for metric in GAIT_METRICS:
+        assert loaded.cv(metric) == merged.cv(metric)
+
+
+def test_percentiles_of_nearly_equal_values():
+    # Values far apart from the rest of the day round to the same sort key;
+    # the kernel has to fall back to an exact sort for them
+    values = np.array([1e9, 1.0 + 3e-12, 1.0 + 2e-12, 1.0 + 1e-12, 1.0, 5.0, 4.0])
+    wb_id = np.array([0, 1, 1, 1, 1, 2, 2])
+    none = np.zeros(len(values), dtype=bool)
+    kernel = gait.gait_kernel(wb_id, none, none, values[:, None], percentiles=(0, 50, 100))
+    for bout in range(3):
+        expected = np.percentile(values[wb_id == bout], (0, 50, 100))
+        assert np.array_equal(kernel['percentiles'][bout, 0], expected), bout
@@ -0,0 +1,15 @@
+import pytest
+
+from bench_import_time import BUDGETS_MS
+from bench_import_time import import_time_ms
+
+
+@pytest.mark.parametrize('module', sorted(BUDGETS_MS))
+def test_import_budget(module):
+    # Best of three fresh interpreters, to ride out a busy machine
+    times = []
+    for _ in range(3):
+        cumulative, heavy = import_time_ms(module)
+        times.append(cumulative)
+        assert heavy == '[]', heavy
+    assert min(times) <= BUDGETS_MS[module], (module, times)
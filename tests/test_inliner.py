@@ -0,0 +1,60 @@
+import collections
+import os
+import re
+
+import pandas as pd
+
+import plot_gen
+from inliner import Inliner
+
+TRANSFORM_RE = re.compile(r'transform="([^"]*)"')
+
+
+def test_inlined_chart_keeps_transforms(tmp_path):
+    chart = tmp_path / 'chart.svg'
+    plot_gen.save_plot(pd.DataFrame({'Speed': [1.234567, 0.987654]}, index=['You', 'PD']), 'bar', '', 'Speed (m/s)',
+                       'Peer Comparison', str(chart))
+    (tmp_path / 'report.html').write_text('<html><body><img src="chart.svg" alt="Chart"></body></html>')
+
+    html = Inliner().inline_file(str(tmp_path / 'report.html'))
+    with open(html) as f:
+        inlined = f.read()
+
+    original = collections.Counter(TRANSFORM_RE.findall(chart.read_text()))
+    assert 'scale(0.015625)' in original
+    assert collections.Counter(TRANSFORM_RE.findall(inlined)) == original
+    assert 'src="chart.svg"' not in inlined
+
+
+def test_geometry_is_rounded(tmp_path):
+    svg = ('<svg xmlns="http://www.w3.org/2000/svg"><path d="M 1.23456 2.5 L 3.14159 0" '
+           'transform="scale(0.015625)"/></svg>')
+    (tmp_path / 'a.svg').write_text(svg)
+    element = Inliner(svg_precision=2).svg_element(os.path.join(tmp_path, 'a.svg'))
+    assert 'd="M 1.23 2.5 L 3.14 0"' in element
+    assert 'transform="scale(0.015625)"' in element
+
+
+def test_only_shared_assets_are_kept(tmp_path):
+    assets = tmp_path / 'assets'
+    assets.mkdir()
+    (assets / 'style.css').write_text('.title { color: red }')
+    (assets / 'logo.png').write_bytes(b'\x89PNG fake')
+    inliner = Inliner(shared_dirs=[str(assets)])
+
+    for i in range(5):
+        report = tmp_path / f'report{i}'
+        report.mkdir()
+        (report / 'chart.svg').write_text(f'<svg xmlns="http://www.w3.org/2000/svg"><path d="M 0 {i}"/></svg>')
+        (report / 'report.html').write_text(
+            '<html><head><link rel="stylesheet" href="../assets/style.css"></head><body class="title">'
+            '<img src="../assets/logo.png"><img src="chart.svg"></body></html>')
+        with open(inliner.inline_file(str(report / 'report.html'))) as f:
+            html = f.read()
+        assert f'd="M 0 {i}"' in html
+        assert 'color:red' in html and 'data:image/png;base64,' in html
+
+    # The stylesheet and logo, each encoded once; no chart kept
+    assert sorted(os.path.basename(p) for p in inliner._files) == ['logo.png', 'style.css']
+    assert inliner.stats()['entries'] == 2
+    assert inliner.stats()['misses'] == 2 and inliner.stats()['hits'] == 8
@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+
+import osmutils
+from bench_osm_fetch import FakeIoTClient
+from bench_osm_fetch import FakeOSM
+from bench_osm_fetch import FakeProjectClient
+from bench_osm_fetch import legacy_fetch
+
+
+class CappedProjectClient(FakeProjectClient):
+    # A server that returns at most 'cap' values per call, whatever is asked for
+    cap = 7
+
+    def listParticipantPropertiesInProject(self, project_id, participant_id, property_id, start, count):
+        return super().listParticipantPropertiesInProject(project_id, participant_id, property_id, start,
+                                                          min(count, self.cap))
+
+
+def fake_pool(osm, size=2, project_client=FakeProjectClient):
+    return osmutils.ClientPool(size=size, project_client_factory=lambda: project_client(osm),
+                               iot_client_factory=lambda: FakeIoTClient(osm))
+
+
+def test_fetch_many_matches_get_properties():
+    osm = FakeOSM(values=25, latency=0, connect_latency=0)
+    codes = [f'p{i}' for i in range(1, 6)]
+    expected = legacy_fetch(osm, 'MOB', codes, 'dmo')
+
+    osm = FakeOSM(values=25, latency=0, connect_latency=0)
+    fetcher = osmutils.PropertyFetcher(fake_pool(osm), page_size=10)
+    values = fetcher.fetch_many('MOB', codes, 'dmo', workers=3)
+    assert list(values) == codes
+    assert values == expected
+    assert osm.clients <= 4
+
+
+def test_short_pages_are_not_the_end():
+    osm = FakeOSM(values=25, latency=0, connect_latency=0)
+    fetcher = osmutils.PropertyFetcher(fake_pool(osm, project_client=CappedProjectClient), page_size=10)
+    values = list(fetcher.iter_properties('MOB', 'p1', 'dmo'))
+    assert values == [(1, i) for i in range(25)]
+
+
+def test_failed_factory_frees_its_slot():
+    osm = FakeOSM(values=0, latency=0, connect_latency=0)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError('refused')
+        return FakeProjectClient(osm)
+
+    pool = osmutils.ClientPool(size=1, project_client_factory=flaky, iot_client_factory=lambda: FakeIoTClient(osm))
+    with pytest.raises(ConnectionError):
+        with pool.clients():
+            pass
+
+    # The one slot is free again: this must not block
+    done = threading.Event()
+
+    def use():
+        with pool.clients() as (pc, dc):
+            done.set()
+
+    thread = threading.Thread(target=use, daemon=True)
+    thread.start()
+    thread.join(5)
+    assert done.is_set()
+    assert len(attempts) == 2
+
+
+def test_client_that_raised_is_not_reused():
+    osm = FakeOSM(values=0, latency=0, connect_latency=0)
+    pool = fake_pool(osm, size=1)
+    with pytest.raises(RuntimeError):
+        with pool.clients() as (pc, dc):
+            broken = pc
+            raise RuntimeError('connection reset')
+    with pool.clients() as (pc, dc):
+        assert pc is not broken
+    with pool.clients() as (again, dc):
+        assert again is pc
@@ -0,0 +1,53 @@
+import json
+import os
+import shutil
+
+import jinja2
+
+import mobility
+from folderresults import AggregatedResults
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'test')
+COHORT_MAP = {'PD': {'mws': 1.1, 'msl': 1.2, 'mc': 95}}
+# Just the summary figures the change tests look at
+TEMPLATE = jinja2.Template('{{ sd.mws_change }}|{{ sd.cad_change }}|{{ sd.sl_change }}|'
+                           '{{ sd.dmo_mws_comments }}|{{ sd.dmo_wbd_comments }}')
+
+
+def report_fields(load_dir, out):
+    mobility.generate_report(load_dir, str(out), COHORT_MAP, TEMPLATE)
+    with open(os.path.join(out, 'report.html')) as f:
+        return f.read().split('|')
+
+
+def test_history_of_the_same_day_only(tmp_path):
+    # test/dmo_history.json already holds this recording (2024-12-11) and
+    # nothing before it
+    fields = report_fields(FIXTURE, tmp_path / 'out')
+    assert fields[:3] == ['-', '-', '-']
+    assert fields[3] == fields[4] == 'This is your first assessment.'
+
+
+def test_change_from_the_latest_earlier_assessment(tmp_path):
+    load_dir = tmp_path / 'participant'
+    shutil.copytree(FIXTURE, load_dir, ignore=shutil.ignore_patterns('*.pdf'))
+    with open(load_dir / 'dmo_history.json') as f:
+        history = json.load(f)
+    earlier = dict(history[0], StartDay='2024-10-01', MeanWalkingSpeed=0.5, MeanCadence=80.0,
+                   MeanStrideLength=1.0, MaximumWalkingBoutDuration=20.0)
+    older = dict(earlier, StartDay='2024-09-01', MeanWalkingSpeed=5.0)
+    with open(load_dir / 'dmo_history.json', 'w') as f:
+        json.dump(history + [earlier, older], f)
+
+    result = AggregatedResults(keep_frames=False)
+    result.read_data(str(load_dir))
+    fields = report_fields(str(load_dir), tmp_path / 'out')
+
+    def pct(value, previous):
+        return f"{100 * (value - previous) / previous:+.0f}%"
+
+    assert fields[0] == pct(result.mean_walking_speed, 0.5)
+    assert fields[1] == pct(result.mean_cadence, 80.0)
+    assert fields[2] == pct(result.mean_stride_length, 1.0)
+    assert fields[3] == mobility.describe_change(result.mean_walking_speed - 0.5, 'metres per second', 1)
+    assert fields[4] == mobility.describe_change(result.maximum_walking_bout_duration - 20.0, 'seconds', 1)
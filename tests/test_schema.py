@@ -0,0 +1,76 @@
+import csv
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from folderresults import FolderResults
+from schema import WB_SCHEMA
+from schema import SchemaError
+from schema import read_table
+
+DAY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'test', '2024-12-11')
+
+
+def blank_cells(folder, cells):
+    # Empty the given (row, column) cells of wb.csv
+    path = os.path.join(folder, 'wb.csv')
+    with open(path, newline='') as f:
+        rows = list(csv.reader(f))
+    for row, column in cells:
+        rows[row + 1][rows[0].index(column)] = ''
+    with open(path, 'w', newline='') as f:
+        csv.writer(f).writerows(rows)
+
+
+@pytest.fixture
+def day_copy(tmp_path):
+    folder = tmp_path / '2024-12-11'
+    shutil.copytree(DAY, folder)
+    return str(folder)
+
+
+def test_missing_stride_count(day_copy):
+    expected = FolderResults()
+    expected.read_folder(DAY)
+    blank_cells(day_copy, [(2, 'n_strides')])
+
+    wb = read_table(os.path.join(day_copy, 'wb.csv'), WB_SCHEMA)
+    assert np.isnan(wb['n_strides'].iloc[2])
+
+    result = FolderResults()
+    result.read_folder(day_copy)
+    assert result.total_walking_time == expected.total_walking_time
+    hour = expected.wb['bout_hour'].iloc[2]
+    strides = expected.wb['n_strides'].iloc[2]
+    assert result.hourly[hour, 0] == expected.hourly[hour, 0] - strides
+    assert np.array_equal(result.hourly[:, 1:], expected.hourly[:, 1:])
+
+
+def test_missing_start(day_copy):
+    expected = FolderResults()
+    expected.read_folder(DAY)
+    blank_cells(day_copy, [(0, 'start')])
+
+    result = FolderResults()
+    result.read_folder(day_copy)
+    assert np.isnat(result.wb['start_times'].to_numpy()[0])
+    assert result.wb['bout_hour'].iloc[0] == -1
+    assert result.wb['start_times'].iloc[1] == expected.wb['start_times'].iloc[1]
+    # The bout still counts towards the day, just not towards an hour
+    assert result.total_walking_time == expected.total_walking_time
+    hour = expected.wb['bout_hour'].iloc[0]
+    assert result.hourly[hour, 2] == expected.hourly[hour, 2] - 1
+
+
+def test_unparseable_value(day_copy):
+    # A bout id that isn't a number still fails, naming the file
+    path = os.path.join(day_copy, 'wb.csv')
+    with open(path) as f:
+        lines = f.read().splitlines()
+    lines[1] = 'x' + lines[1]
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    with pytest.raises(SchemaError, match='wb.csv'):
+        read_table(path, WB_SCHEMA)
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import os
+import shutil
+
+from service import DirectoryWatcher
+from service import HttpFrontend
+from service import ReportService
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+FIXTURE = os.path.join(ROOT, 'test')
+COHORT_MAP = {'PD': {'mws': 1.1, 'msl': 1.2, 'mc': 95}}
+
+
+def make_service(tmp_path):
+    # Two participants copied from test/, and one with no form.json whose
+    # reports fail
+    data_root = tmp_path / 'data'
+    for participant in ('p1', 'p2'):
+        shutil.copytree(FIXTURE, data_root / participant, ignore=shutil.ignore_patterns('*.pdf'))
+    (data_root / 'broken').mkdir()
+    cohorts_path = tmp_path / 'cohorts.json'
+    cohorts_path.write_text(json.dumps(COHORT_MAP))
+    return ReportService(str(data_root), str(tmp_path / 'reports'), cohorts_path=str(cohorts_path),
+                         searchpath=ROOT, concurrency=1, load_workers=1, render_workers=1)
+
+
+def run(tmp_path, scenario):
+    async def main():
+        async with make_service(tmp_path) as service:
+            return await scenario(service)
+    return asyncio.run(main())
+
+
+async def http_request(port, method, path, body=b''):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+
+def test_submit_deduplicates_queued_and_running_jobs(tmp_path):
+    async def scenario(service):
+        first = service.submit('p1')
+        second = service.submit('p2')
+        # Neither job has finished, so the same request gets the same job back
+        assert service.submit('p1') is first
+        assert service.submit('p2', source='http') is second
+        ranged = service.submit('p1', start='2024-12-12')
+        assert ranged is not first and ranged.output_dir.endswith('p1_2024-12-12_last')
+
+        await asyncio.gather(first.future, second.future, ranged.future)
+        # A finished job is not reused; the data may have grown since
+        again = service.submit('p1')
+        assert again is not first
+        await again.future
+        return first, again, service.metrics()
+
+    first, again, metrics = run(tmp_path, scenario)
+    assert first.status == again.status == 'done'
+    assert metrics['jobs'] == {'submitted': 6, 'deduplicated': 2, 'completed': 4, 'failed': 0, 'queued': 0,
+                               'running': 0}
+    assert metrics['latency']['total']['count'] == 4
+    assert set(first.timings) >= {'load', 'plots', 'render'}
+    for name in ('p1', 'p2', 'p1_2024-12-12_last'):
+        assert (tmp_path / 'reports' / name / 'report.html').exists()
+
+
+def test_failed_job_does_not_stop_the_service(tmp_path):
+    async def scenario(service):
+        failed = service.submit('broken')
+        done = service.submit('p1')
+        await asyncio.wait([failed.future, done.future])
+        # The failed job is no longer in flight, so it can be requested again
+        retry = service.submit('broken')
+        await asyncio.wait([retry.future])
+        return failed, done, retry, service.metrics()
+
+    failed, done, retry, metrics = run(tmp_path, scenario)
+    assert failed.status == retry.status == 'failed' and retry is not failed
+    assert isinstance(failed.future.exception(), FileNotFoundError)
+    assert failed.error.startswith('FileNotFoundError') and failed.to_dict()['error'] == failed.error
+    assert done.status == 'done' and done.error is None
+    assert metrics['jobs']['failed'] == 2 and metrics['jobs']['completed'] == 1
+    # Stage latencies only come from the reports that were written
+    assert metrics['latency']['run']['count'] == 3 and metrics['latency']['load']['count'] == 1
+
+
+def test_submit_rejects_paths_outside_data_root(tmp_path):
+    async def scenario(service):
+        errors = []
+        for participant in ('', '.', '..', '../data', 'p1/2024-12-11', 'missing'):
+            try:
+                service.submit(participant)
+            except ValueError as e:
+                errors.append(str(e))
+        return errors, service.metrics()
+
+    errors, metrics = run(tmp_path, scenario)
+    assert len(errors) == 6 and errors[-1] == "unknown participant 'missing'"
+    assert metrics['jobs']['queued'] == 0 and not metrics['latency']
+
+
+def test_watcher_reports_a_change_once_it_is_stable():
+    watcher = DirectoryWatcher(service=None)
+    watcher._reported = {'p1': 'a'}
+
+    # Unchanged participants are never reported
+    assert watcher.poll({'p1': 'a'}) == []
+    # A change waits for one more poll with the same signature
+    assert watcher.poll({'p1': 'b', 'p2': 'x'}) == []
+    assert watcher.poll({'p1': 'c', 'p2': 'x'}) == ['p2']
+    assert watcher.poll({'p1': 'c', 'p2': 'x'}) == ['p1']
+    assert watcher.poll({'p1': 'c', 'p2': 'x'}) == []
+    # A change that reverts before it settles is dropped
+    assert watcher.poll({'p1': 'd', 'p2': 'x'}) == []
+    assert watcher.poll({'p1': 'c', 'p2': 'x'}) == []
+    assert watcher.poll({'p1': 'c', 'p2': 'x'}) == []
+    assert watcher._pending == {}
+
+
+def test_watcher_queues_a_participant_when_a_day_arrives(tmp_path):
+    async def scenario(service):
+        watcher = DirectoryWatcher(service, interval=0.05)
+        signatures = watcher.scan()
+        assert sorted(signatures) == ['p1', 'p2']
+        assert [day for day, _ in signatures['p1']] == [os.path.join('p1', '2024-12-11'),
+                                                        os.path.join('p1', '2024-12-12')]
+
+        watch = asyncio.create_task(watcher.run())
+        await asyncio.sleep(0.2)
+        assert not service.jobs
+        shutil.copytree(os.path.join(FIXTURE, '2024-12-12'), os.path.join(service.data_root, 'p2', '2024-12-13'))
+        for _ in range(200):
+            if service.jobs:
+                break
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.2)
+        watch.cancel()
+        jobs = list(service.jobs.values())
+        await asyncio.wait([job.future for job in jobs])
+        return jobs
+
+    jobs = run(tmp_path, scenario)
+    assert [(job.participant, job.source, job.status) for job in jobs] == [('p2', 'watch', 'done')]
+
+
+def test_http_routes(tmp_path):
+    async def scenario(service):
+        frontend = HttpFrontend(service, port=0)
+        await frontend.start()
+        port = frontend.port
+        responses = {}
+        try:
+            request = {'participant': 'p1', 'start': '2024-12-12', 'wait': True}
+            responses['wait'] = await http_request(port, 'POST', '/reports', json.dumps(request).encode())
+            responses['queued'] = await http_request(port, 'POST', '/reports', b'{"participant": "p2"}')
+            await service.jobs[responses['queued'][1]['id']].future
+            responses['job'] = await http_request(port, 'GET', f"/reports/{responses['queued'][1]['id']}")
+            responses['failed'] = await http_request(port, 'POST', '/reports',
+                                                     b'{"participant": "broken", "wait": true}')
+            responses['unknown job'] = await http_request(port, 'GET', '/reports/999')
+            responses['bad id'] = await http_request(port, 'GET', '/reports/abc')
+            responses['outside root'] = await http_request(port, 'POST', '/reports', b'{"participant": "../etc"}')
+            responses['no participant'] = await http_request(port, 'POST', '/reports', b'{}')
+            responses['bad json'] = await http_request(port, 'POST', '/reports', b'{')
+            responses['no route'] = await http_request(port, 'DELETE', '/reports')
+            responses['metrics'] = await http_request(port, 'GET', '/metrics')
+        finally:
+            await frontend.stop()
+        return responses
+
+    responses = run(tmp_path, scenario)
+    status, job = responses['wait']
+    assert status == 200 and job['status'] == 'done' and job['source'] == 'http'
+    assert os.path.exists(os.path.join(job['output_dir'], 'report.html'))
+    status, job = responses['queued']
+    assert status == 202 and job['status'] in ('queued', 'running') and 'latency_s' not in job
+    status, job = responses['job']
+    assert status == 200 and job['status'] == 'done' and job['participant'] == 'p2' and job['latency_s'] > 0
+    status, job = responses['failed']
+    assert status == 500 and job['status'] == 'failed' and job['error'].startswith('FileNotFoundError')
+    assert responses['unknown job'] == (404, {'error': 'unknown job'})
+    assert responses['no route'] == (404, {'error': 'no route for DELETE /reports'})
+    for name in ('bad id', 'outside root', 'no participant', 'bad json'):
+        assert responses[name][0] == 400, name
+    status, metrics = responses['metrics']
+    assert status == 200 and metrics['jobs']['completed'] == 2 and metrics['jobs']['failed'] == 1
@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from strides import STRIDE_METRICS
+from strides import StrideSummary
+from strides import read_stride_summary
+from strides import read_strides
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'test')
+
+
+def summarised(frames):
+    summary = StrideSummary()
+    for frame in frames:
+        part = StrideSummary()
+        part.update(frame)
+        summary.merge(part)
+    return summary
+
+
+def test_streamed_summary_matches_pandas():
+    frames = [read_strides(os.path.join(FIXTURE, day, 'stride.csv')) for day in ('2024-12-11', '2024-12-12')]
+    strides = pd.concat(frames)
+    merged = summarised(frames)
+    streamed = read_stride_summary(os.path.join(FIXTURE, '2024-12-11', 'stride.csv'), chunksize=7)
+    read_stride_summary(os.path.join(FIXTURE, '2024-12-12', 'stride.csv'), chunksize=7, summary=streamed)
+
+    for summary in (merged, streamed):
+        assert summary.strides == len(strides)
+        for metric in STRIDE_METRICS:
+            values = strides[metric].astype('float64')
+            assert np.isclose(summary.mean(metric), values.mean(), rtol=1e-12), metric
+            assert np.isclose(summary.std(metric), values.std(), rtol=1e-9), metric
+            assert summary.count[STRIDE_METRICS.index(metric)] == values.count()
+
+
+def test_std_with_a_large_mean():
+    # sum_sq - n * mean^2 loses every significant digit here
+    rng = np.random.default_rng(0)
+    values = 1e6 + rng.normal(0, 1e-3, 200000)
+    frames = [pd.DataFrame({'cadence_spm': part}) for part in np.array_split(values, 9)]
+    summary = summarised(frames)
+    assert np.isclose(summary.std('cadence_spm'), values.std(ddof=1), rtol=1e-6)
+
+
+def test_cache_round_trip():
+    summary = read_stride_summary(os.path.join(FIXTURE, '2024-12-11', 'stride.csv'))
+    arrays, info = summary.to_arrays()
+    loaded = StrideSummary.from_arrays(arrays, info)
+    assert loaded.strides == summary.strides
+    assert loaded.labels == summary.labels
+    for metric in STRIDE_METRICS:
+        assert loaded.std(metric) == summary.std(metric)
+        assert loaded.percentile(metric, 50) == summary.percentile(metric, 50)
+        assert np.array_equal(loaded.histogram(metric)[0], summary.histogram(metric)[0])
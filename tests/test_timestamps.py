@@ -0,0 +1,59 @@
+import os
+import time
+from datetime import datetime
+from datetime import timezone
+
+import numpy as np
+import pytest
+
+from folderresults import local_utc_offsets
+
+
+@pytest.fixture
+def local_zone():
+    # Switch the process time zone, and put it back afterwards
+    saved = os.environ.get('TZ')
+
+    def switch(name):
+        os.environ['TZ'] = name
+        time.tzset()
+
+    yield switch
+    if saved is None:
+        os.environ.pop('TZ', None)
+    else:
+        os.environ['TZ'] = saved
+    time.tzset()
+
+
+def reference(micros):
+    # One datetime per value, as the original create_timestamps did
+    out = []
+    for m in micros:
+        seconds = m / 1000000
+        local = datetime.fromtimestamp(seconds)
+        utc = datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+        out.append(round((local - utc).total_seconds() * 1000000))
+    return np.array(out, dtype='int64')
+
+
+# Daylight saving transitions at hh:30 UTC, and one at hh:00 (Lord Howe
+# shifts by half an hour)
+@pytest.mark.parametrize('zone, transition', [
+    ('Australia/Adelaide', '2024-04-06T16:30:00'),
+    ('Australia/Adelaide', '2024-10-05T16:30:00'),
+    ('America/St_Johns', '2024-03-10T05:30:00'),
+    ('America/St_Johns', '2024-11-03T04:30:00'),
+    ('Australia/Lord_Howe', '2024-04-06T15:00:00'),
+    ('Europe/London', '2024-03-31T01:00:00'),
+])
+def test_offsets_across_a_transition(local_zone, zone, transition):
+    local_zone(zone)
+    at = np.datetime64(transition, 'us').astype('int64')
+    # Every 7 seconds for two hours either side, plus the instants around it
+    micros = np.r_[np.arange(at - 7200 * 1000000, at + 7200 * 1000000, 7 * 1000000), at - 1, at, at + 1]
+    offsets = local_utc_offsets(micros)
+    expected = reference(micros)
+    assert np.array_equal(offsets, expected), micros[offsets != expected][:5]
+    # The offset does change here
+    assert len(np.unique(expected)) == 2